@@ -0,0 +1,35 @@
+"""outbox_events_retrying_index
+
+Revision ID: a1c7e3f9b5d8
+Revises: e9b5d1f7a3c4
+Create Date: 2026-10-20 02:00:00
+
+Índice parcial dos eventos pendentes aguardando nova tentativa, por agregado: o relay
+exclui no SQL os eventos de agregados retidos (NOT EXISTS).
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+revision: str = "a1c7e3f9b5d8"
+down_revision: Union[str, None] = "e9b5d1f7a3c4"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+_RETRYING = sa.text("status = 'pending' AND next_attempt_at IS NOT NULL")
+
+
+def upgrade() -> None:
+    op.create_index(
+        "ix_outbox_events_retrying",
+        "outbox_events",
+        ["aggregate_type", "aggregate_id", "id"],
+        unique=False,
+        postgresql_where=_RETRYING,
+        sqlite_where=_RETRYING,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_outbox_events_retrying", table_name="outbox_events")
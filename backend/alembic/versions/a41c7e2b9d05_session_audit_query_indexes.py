@@ -0,0 +1,87 @@
+"""session_audit_query_indexes
+
+Revision ID: a41c7e2b9d05
+Revises: d2343eb6c8bc
+Create Date: 2026-10-19 10:00:00
+
+Índices para os formatos de consulta de sessões ativas e audit logs:
+- parciais (revoked = false) em refresh_tokens para get_user_sessions e get_all_sessions;
+- compostos (filtro, created_at DESC) em audit_logs para list_audit_logs;
+- remove os ix_*_id redundantes com as chaves primárias e os índices de coluna única
+  cobertos pelos compostos.
+Os índices são criados com CONCURRENTLY para não bloquear escrita nas tabelas.
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+revision: str = "a41c7e2b9d05"
+down_revision: Union[str, None] = "d2343eb6c8bc"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+_ACTIVE = sa.text("revoked = false")
+
+_PK_INDEXES = (
+    ("ix_users_id", "users"),
+    ("ix_roles_id", "roles"),
+    ("ix_permissions_id", "permissions"),
+    ("ix_refresh_tokens_id", "refresh_tokens"),
+    ("ix_audit_logs_id", "audit_logs"),
+)
+
+
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_refresh_tokens_active_user_created",
+            "refresh_tokens",
+            ["user_id", sa.text("created_at DESC")],
+            postgresql_where=_ACTIVE,
+            postgresql_concurrently=True,
+        )
+        op.create_index(
+            "ix_refresh_tokens_active_created",
+            "refresh_tokens",
+            [sa.text("created_at DESC"), sa.text("id DESC")],
+            postgresql_where=_ACTIVE,
+            postgresql_concurrently=True,
+        )
+        op.create_index(
+            "ix_audit_logs_user_created",
+            "audit_logs",
+            ["user_id", sa.text("created_at DESC")],
+            postgresql_concurrently=True,
+        )
+        op.create_index(
+            "ix_audit_logs_result_created",
+            "audit_logs",
+            ["result", sa.text("created_at DESC")],
+            postgresql_concurrently=True,
+        )
+        op.create_index(
+            "ix_audit_logs_resource_type_created",
+            "audit_logs",
+            ["resource_type", sa.text("created_at DESC")],
+            postgresql_concurrently=True,
+        )
+
+    # Prefixos dos compostos acima
+    op.drop_index("ix_audit_logs_user_id", table_name="audit_logs")
+    op.drop_index("ix_audit_logs_resource_type", table_name="audit_logs")
+    for name, table in _PK_INDEXES:
+        op.drop_index(name, table_name=table)
+
+
+def downgrade() -> None:
+    for name, table in _PK_INDEXES:
+        op.create_index(name, table, ["id"], unique=False)
+    op.create_index("ix_audit_logs_resource_type", "audit_logs", ["resource_type"], unique=False)
+    op.create_index("ix_audit_logs_user_id", "audit_logs", ["user_id"], unique=False)
+
+    op.drop_index("ix_audit_logs_resource_type_created", table_name="audit_logs")
+    op.drop_index("ix_audit_logs_result_created", table_name="audit_logs")
+    op.drop_index("ix_audit_logs_user_created", table_name="audit_logs")
+    op.drop_index("ix_refresh_tokens_active_created", table_name="refresh_tokens")
+    op.drop_index("ix_refresh_tokens_active_user_created", table_name="refresh_tokens")
@@ -0,0 +1,49 @@
+"""audit_email_trigram_search
+
+Revision ID: a7d3e9f1c5b2
+Revises: f2c9d6b8e1a3
+Create Date: 2026-10-19 16:00:00
+
+Índices para o filtro por email de list_audit_logs:
+- GIN pg_trgm em user_email para os modos contains e prefix (ILIKE com curinga inicial);
+- B-tree em lower(user_email) para o modo exact.
+Os índices são criados com CONCURRENTLY para não bloquear escrita em audit_logs.
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+revision: str = "a7d3e9f1c5b2"
+down_revision: Union[str, None] = "f2c9d6b8e1a3"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_audit_logs_user_email_trgm",
+            "audit_logs",
+            ["user_email"],
+            postgresql_using="gin",
+            postgresql_ops={"user_email": "gin_trgm_ops"},
+            postgresql_concurrently=True,
+        )
+        op.create_index(
+            "ix_audit_logs_user_email_lower",
+            "audit_logs",
+            [sa.text("lower(user_email)")],
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            "ix_audit_logs_user_email_lower", table_name="audit_logs", postgresql_concurrently=True
+        )
+        op.drop_index(
+            "ix_audit_logs_user_email_trgm", table_name="audit_logs", postgresql_concurrently=True
+        )
@@ -0,0 +1,68 @@
+"""rbac_change_feed
+
+Revision ID: b2f6c0d4e8a3
+Revises: f4c8d2e6b0a1
+Create Date: 2026-10-19 23:00:00
+
+Feed incremental de usuários e RBAC (GET /sync/changes): versão da última mudança de
+cada usuário, papel, permissão e associação, e o contador de versões. O backfill dá uma
+versão a cada linha existente, para a primeira carga (since=0) trazer tudo.
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+revision: str = "b2f6c0d4e8a3"
+down_revision: Union[str, None] = "f4c8d2e6b0a1"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+_BACKFILL = """
+INSERT INTO rbac_changes (entity, entity_id, version, deleted, changed_at)
+SELECT entity, entity_id, ROW_NUMBER() OVER (ORDER BY ord, entity_id), deleted, CURRENT_TIMESTAMP
+FROM (
+    SELECT 1 AS ord, 'permission' AS entity, CAST(id AS VARCHAR(64)) AS entity_id, FALSE AS deleted
+    FROM permissions
+    UNION ALL
+    SELECT 2, 'role', CAST(id AS VARCHAR(64)), FALSE FROM roles
+    UNION ALL
+    SELECT 3, 'role_permission', CAST(role_id AS VARCHAR(32)) || ':' || CAST(permission_id AS VARCHAR(32)), FALSE
+    FROM role_permissions
+    UNION ALL
+    SELECT 4, 'user', CAST(id AS VARCHAR(64)), deleted_at IS NOT NULL FROM users
+    UNION ALL
+    SELECT 5, 'user_role', CAST(user_id AS VARCHAR(32)) || ':' || CAST(role_id AS VARCHAR(32)), FALSE
+    FROM user_roles
+) AS existing
+"""
+
+
+def upgrade() -> None:
+    op.create_table(
+        "rbac_changes",
+        sa.Column("entity", sa.String(length=20), nullable=False),
+        sa.Column("entity_id", sa.String(length=64), nullable=False),
+        sa.Column("version", sa.BigInteger(), nullable=False),
+        sa.Column("deleted", sa.Boolean(), nullable=False),
+        sa.Column("changed_at", sa.DateTime(timezone=True), nullable=False),
+        sa.PrimaryKeyConstraint("entity", "entity_id"),
+        sa.UniqueConstraint("version"),
+    )
+    op.create_table(
+        "rbac_change_state",
+        sa.Column("id", sa.Integer(), autoincrement=False, nullable=False),
+        sa.Column("version", sa.BigInteger(), nullable=False),
+        sa.Column("purged_through", sa.BigInteger(), nullable=False),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.execute(_BACKFILL)
+    op.execute(
+        "INSERT INTO rbac_change_state (id, version, purged_through) "
+        "SELECT 1, COALESCE(MAX(version), 0), 0 FROM rbac_changes"
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("rbac_change_state")
+    op.drop_table("rbac_changes")
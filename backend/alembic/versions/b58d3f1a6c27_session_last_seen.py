@@ -0,0 +1,38 @@
+"""session_last_seen
+
+Revision ID: b58d3f1a6c27
+Revises: a41c7e2b9d05
+Create Date: 2026-10-19 11:00:00
+
+Adiciona refresh_tokens.session_id (claim `sid` dos access tokens, hash do token_id)
+e refresh_tokens.last_seen_at, atualizado em lote pelo last_seen_service.
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+revision: str = "b58d3f1a6c27"
+down_revision: Union[str, None] = "a41c7e2b9d05"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("refresh_tokens", sa.Column("session_id", sa.String(length=32), nullable=True))
+    op.add_column("refresh_tokens", sa.Column("last_seen_at", sa.DateTime(timezone=True), nullable=True))
+    # Mesmo cálculo de app.core.security.session_id_for; só sessões ainda ativas importam
+    op.execute(
+        """
+        UPDATE refresh_tokens
+        SET session_id = substr(encode(sha256(convert_to(token_id, 'UTF8')), 'hex'), 1, 32)
+        WHERE revoked = false AND expires_at > now()
+        """
+    )
+    op.create_index(op.f("ix_refresh_tokens_session_id"), "refresh_tokens", ["session_id"], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f("ix_refresh_tokens_session_id"), table_name="refresh_tokens")
+    op.drop_column("refresh_tokens", "last_seen_at")
+    op.drop_column("refresh_tokens", "session_id")
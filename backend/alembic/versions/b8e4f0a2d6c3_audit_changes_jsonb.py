@@ -0,0 +1,83 @@
+"""audit_changes_jsonb
+
+Revision ID: b8e4f0a2d6c3
+Revises: a7d3e9f1c5b2
+Create Date: 2026-10-19 17:00:00
+
+Troca audit_logs.changes de JSON para JSONB, com índice GIN (jsonb_path_ops) para o
+filtro changes_contains (@>). A conversão vai para uma coluna nova em lotes por faixa de
+id. Cria também audit_change_values, o fallback do filtro para bancos sem JSONB (no
+Postgres a tabela fica vazia).
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.dialects import postgresql
+
+revision: str = "b8e4f0a2d6c3"
+down_revision: Union[str, None] = "a7d3e9f1c5b2"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+_BATCH = 50_000
+
+
+def _id_ranges():
+    if op.get_context().as_sql:
+        # Modo offline (--sql): sem acesso aos dados, um lote único cobrindo tudo
+        yield 0, 2**31 - 1
+        return
+    bind = op.get_bind()
+    low, high = bind.execute(sa.text("SELECT min(id), max(id) FROM audit_logs")).one()
+    if low is None:
+        return
+    for start in range(low, high + 1, _BATCH):
+        yield start, start + _BATCH
+
+
+def _convert(column_type, expression: str) -> None:
+    op.add_column("audit_logs", sa.Column("changes_new", column_type, nullable=True))
+    for start, end in _id_ranges():
+        op.execute(
+            sa.text(
+                f"UPDATE audit_logs SET changes_new = {expression} "
+                "WHERE id >= :start AND id < :end AND changes IS NOT NULL"
+            ).bindparams(start=start, end=end)
+        )
+    op.drop_column("audit_logs", "changes")
+    op.alter_column("audit_logs", "changes_new", new_column_name="changes")
+
+
+def upgrade() -> None:
+    op.create_table(
+        "audit_change_values",
+        sa.Column("audit_log_id", sa.Integer(), nullable=False),
+        sa.Column("path", sa.String(length=200), nullable=False),
+        sa.Column("value", sa.String(length=255), nullable=False),
+        sa.ForeignKeyConstraint(["audit_log_id"], ["audit_logs.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("audit_log_id", "path"),
+    )
+    op.create_index(
+        "ix_audit_change_values_path_value",
+        "audit_change_values",
+        ["path", "value", "audit_log_id"],
+        unique=False,
+    )
+    _convert(postgresql.JSONB(), "changes::jsonb")
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_audit_logs_changes",
+            "audit_logs",
+            ["changes"],
+            postgresql_using="gin",
+            postgresql_ops={"changes": "jsonb_path_ops"},
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_audit_logs_changes", table_name="audit_logs")
+    _convert(sa.JSON(), "changes::json")
+    op.drop_index("ix_audit_change_values_path_value", table_name="audit_change_values")
+    op.drop_table("audit_change_values")
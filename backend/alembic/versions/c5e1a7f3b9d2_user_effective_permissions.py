@@ -0,0 +1,44 @@
+"""user_effective_permissions
+
+Revision ID: c5e1a7f3b9d2
+Revises: b2f6c0d4e8a3
+Create Date: 2026-10-20 00:00:00
+
+Permissões efetivas materializadas (user_roles × role_permissions), mantidas pela
+aplicação a cada mudança de papéis; preenchida aqui a partir das associações atuais.
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+revision: str = "c5e1a7f3b9d2"
+down_revision: Union[str, None] = "b2f6c0d4e8a3"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "user_effective_permissions",
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("permission_id", sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(["user_id"], ["users.id"], ondelete="CASCADE"),
+        sa.ForeignKeyConstraint(["permission_id"], ["permissions.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("user_id", "permission_id"),
+    )
+    op.create_index(
+        "ix_user_effective_permissions_permission_id",
+        "user_effective_permissions",
+        ["permission_id"],
+    )
+    op.execute(
+        "INSERT INTO user_effective_permissions (user_id, permission_id) "
+        "SELECT DISTINCT ur.user_id, rp.permission_id "
+        "FROM user_roles ur JOIN role_permissions rp ON rp.role_id = ur.role_id"
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_user_effective_permissions_permission_id", table_name="user_effective_permissions")
+    op.drop_table("user_effective_permissions")
@@ -0,0 +1,27 @@
+"""session_device_class
+
+Revision ID: c7a2e5d9f413
+Revises: b58d3f1a6c27
+Create Date: 2026-10-19 12:00:00
+
+Adiciona refresh_tokens.device_class (desktop | mobile | tablet | bot | other), preenchida
+junto com device_name no login/refresh. Sessões anteriores ficam sem classificação até
+expirarem (no máximo REFRESH_TOKEN_EXPIRE_DAYS).
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+revision: str = "c7a2e5d9f413"
+down_revision: Union[str, None] = "b58d3f1a6c27"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("refresh_tokens", sa.Column("device_class", sa.String(length=20), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column("refresh_tokens", "device_class")
@@ -0,0 +1,53 @@
+"""audit_rollups
+
+Revision ID: c9f5a1b3e7d4
+Revises: b8e4f0a2d6c3
+Create Date: 2026-10-19 18:00:00
+
+Tabelas de rollup de audit_logs (GET /audit-logs/stats): contagens por (hora, action,
+result) e por (dia, usuário), e a marca d'água do job incremental. As tabelas nascem
+vazias; o backfill é feito pelo próprio job (a marca d'água começa em 0 e avança em
+lotes de AUDIT_ROLLUP_BATCH_SIZE) ou por scripts/rebuild_audit_rollups.py.
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+revision: str = "c9f5a1b3e7d4"
+down_revision: Union[str, None] = "b8e4f0a2d6c3"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "audit_hourly_counts",
+        sa.Column("bucket", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("action_id", sa.SmallInteger(), nullable=False),
+        sa.Column("result_id", sa.SmallInteger(), nullable=False),
+        sa.Column("count", sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(["action_id"], ["audit_actions.id"]),
+        sa.ForeignKeyConstraint(["result_id"], ["audit_results.id"]),
+        sa.PrimaryKeyConstraint("bucket", "action_id", "result_id"),
+    )
+    op.create_table(
+        "audit_daily_user_counts",
+        sa.Column("day", sa.Date(), nullable=False),
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("count", sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint("day", "user_id"),
+    )
+    op.create_table(
+        "audit_rollup_state",
+        sa.Column("name", sa.String(length=50), nullable=False),
+        sa.Column("last_audit_log_id", sa.Integer(), nullable=False),
+        sa.Column("rolled_up_to", sa.DateTime(timezone=True), nullable=True),
+        sa.PrimaryKeyConstraint("name"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("audit_rollup_state")
+    op.drop_table("audit_daily_user_counts")
+    op.drop_table("audit_hourly_counts")
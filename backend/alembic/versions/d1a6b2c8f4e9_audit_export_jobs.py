@@ -0,0 +1,62 @@
+"""audit_export_jobs
+
+Revision ID: d1a6b2c8f4e9
+Revises: c9f5a1b3e7d4
+Create Date: 2026-10-19 20:00:00
+
+Fila dos exports de audit_logs em segundo plano (POST /audit-logs/exports). O índice
+único parcial em params_hash deduplica pedidos idênticos enquanto o job está na fila ou
+rodando.
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+revision: str = "d1a6b2c8f4e9"
+down_revision: Union[str, None] = "c9f5a1b3e7d4"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+_ACTIVE = sa.text("status IN ('queued', 'running')")
+
+
+def upgrade() -> None:
+    op.create_table(
+        "audit_export_jobs",
+        sa.Column("id", sa.String(length=32), nullable=False),
+        sa.Column("params_hash", sa.String(length=64), nullable=False),
+        sa.Column("params", sa.JSON(), nullable=False),
+        sa.Column("status", sa.String(length=10), nullable=False),
+        sa.Column("created_by", sa.Integer(), nullable=True),
+        sa.Column("rows_written", sa.Integer(), nullable=False),
+        sa.Column("rows_estimated", sa.Integer(), nullable=True),
+        sa.Column("file_size", sa.BigInteger(), nullable=True),
+        sa.Column("error", sa.String(length=500), nullable=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("started_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("heartbeat_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("finished_at", sa.DateTime(timezone=True), nullable=True),
+        sa.ForeignKeyConstraint(["created_by"], ["users.id"], ondelete="SET NULL"),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(
+        "ux_audit_export_jobs_active_params",
+        "audit_export_jobs",
+        ["params_hash"],
+        unique=True,
+        postgresql_where=_ACTIVE,
+        sqlite_where=_ACTIVE,
+    )
+    op.create_index(
+        "ix_audit_export_jobs_status_created",
+        "audit_export_jobs",
+        ["status", "created_at"],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_audit_export_jobs_status_created", table_name="audit_export_jobs")
+    op.drop_index("ux_audit_export_jobs_active_params", table_name="audit_export_jobs")
+    op.drop_table("audit_export_jobs")
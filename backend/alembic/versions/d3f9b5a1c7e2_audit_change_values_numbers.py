@@ -0,0 +1,46 @@
+"""audit_change_values_numbers
+
+Revision ID: d3f9b5a1c7e2
+Revises: a1c7e3f9b5d8
+Create Date: 2026-10-20 03:00:00
+
+Normaliza em audit_change_values os números inteiros gravados como float (2.0 -> 2),
+como log_event passou a gravar: no JSONB 2 e 2.0 são iguais, e o filtro changes_contains
+do fallback compara o texto. No Postgres a tabela fica vazia.
+"""
+import json
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+revision: str = "d3f9b5a1c7e2"
+down_revision: Union[str, None] = "a1c7e3f9b5d8"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    if op.get_context().as_sql or op.get_bind().dialect.name == "postgresql":
+        return
+    bind = op.get_bind()
+    rows = bind.execute(
+        sa.text(
+            "SELECT audit_log_id, path, value FROM audit_change_values "
+            "WHERE value NOT LIKE '\"%' AND (value LIKE '%.%' OR value LIKE '%e%' OR value LIKE '%E%')"
+        )
+    ).all()
+    for audit_log_id, path, value in rows:
+        number = json.loads(value)
+        if isinstance(number, float) and number.is_integer():
+            bind.execute(
+                sa.text(
+                    "UPDATE audit_change_values SET value = :value "
+                    "WHERE audit_log_id = :audit_log_id AND path = :path"
+                ),
+                {"value": json.dumps(int(number)), "audit_log_id": audit_log_id, "path": path},
+            )
+
+
+def downgrade() -> None:
+    pass
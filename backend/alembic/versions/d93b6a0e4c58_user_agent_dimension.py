@@ -0,0 +1,100 @@
+"""user_agent_dimension
+
+Revision ID: d93b6a0e4c58
+Revises: c7a2e5d9f413
+Create Date: 2026-10-19 13:00:00
+
+Interna os User-Agents de audit_logs e refresh_tokens na tabela user_agents
+(uma linha por string distinta, busca pelo SHA-256) e troca a coluna user_agent
+dessas tabelas por user_agent_id. O backfill roda em lotes por faixa de id, para que
+cada UPDATE trabalhe sobre um conjunto limitado de linhas.
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+revision: str = "d93b6a0e4c58"
+down_revision: Union[str, None] = "c7a2e5d9f413"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+_TABLES = ("audit_logs", "refresh_tokens")
+_BATCH = 50_000
+_UA_HASH = "encode(sha256(convert_to({col}, 'UTF8')), 'hex')"
+
+
+def _id_ranges(table: str):
+    if op.get_context().as_sql:
+        # Modo offline (--sql): sem acesso aos dados, um lote único cobrindo tudo
+        yield 0, 2**31 - 1
+        return
+    bind = op.get_bind()
+    low, high = bind.execute(sa.text(f"SELECT min(id), max(id) FROM {table}")).one()
+    if low is None:
+        return
+    for start in range(low, high + 1, _BATCH):
+        yield start, start + _BATCH
+
+
+def upgrade() -> None:
+    op.create_table(
+        "user_agents",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("ua_hash", sa.String(length=64), nullable=False),
+        sa.Column("user_agent", sa.String(length=512), nullable=False),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("ua_hash"),
+    )
+    for table in _TABLES:
+        op.add_column(table, sa.Column("user_agent_id", sa.Integer(), nullable=True))
+        op.create_foreign_key(
+            f"fk_{table}_user_agent_id", table, "user_agents", ["user_agent_id"], ["id"]
+        )
+
+    for table in _TABLES:
+        for start, end in _id_ranges(table):
+            op.execute(
+                sa.text(
+                    f"""
+                    INSERT INTO user_agents (ua_hash, user_agent)
+                    SELECT DISTINCT {_UA_HASH.format(col="user_agent")}, user_agent
+                    FROM {table}
+                    WHERE id >= :start AND id < :end AND user_agent IS NOT NULL AND user_agent <> ''
+                    ON CONFLICT (ua_hash) DO NOTHING
+                    """
+                ).bindparams(start=start, end=end)
+            )
+            op.execute(
+                sa.text(
+                    f"""
+                    UPDATE {table} t
+                    SET user_agent_id = ua.id
+                    FROM user_agents ua
+                    WHERE t.id >= :start AND t.id < :end
+                      AND ua.ua_hash = {_UA_HASH.format(col="t.user_agent")}
+                    """
+                ).bindparams(start=start, end=end)
+            )
+
+    for table in _TABLES:
+        op.drop_column(table, "user_agent")
+
+
+def downgrade() -> None:
+    for table in _TABLES:
+        op.add_column(table, sa.Column("user_agent", sa.String(length=512), nullable=True))
+        for start, end in _id_ranges(table):
+            op.execute(
+                sa.text(
+                    f"""
+                    UPDATE {table} t
+                    SET user_agent = ua.user_agent
+                    FROM user_agents ua
+                    WHERE t.id >= :start AND t.id < :end AND ua.id = t.user_agent_id
+                    """
+                ).bindparams(start=start, end=end)
+            )
+        op.drop_constraint(f"fk_{table}_user_agent_id", table, type_="foreignkey")
+        op.drop_column(table, "user_agent_id")
+    op.drop_table("user_agents")
@@ -0,0 +1,32 @@
+"""audit_occurrence_count
+
+Revision ID: e3b7c9d1a5f0
+Revises: d1a6b2c8f4e9
+Create Date: 2026-10-19 21:00:00
+
+Contador de repetições em audit_logs para as actions agregadas (audit_aggregation_service):
+occurrence_count (1 para as linhas existentes; default constante, sem reescrever a tabela
+no Postgres 11+) e last_occurred_at.
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+revision: str = "e3b7c9d1a5f0"
+down_revision: Union[str, None] = "d1a6b2c8f4e9"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "audit_logs",
+        sa.Column("occurrence_count", sa.Integer(), server_default=sa.text("1"), nullable=False),
+    )
+    op.add_column("audit_logs", sa.Column("last_occurred_at", sa.DateTime(timezone=True), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column("audit_logs", "last_occurred_at")
+    op.drop_column("audit_logs", "occurrence_count")
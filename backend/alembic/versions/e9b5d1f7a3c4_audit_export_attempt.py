@@ -0,0 +1,26 @@
+"""audit_export_attempt
+
+Revision ID: e9b5d1f7a3c4
+Revises: c5e1a7f3b9d2
+Create Date: 2026-10-20 01:00:00
+
+Token da tentativa em audit_export_jobs: um worker que perdeu o job (requeue por falta
+de heartbeat) deixa de gravar progresso e resultado.
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+revision: str = "e9b5d1f7a3c4"
+down_revision: Union[str, None] = "c5e1a7f3b9d2"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("audit_export_jobs", sa.Column("attempt", sa.String(length=32), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column("audit_export_jobs", "attempt")
@@ -0,0 +1,126 @@
+"""audit_log_code_columns
+
+Revision ID: f2c9d6b8e1a3
+Revises: e6b1f4c8a2d7
+Create Date: 2026-10-19 15:00:00
+
+Troca action, result e resource_type de audit_logs (VARCHAR repetido em toda linha) por
+códigos SMALLINT que referenciam as tabelas audit_actions, audit_results e
+audit_resource_types. Os índices compostos passam a usar as colunas de código. O
+backfill roda em lotes por faixa de id.
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+revision: str = "f2c9d6b8e1a3"
+down_revision: Union[str, None] = "e6b1f4c8a2d7"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+_BATCH = 50_000
+
+# coluna texto -> (tabela de lookup, coluna de código, tamanho do texto, NOT NULL)
+_COLUMNS = {
+    "action": ("audit_actions", "action_id", 50, True),
+    "result": ("audit_results", "result_id", 20, True),
+    "resource_type": ("audit_resource_types", "resource_type_id", 50, False),
+}
+_INDEXES = {
+    "ix_audit_logs_action_created": "action",
+    "ix_audit_logs_result_created": "result",
+    "ix_audit_logs_resource_type_created": "resource_type",
+}
+
+
+def _id_ranges():
+    if op.get_context().as_sql:
+        # Modo offline (--sql): sem acesso aos dados, um lote único cobrindo tudo
+        yield 0, 2**31 - 1
+        return
+    bind = op.get_bind()
+    low, high = bind.execute(sa.text("SELECT min(id), max(id) FROM audit_logs")).one()
+    if low is None:
+        return
+    for start in range(low, high + 1, _BATCH):
+        yield start, start + _BATCH
+
+
+def _update_in_batches(assignments: str) -> None:
+    for start, end in _id_ranges():
+        op.execute(
+            sa.text(
+                f"UPDATE audit_logs t SET {assignments} WHERE t.id >= :start AND t.id < :end"
+            ).bindparams(start=start, end=end)
+        )
+
+
+def upgrade() -> None:
+    for column, (table, code_column, length, _) in _COLUMNS.items():
+        op.create_table(
+            table,
+            sa.Column("id", sa.SmallInteger(), nullable=False),
+            sa.Column("name", sa.String(length=length), nullable=False),
+            sa.PrimaryKeyConstraint("id"),
+            sa.UniqueConstraint("name"),
+        )
+        op.execute(
+            f"INSERT INTO {table} (name) SELECT DISTINCT {column} FROM audit_logs "
+            f"WHERE {column} IS NOT NULL ORDER BY 1"
+        )
+        op.add_column("audit_logs", sa.Column(code_column, sa.SmallInteger(), nullable=True))
+        op.create_foreign_key(
+            f"fk_audit_logs_{code_column}", "audit_logs", table, [code_column], ["id"]
+        )
+
+    _update_in_batches(
+        ", ".join(
+            f"{code_column} = (SELECT l.id FROM {table} l WHERE l.name = t.{column})"
+            for column, (table, code_column, _, _) in _COLUMNS.items()
+        )
+    )
+
+    op.drop_index("ix_audit_logs_action", table_name="audit_logs")
+    for index in _INDEXES:
+        if index != "ix_audit_logs_action_created":
+            op.drop_index(index, table_name="audit_logs")
+    for column, (_, code_column, _, not_null) in _COLUMNS.items():
+        if not_null:
+            op.alter_column("audit_logs", code_column, nullable=False)
+        op.drop_column("audit_logs", column)
+    for index, column in _INDEXES.items():
+        op.create_index(
+            index, "audit_logs", [_COLUMNS[column][1], sa.text("created_at DESC")], unique=False
+        )
+
+
+def downgrade() -> None:
+    for index in _INDEXES:
+        op.drop_index(index, table_name="audit_logs")
+    for column, (_, _, length, _) in _COLUMNS.items():
+        op.add_column("audit_logs", sa.Column(column, sa.String(length=length), nullable=True))
+
+    _update_in_batches(
+        ", ".join(
+            f"{column} = (SELECT l.name FROM {table} l WHERE l.id = t.{code_column})"
+            for column, (table, code_column, _, _) in _COLUMNS.items()
+        )
+    )
+
+    for column, (table, code_column, _, not_null) in _COLUMNS.items():
+        if not_null:
+            op.alter_column("audit_logs", column, nullable=False)
+        op.drop_constraint(f"fk_audit_logs_{code_column}", "audit_logs", type_="foreignkey")
+        op.drop_column("audit_logs", code_column)
+        op.drop_table(table)
+    op.create_index("ix_audit_logs_action", "audit_logs", ["action"], unique=False)
+    op.create_index(
+        "ix_audit_logs_result_created", "audit_logs", ["result", sa.text("created_at DESC")], unique=False
+    )
+    op.create_index(
+        "ix_audit_logs_resource_type_created",
+        "audit_logs",
+        ["resource_type", sa.text("created_at DESC")],
+        unique=False,
+    )
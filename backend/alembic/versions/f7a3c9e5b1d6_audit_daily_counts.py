@@ -0,0 +1,45 @@
+"""audit_daily_counts
+
+Revision ID: f7a3c9e5b1d6
+Revises: d3f9b5a1c7e2
+Create Date: 2026-10-20 04:00:00
+
+Rollup diário por (dia UTC, action, result) para GET /audit-logs/stats?interval=day,
+que somava em Python as linhas horárias da janela (até 366 dias × 24 horas × pares).
+Preenchido a partir de audit_hourly_counts (mesmos eventos, já agregados).
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+revision: str = "f7a3c9e5b1d6"
+down_revision: Union[str, None] = "d3f9b5a1c7e2"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "audit_daily_counts",
+        sa.Column("day", sa.Date(), nullable=False),
+        sa.Column("action_id", sa.SmallInteger(), nullable=False),
+        sa.Column("result_id", sa.SmallInteger(), nullable=False),
+        sa.Column("count", sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(["action_id"], ["audit_actions.id"]),
+        sa.ForeignKeyConstraint(["result_id"], ["audit_results.id"]),
+        sa.PrimaryKeyConstraint("day", "action_id", "result_id"),
+    )
+    if op.get_context().dialect.name == "postgresql":
+        day = "(bucket AT TIME ZONE 'UTC')::date"
+    else:
+        day = "date(bucket)"
+    op.execute(
+        "INSERT INTO audit_daily_counts (day, action_id, result_id, count) "
+        f"SELECT {day}, action_id, result_id, sum(count) FROM audit_hourly_counts "
+        f"GROUP BY {day}, action_id, result_id"
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("audit_daily_counts")
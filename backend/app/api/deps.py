@@ -1,11 +1,12 @@
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
 from sqlalchemy import select
-from sqlalchemy.orm import Session, selectinload
+from sqlalchemy.orm import Session, lazyload
 
 from app.core.security import decode_access_token
 from app.db.session import get_db
-from app.models import Role, User
+from app.models import User
+from app.services import effective_permission_service, last_seen_service
 from app.services.jwt_blacklist_service import is_token_blacklisted
 
 bearer_scheme = HTTPBearer(auto_error=False)
@@ -32,7 +33,7 @@ def get_current_user(
         )
 
     jti = payload.get("jti")
-    if jti and is_token_blacklisted(jti):
+    if jti and is_token_blacklisted(jti, payload.get("sid")):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Token revogado. Faça login novamente.",
@@ -44,7 +45,8 @@ def get_current_user(
     user = db.execute(
         select(User)
         .where(User.email == email, User.deleted_at.is_(None))
-        .options(selectinload(User.roles).selectinload(Role.permissions))
+        # Permissões vêm de user_effective_permissions; roles só carregam se usados
+        .options(lazyload(User.roles))
     ).scalar_one_or_none()
 
     if not user or not user.is_active:
@@ -53,6 +55,7 @@ def get_current_user(
             detail="Usuário inativo ou não encontrado",
         )
 
+    last_seen_service.touch(payload.get("sid"))
     return user
 
 
@@ -62,13 +65,8 @@ def require_permission(permission_name: str):
     Uso: _=Depends(require_permission("users:read"))
     """
 
-    def _check(user: User = Depends(get_current_user)) -> User:
-        user_permissions = {
-            perm.name
-            for role in user.roles
-            for perm in role.permissions
-        }
-        if permission_name not in user_permissions:
+    def _check(user: User = Depends(get_current_user), db: Session = Depends(get_db)) -> User:
+        if not effective_permission_service.has_permission(db, user.id, permission_name):
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail=f"Permissão insuficiente: '{permission_name}' é necessária",
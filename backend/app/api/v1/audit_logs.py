@@ -1,20 +1,34 @@
 # app/api/v1/audit_logs.py
 
+import asyncio
 import csv
 import io
 from datetime import datetime
 from typing import Optional
 
-from fastapi import APIRouter, Depends, Query
-from fastapi.responses import StreamingResponse
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, Response, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import FileResponse, ORJSONResponse, StreamingResponse
 from sqlalchemy.orm import Session
 
 from app.api.deps import get_db, require_permission
-from app.schemas.audit import AuditLogListResponse, AuditLogOut
+from app.core.config import settings
+from app.models import AuditExportJob, User
+from app.schemas.audit import (
+    AuditExportCreate,
+    AuditExportJobOut,
+    AuditLogListResponse,
+    AuditStatsResponse,
+    audit_log_payload,
+)
+from app.services import audit_export_service, audit_stream_service
+from app.services.audit_rollup_service import get_stats
 from app.services.audit_service import list_audit_logs
 
 router = APIRouter(prefix="/audit-logs", tags=["audit-logs"])
 
+_MATCH_PATTERN = "^(exact|prefix|contains)$"
+
 
 @router.get("/", response_model=AuditLogListResponse)
 def get_audit_logs(
@@ -25,31 +39,158 @@ def get_audit_logs(
     result: Optional[str] = Query(None),
     date_from: Optional[datetime] = Query(None),
     date_to: Optional[datetime] = Query(None),
+    cidr: Optional[str] = Query(None, max_length=49, description="Rede de origem, ex.: 203.0.113.0/24"),
+    changes_contains: Optional[str] = Query(
+        None, max_length=300, description="Predicado caminho=valor sobre changes, ex.: after.is_active=false"
+    ),
+    email_match: str = Query("contains", pattern=_MATCH_PATTERN, description="Modo do filtro user_email"),
+    action_match: str = Query("contains", pattern=_MATCH_PATTERN, description="Modo do filtro action"),
     skip: int = Query(0, ge=0),
     limit: int = Query(50, ge=1, le=200),
     db: Session = Depends(get_db),
     _=Depends(require_permission("audit:read")),
 ):
-    items, total = list_audit_logs(
-        db,
-        user_id=user_id,
-        user_email=user_email,
-        action=action,
-        resource_type=resource_type,
-        result=result,
-        date_from=date_from,
-        date_to=date_to,
-        skip=skip,
-        limit=limit,
+    try:
+        items, total = list_audit_logs(
+            db,
+            user_id=user_id,
+            user_email=user_email,
+            action=action,
+            resource_type=resource_type,
+            result=result,
+            date_from=date_from,
+            date_to=date_to,
+            cidr=cidr,
+            changes_contains=changes_contains,
+            email_match=email_match,
+            action_match=action_match,
+            skip=skip,
+            limit=limit,
+        )
+    except ValueError as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc))
+    return ORJSONResponse(
+        {
+            "items": [audit_log_payload(x) for x in items],
+            "total": total,
+            "skip": skip,
+            "limit": limit,
+        }
     )
-    return AuditLogListResponse(
-        items=[AuditLogOut.model_validate(x) for x in items],
-        total=total,
-        skip=skip,
-        limit=limit,
+
+
+@router.get("/stream")
+async def stream_audit_logs(
+    request: Request,
+    user_id: Optional[int] = Query(None),
+    user_email: Optional[str] = Query(None),
+    action: Optional[str] = Query(None),
+    resource_type: Optional[str] = Query(None),
+    result: Optional[str] = Query(None),
+    cidr: Optional[str] = Query(None, max_length=49, description="Rede de origem, ex.: 203.0.113.0/24"),
+    changes_contains: Optional[str] = Query(
+        None, max_length=300, description="Predicado caminho=valor sobre changes, ex.: after.is_active=false"
+    ),
+    email_match: str = Query("contains", pattern=_MATCH_PATTERN, description="Modo do filtro user_email"),
+    action_match: str = Query("contains", pattern=_MATCH_PATTERN, description="Modo do filtro action"),
+    last_event_id: Optional[str] = Header(None, alias="Last-Event-ID", max_length=40),
+    _=Depends(require_permission("audit:read")),
+):
+    """
+    Tail ao vivo (Server-Sent Events) dos eventos gravados a partir de agora, com os
+    mesmos filtros da listagem. Na reconexão o navegador envia Last-Event-ID e os eventos
+    ainda retidos no stream são reenviados. Um cliente lento perde os eventos mais
+    antigos e recebe um evento `dropped` com a quantidade.
+    """
+    try:
+        event_filter = audit_stream_service.build_event_filter(
+            user_id=user_id,
+            user_email=user_email,
+            action=action,
+            resource_type=resource_type,
+            result=result,
+            cidr=cidr,
+            changes_contains=changes_contains,
+            email_match=email_match,
+            action_match=action_match,
+        )
+    except ValueError as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc))
+
+    subscription = audit_stream_service.hub.subscribe(event_filter, asyncio.get_running_loop())
+    replay = audit_stream_service.Replay([], 0, None)
+    if last_event_id:
+        # XRANGE no Redis é bloqueante: fora do event loop
+        try:
+            replay = await run_in_threadpool(audit_stream_service.replay_since, last_event_id, event_filter)
+        except BaseException:
+            audit_stream_service.hub.unsubscribe(subscription)
+            raise
+
+    async def events():
+        try:
+            if replay.dropped:
+                yield f"event: dropped\ndata: {replay.dropped}\n\n".encode()
+            for stream_id, payload in replay.events:
+                yield audit_stream_service.format_sse(stream_id, payload)
+            while not await request.is_disconnected():
+                try:
+                    await asyncio.wait_for(
+                        subscription.ready.wait(), timeout=settings.audit_stream_keepalive_seconds
+                    )
+                except asyncio.TimeoutError:
+                    yield b": keepalive\n\n"
+                    continue
+                items, dropped = subscription.drain()
+                if dropped:
+                    yield f"event: dropped\ndata: {dropped}\n\n".encode()
+                for stream_id, payload in items:
+                    # Publicado entre a assinatura e o XRANGE: já saiu no replay
+                    if not replay.covers(stream_id):
+                        yield audit_stream_service.format_sse(stream_id, payload)
+        finally:
+            audit_stream_service.hub.unsubscribe(subscription)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
     )
 
 
+@router.get("/stats", response_model=AuditStatsResponse)
+def get_audit_stats(
+    by: str = Query("action", pattern="^(action|user)$"),
+    interval: str = Query("hour", pattern="^(hour|day)$"),
+    date_from: Optional[datetime] = Query(None, description="Padrão: 24h (hour) ou 30 dias (day) antes de date_to"),
+    date_to: Optional[datetime] = Query(None),
+    action: Optional[str] = Query(None, description="Trecho de action"),
+    result: Optional[str] = Query(None),
+    user_id: Optional[int] = Query(None),
+    db: Session = Depends(get_db),
+    _=Depends(require_permission("audit:read")),
+):
+    """
+    Séries temporais para o dashboard, lidas dos rollups pré-agregados (não varre
+    audit_logs): eventos por hora/dia e action/result (by=action) ou por dia e usuário
+    (by=user).
+    """
+    try:
+        stats = get_stats(
+            db,
+            by=by,
+            interval=interval,
+            date_from=date_from,
+            date_to=date_to,
+            action=action,
+            result=result,
+            user_id=user_id,
+        )
+    except ValueError as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc))
+    return ORJSONResponse(stats)
+
+
 @router.get("/export")
 def export_audit_logs_csv(
     user_id: Optional[int] = Query(None),
@@ -59,54 +200,41 @@ def export_audit_logs_csv(
     result: Optional[str] = Query(None),
     date_from: Optional[datetime] = Query(None),
     date_to: Optional[datetime] = Query(None),
+    cidr: Optional[str] = Query(None, max_length=49, description="Rede de origem, ex.: 203.0.113.0/24"),
+    changes_contains: Optional[str] = Query(
+        None, max_length=300, description="Predicado caminho=valor sobre changes, ex.: after.is_active=false"
+    ),
+    email_match: str = Query("contains", pattern=_MATCH_PATTERN, description="Modo do filtro user_email"),
+    action_match: str = Query("contains", pattern=_MATCH_PATTERN, description="Modo do filtro action"),
     db: Session = Depends(get_db),
     _=Depends(require_permission("audit:read")),
 ):
-    """Exporta até 10.000 registros em CSV."""
-    items, _ = list_audit_logs(
-        db,
-        user_id=user_id,
-        user_email=user_email,
-        action=action,
-        resource_type=resource_type,
-        result=result,
-        date_from=date_from,
-        date_to=date_to,
-        skip=0,
-        limit=10_000,
-    )
+    """Exporta até 10.000 registros em CSV. Para extrações maiores use POST /audit-logs/exports."""
+    try:
+        items, _ = list_audit_logs(
+            db,
+            user_id=user_id,
+            user_email=user_email,
+            action=action,
+            resource_type=resource_type,
+            result=result,
+            date_from=date_from,
+            date_to=date_to,
+            cidr=cidr,
+            changes_contains=changes_contains,
+            email_match=email_match,
+            action_match=action_match,
+            skip=0,
+            limit=10_000,
+        )
+    except ValueError as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc))
 
     output = io.StringIO()
     writer = csv.writer(output)
-    writer.writerow(
-        [
-            "id",
-            "created_at",
-            "user_id",
-            "user_email",
-            "action",
-            "resource_type",
-            "resource_id",
-            "result",
-            "ip_address",
-            "detail",
-        ]
-    )
+    writer.writerow(audit_export_service.CSV_HEADER)
     for log in items:
-        writer.writerow(
-            [
-                log.id,
-                log.created_at.isoformat(),
-                log.user_id,
-                log.user_email,
-                log.action,
-                log.resource_type,
-                log.resource_id,
-                log.result,
-                log.ip_address,
-                log.detail,
-            ]
-        )
+        writer.writerow(audit_export_service.csv_row(log))
 
     output.seek(0)
     return StreamingResponse(
@@ -114,3 +242,63 @@ def export_audit_logs_csv(
         media_type="text/csv",
         headers={"Content-Disposition": "attachment; filename=audit_logs.csv"},
     )
+
+
+def _export_job_out(job: AuditExportJob) -> AuditExportJobOut:
+    out = AuditExportJobOut.model_validate(job)
+    if job.status == "done":
+        out.download_url = f"{settings.api_v1_prefix}/audit-logs/exports/{job.id}/download"
+    return out
+
+
+@router.post("/exports", response_model=AuditExportJobOut, status_code=status.HTTP_202_ACCEPTED)
+def create_audit_export(
+    payload: AuditExportCreate,
+    response: Response,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_permission("audit:read")),
+):
+    """
+    Enfileira um export em segundo plano (CSV gzip) com os filtros da listagem, sem
+    limite de registros. Um pedido idêntico a um job ainda na fila ou rodando devolve
+    esse job (200). Acompanhe em GET /audit-logs/exports/{id}.
+    """
+    try:
+        job, created = audit_export_service.request_export(
+            db, payload.model_dump(mode="json"), user_id=current_user.id
+        )
+    except ValueError as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc))
+    if not created:
+        response.status_code = status.HTTP_200_OK
+    return _export_job_out(job)
+
+
+@router.get("/exports/{job_id}", response_model=AuditExportJobOut)
+def get_audit_export(
+    job_id: str,
+    db: Session = Depends(get_db),
+    _=Depends(require_permission("audit:read")),
+):
+    """Status e progresso do export; download_url quando concluído."""
+    job = db.get(AuditExportJob, job_id)
+    if job is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Export não encontrado")
+    return _export_job_out(job)
+
+
+@router.get("/exports/{job_id}/download")
+def download_audit_export(
+    job_id: str,
+    db: Session = Depends(get_db),
+    _=Depends(require_permission("audit:read")),
+):
+    job = db.get(AuditExportJob, job_id)
+    if job is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Export não encontrado")
+    if job.status != "done":
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Export ainda não concluído")
+    path = audit_export_service.file_path(job)
+    if not path.exists():
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Arquivo do export expirado")
+    return FileResponse(path, media_type="application/gzip", filename=path.name)
@@ -1,5 +1,3 @@
-from datetime import datetime, timezone
-
 from fastapi import APIRouter, Depends, Header, HTTPException, Request, status
 from pydantic import BaseModel, model_validator
 from sqlalchemy import select
@@ -8,16 +6,15 @@ from sqlalchemy.orm import Session
 from app.api.deps import get_current_user
 from app.core.config import settings
 from app.db.session import get_db
-from app.models import User, RefreshToken
-from app.services import audit_service, lockout_service
+from app.models import User
+from app.services import audit_service, auth_service, lockout_service, session_service
 from app.core.security import (
     create_access_token,
     decode_access_token,
+    session_id_for,
     verify_password,
-    generate_refresh_token,
-    refresh_token_expires_at,
 )
-from app.services.jwt_blacklist_service import blacklist_token
+from app.services.jwt_blacklist_service import blacklist_sessions, blacklist_token
 from slowapi import Limiter
 from slowapi.util import get_remote_address
 
@@ -132,71 +129,41 @@ def login(request: Request, data: LoginIn, db: Session = Depends(get_db)):
     # Login bem-sucedido: zera contador e registra
     lockout_service.reset_lockout(db, user)
 
-    raw_refresh = generate_refresh_token()
-    expires_at = refresh_token_expires_at()
-    ip = _extract_ip(request)
-    ua = _extract_ua(request)
-
-    rt = RefreshToken(
-        token_id=raw_refresh,
-        user_id=user.id,
-        expires_at=expires_at,
-        revoked=False,
-        ip_address=ip,
-        user_agent=ua,
+    evicted = session_service.enforce_session_cap(db, user.id)
+    raw_refresh = session_service.create_session(
+        db, user.id, ip_address=_extract_ip(request), user_agent=_extract_ua(request)
     )
-    db.add(rt)
-    access = create_access_token(user.email)
+    access = create_access_token(user.email, raw_refresh)
 
     audit_service.log_event(
         db, action="login.success", result="success",
         user_id=user.id, user_email=user.email,
+        changes={"evicted_sessions": len(evicted)} if evicted else None,
         request=request,
     )
     db.commit()
 
+    if evicted:
+        try:
+            blacklist_sessions(session_id_for(token_id) for token_id in evicted)
+        except Exception:
+            pass
+
     return TokenOut(access_token=access, refresh_token=raw_refresh)
 
 
 @router.post("/refresh", response_model=TokenOut)
 @limiter.limit("10/minute")
 def refresh(request: Request, data: RefreshIn, db: Session = Depends(get_db)):
-    rt: RefreshToken | None = db.execute(
-        select(RefreshToken).where(RefreshToken.token_id == data.refresh_token)
-    ).scalar_one_or_none()
-
-    if not rt or rt.revoked:
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid refresh token")
-
-    now = datetime.now(timezone.utc)
-    expires = rt.expires_at if rt.expires_at.tzinfo else rt.expires_at.replace(tzinfo=timezone.utc)
-    if expires < now:
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Expired refresh token")
-
-    user: User | None = db.execute(
-        select(User).where(User.id == rt.user_id)
-    ).scalar_one_or_none()
-    if not user or not user.is_active:
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid user")
-
-    rt.revoked = True
-    new_refresh = generate_refresh_token()
-    new_expires = refresh_token_expires_at()
-    ip = _extract_ip(request)
-    ua = _extract_ua(request)
-
-    new_rt = RefreshToken(
-        token_id=new_refresh,
-        user_id=user.id,
-        expires_at=new_expires,
-        revoked=False,
-        ip_address=ip,
-        user_agent=ua,
-    )
-    db.add(new_rt)
-    db.commit()
-
-    access = create_access_token(user.email)
+    try:
+        access, new_refresh = auth_service.rotate_refresh_token(
+            db,
+            data.refresh_token,
+            ip_address=_extract_ip(request),
+            user_agent=_extract_ua(request),
+        )
+    except ValueError as exc:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail=str(exc))
     return TokenOut(access_token=access, refresh_token=new_refresh)
 
 
@@ -225,18 +192,15 @@ def logout(
         except ValueError:
             pass
 
-    rt: RefreshToken | None = db.execute(
-        select(RefreshToken).where(RefreshToken.token_id == data.refresh_token)
-    ).scalar_one_or_none()
+    user_id = session_service.end_session(db, data.refresh_token)
 
-    if rt:
+    if user_id is not None:
         audit_service.log_event(
             db, action="logout", result="success",
-            user_id=rt.user_id,
+            user_id=user_id,
             resource_type="session", resource_id=data.refresh_token,
             request=request,
         )
-        rt.revoked = True
         db.commit()
 
     return {"ok": True}
@@ -261,11 +225,7 @@ def logout_all(
         except ValueError:
             pass
 
-    tokens = db.scalars(
-        select(RefreshToken).where(RefreshToken.user_id == user.id)
-    ).all()
-    for rt in tokens:
-        rt.revoked = True
+    session_service.revoke_all_user_sessions(db, user.id)
 
     audit_service.log_event(
         db, action="logout.all", result="success",
@@ -1,12 +1,13 @@
 from fastapi import APIRouter, Depends, HTTPException, Request, status
 from pydantic import BaseModel
 from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 
 from app.api.deps import require_permission
-from app.db.session import get_db
+from app.db.session import get_db, unit_of_work
 from app.models import Permission, User
-from app.services import audit_service
+from app.services import audit_service, response_cache_service
 
 router = APIRouter()
 
@@ -31,10 +32,19 @@ class PermissionUpdate(BaseModel):
 
 @router.get("/", response_model=list[PermissionOut])
 def list_permissions(
+    request: Request,
     db: Session = Depends(get_db),
     _=Depends(require_permission("permissions:read")),
 ):
-    return db.execute(select(Permission).order_by(Permission.id.asc())).scalars().all()
+    return response_cache_service.cached_json_response(
+        request,
+        scope=("permissions:list",),
+        version_keys=(response_cache_service.RBAC_VERSION_KEY,),
+        build=lambda: [
+            PermissionOut.model_validate(p).model_dump()
+            for p in db.execute(select(Permission).order_by(Permission.id.asc())).scalars().all()
+        ],
+    )
 
 
 @router.post("/", response_model=PermissionOut, status_code=status.HTTP_201_CREATED)
@@ -44,22 +54,21 @@ def create_permission(
     db: Session = Depends(get_db),
     current_user: User = Depends(require_permission("permissions:create")),
 ):
-    exists = db.execute(select(Permission).where(Permission.name == data.name)).scalar_one_or_none()
-    if exists:
+    try:
+        with unit_of_work(db):
+            perm = Permission(name=data.name, description=data.description, created_by=current_user.id)
+            db.add(perm)
+            db.flush()
+            audit_service.log_event(
+                db, action="permission.create", result="success",
+                user_id=current_user.id, user_email=current_user.email,
+                resource_type="permission", resource_id=perm.id,
+                changes={"after": {"name": perm.name, "description": perm.description}},
+                request=request,
+            )
+    except IntegrityError:
         raise HTTPException(status_code=400, detail="Permission already exists")
-
-    perm = Permission(name=data.name, description=data.description, created_by=current_user.id)
-    db.add(perm)
-    db.commit()
-    db.refresh(perm)
-    audit_service.log_event(
-        db, action="permission.create", result="success",
-        user_id=current_user.id, user_email=current_user.email,
-        resource_type="permission", resource_id=perm.id,
-        changes={"after": {"name": perm.name, "description": perm.description}},
-        request=request,
-    )
-    db.commit()
+    response_cache_service.bump_rbac_version()
     return perm
 
 
@@ -75,20 +84,19 @@ def update_permission(
     if not perm:
         raise HTTPException(status_code=404, detail="Permission not found")
 
-    before = {"name": perm.name, "description": perm.description}
-    perm.description = data.description
-    perm.updated_by = current_user.id
-    db.commit()
-    db.refresh(perm)
-    after = {"name": perm.name, "description": perm.description}
-    audit_service.log_event(
-        db, action="permission.update", result="success",
-        user_id=current_user.id, user_email=current_user.email,
-        resource_type="permission", resource_id=perm.id,
-        changes={"before": before, "after": after},
-        request=request,
-    )
-    db.commit()
+    with unit_of_work(db):
+        before = {"name": perm.name, "description": perm.description}
+        perm.description = data.description
+        perm.updated_by = current_user.id
+        after = {"name": perm.name, "description": perm.description}
+        audit_service.log_event(
+            db, action="permission.update", result="success",
+            user_id=current_user.id, user_email=current_user.email,
+            resource_type="permission", resource_id=perm.id,
+            changes={"before": before, "after": after},
+            request=request,
+        )
+    response_cache_service.bump_rbac_version()
     return perm
 
 
@@ -103,12 +111,13 @@ def delete_permission(
     if not perm:
         raise HTTPException(status_code=404, detail="Permission not found")
 
-    audit_service.log_event(
-        db, action="permission.delete", result="success",
-        user_id=current_user.id, user_email=current_user.email,
-        resource_type="permission", resource_id=permission_id,
-        request=request,
-    )
-    db.delete(perm)
-    db.commit()
+    with unit_of_work(db):
+        audit_service.log_event(
+            db, action="permission.delete", result="success",
+            user_id=current_user.id, user_email=current_user.email,
+            resource_type="permission", resource_id=permission_id,
+            request=request,
+        )
+        db.delete(perm)
+    response_cache_service.bump_rbac_version()
     return {"ok": True}
@@ -1,12 +1,13 @@
 from fastapi import APIRouter, Depends, HTTPException, Request, status
 from pydantic import BaseModel
 from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 
 from app.api.deps import require_permission
-from app.db.session import get_db
+from app.db.session import get_db, unit_of_work
 from app.models import Role, User
-from app.services import audit_service
+from app.services import audit_service, response_cache_service
 
 router = APIRouter()
 
@@ -30,8 +31,20 @@ class RoleUpdate(BaseModel):
 
 
 @router.get("/", response_model=list[RoleOut])
-def list_roles(db: Session = Depends(get_db), _=Depends(require_permission("roles:read"))):
-    return db.execute(select(Role).order_by(Role.id.asc())).scalars().all()
+def list_roles(
+    request: Request,
+    db: Session = Depends(get_db),
+    _=Depends(require_permission("roles:read")),
+):
+    return response_cache_service.cached_json_response(
+        request,
+        scope=("roles:list",),
+        version_keys=(response_cache_service.RBAC_VERSION_KEY,),
+        build=lambda: [
+            RoleOut.model_validate(r).model_dump()
+            for r in db.execute(select(Role).order_by(Role.id.asc())).scalars().all()
+        ],
+    )
 
 
 @router.post("/", response_model=RoleOut, status_code=status.HTTP_201_CREATED)
@@ -41,22 +54,21 @@ def create_role(
     db: Session = Depends(get_db),
     current_user: User = Depends(require_permission("roles:create")),
 ):
-    exists = db.execute(select(Role).where(Role.name == data.name)).scalar_one_or_none()
-    if exists:
+    try:
+        with unit_of_work(db):
+            role = Role(name=data.name, description=data.description, created_by=current_user.id)
+            db.add(role)
+            db.flush()
+            audit_service.log_event(
+                db, action="role.create", result="success",
+                user_id=current_user.id, user_email=current_user.email,
+                resource_type="role", resource_id=role.id,
+                changes={"after": {"name": role.name, "description": role.description}},
+                request=request,
+            )
+    except IntegrityError:
         raise HTTPException(status_code=400, detail="Role already exists")
-
-    role = Role(name=data.name, description=data.description, created_by=current_user.id)
-    db.add(role)
-    db.commit()
-    db.refresh(role)
-    audit_service.log_event(
-        db, action="role.create", result="success",
-        user_id=current_user.id, user_email=current_user.email,
-        resource_type="role", resource_id=role.id,
-        changes={"after": {"name": role.name, "description": role.description}},
-        request=request,
-    )
-    db.commit()
+    response_cache_service.bump_rbac_version()
     return role
 
 
@@ -72,20 +84,19 @@ def update_role(
     if not role:
         raise HTTPException(status_code=404, detail="Role not found")
 
-    before = {"name": role.name, "description": role.description}
-    role.description = data.description
-    role.updated_by = current_user.id
-    db.commit()
-    db.refresh(role)
-    after = {"name": role.name, "description": role.description}
-    audit_service.log_event(
-        db, action="role.update", result="success",
-        user_id=current_user.id, user_email=current_user.email,
-        resource_type="role", resource_id=role.id,
-        changes={"before": before, "after": after},
-        request=request,
-    )
-    db.commit()
+    with unit_of_work(db):
+        before = {"name": role.name, "description": role.description}
+        role.description = data.description
+        role.updated_by = current_user.id
+        after = {"name": role.name, "description": role.description}
+        audit_service.log_event(
+            db, action="role.update", result="success",
+            user_id=current_user.id, user_email=current_user.email,
+            resource_type="role", resource_id=role.id,
+            changes={"before": before, "after": after},
+            request=request,
+        )
+    response_cache_service.bump_rbac_version()
     return role
 
 
@@ -100,12 +111,13 @@ def delete_role(
     if not role:
         raise HTTPException(status_code=404, detail="Role not found")
 
-    audit_service.log_event(
-        db, action="role.delete", result="success",
-        user_id=current_user.id, user_email=current_user.email,
-        resource_type="role", resource_id=role_id,
-        request=request,
-    )
-    db.delete(role)
-    db.commit()
+    with unit_of_work(db):
+        audit_service.log_event(
+            db, action="role.delete", result="success",
+            user_id=current_user.id, user_email=current_user.email,
+            resource_type="role", resource_id=role_id,
+            request=request,
+        )
+        db.delete(role)
+    response_cache_service.bump_rbac_version()
     return {"ok": True}
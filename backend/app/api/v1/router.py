@@ -1,6 +1,6 @@
 from fastapi import APIRouter
 
-from app.api.v1 import audit_logs, auth, users, roles, permissions, sessions
+from app.api.v1 import audit_logs, auth, users, roles, permissions, sessions, sync
 
 api_router = APIRouter()
 api_router.include_router(auth.router, prefix="/auth", tags=["auth"])
@@ -9,3 +9,4 @@ api_router.include_router(users.router, prefix="/users", tags=["users"])
 api_router.include_router(roles.router, prefix="/roles", tags=["roles"])
 api_router.include_router(permissions.router, prefix="/permissions", tags=["permissions"])
 api_router.include_router(audit_logs.router)
+api_router.include_router(sync.router)
@@ -1,21 +1,27 @@
 """API de gerenciamento de sessões."""
+import time
 from datetime import datetime
 from typing import Optional
 
 from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
-from pydantic import BaseModel
-from sqlalchemy import select
+from fastapi.responses import ORJSONResponse
+from pydantic import BaseModel, Field, field_validator, model_validator
 from sqlalchemy.orm import Session
 
 from app.api.deps import get_current_user, require_permission
+from app.core.config import settings
+from app.core.security import session_id_for
 from app.db.session import get_db
+from app.db.types import parse_network
 from app.models import User
-from app.models.rbac import RefreshToken
 from app.services import audit_service
+from app.services.jwt_blacklist_service import blacklist_sessions
 from app.services.session_service import (
-    get_all_sessions,
+    count_user_sessions,
     get_user_sessions,
+    list_active_sessions,
     revoke_session,
+    revoke_sessions_bulk,
 )
 
 router = APIRouter(prefix="/sessions", tags=["sessions"])
@@ -28,8 +34,10 @@ class SessionOut(BaseModel):
     ip_address: Optional[str] = None
     user_agent: Optional[str] = None
     device_name: Optional[str] = None
+    device_class: Optional[str] = None
     created_at: datetime
     expires_at: datetime
+    last_seen_at: Optional[datetime] = None
     is_current: bool = False
 
     model_config = {"from_attributes": True}
@@ -38,6 +46,38 @@ class SessionOut(BaseModel):
 class SessionListResponse(BaseModel):
     items: list[SessionOut]
     total: int
+    total_is_estimate: bool = False
+    next_cursor: Optional[str] = None
+
+
+class SessionCountOut(BaseModel):
+    active: int
+    limit: int
+
+
+class RevokeBulkIn(BaseModel):
+    """Critérios combinados com AND; ao menos um é obrigatório."""
+    user_ids: Optional[list[int]] = Field(None, max_length=10_000)
+    cidr: Optional[str] = Field(None, min_length=1, max_length=49, examples=["203.0.113.0/24"])
+    user_agent: Optional[str] = Field(None, min_length=1, max_length=200)
+
+    @field_validator("cidr")
+    @classmethod
+    def normalize_cidr(cls, value: Optional[str]) -> Optional[str]:
+        return str(parse_network(value)) if value else value
+
+    @model_validator(mode="after")
+    def require_criteria(self):
+        if not (self.user_ids or self.cidr or self.user_agent):
+            raise ValueError("Informe ao menos um critério: user_ids, cidr ou user_agent")
+        return self
+
+
+class RevokeBulkOut(BaseModel):
+    revoked: int
+    users_affected: int
+    access_tokens_invalidated: int
+    timings_ms: dict[str, float]
 
 
 @router.get("/", response_model=SessionListResponse)
@@ -56,43 +96,61 @@ def list_my_sessions(
             ip_address=s.ip_address,
             user_agent=s.user_agent,
             device_name=s.device_name,
+            device_class=s.device_class,
             created_at=s.created_at,
             expires_at=s.expires_at,
+            last_seen_at=s.last_seen_at,
         )
         for s in sessions
     ]
     return SessionListResponse(items=items, total=len(items))
 
 
+@router.get("/count", response_model=SessionCountOut)
+def count_my_sessions(
+    db: Session = Depends(get_db),
+    user: User = Depends(get_current_user),
+):
+    """Número de sessões ativas do usuário autenticado e o limite configurado (0 = sem limite)."""
+    return SessionCountOut(
+        active=count_user_sessions(db, user.id),
+        limit=settings.max_sessions_per_user,
+    )
+
+
 @router.get("/all", response_model=SessionListResponse)
 def list_all_sessions(
     request: Request,
-    skip: int = Query(0, ge=0),
     limit: int = Query(50, ge=1, le=200),
+    cursor: Optional[str] = Query(None, description="next_cursor da página anterior"),
+    user_id: Optional[int] = Query(None),
+    cidr: Optional[str] = Query(None, max_length=49, description="Rede, ex.: 203.0.113.0/24"),
+    user_agent: Optional[str] = Query(None, max_length=200, description="Trecho do User-Agent"),
+    device_class: Optional[str] = Query(None, pattern="^(desktop|mobile|tablet|bot|other)$"),
     db: Session = Depends(get_db),
     _=Depends(require_permission("sessions:read")),
 ):
-    """Lista todas as sessões ativas (requer sessions:read)."""
-    sessions, total = get_all_sessions(db, skip=skip, limit=limit)
-    user_ids = list({s.user_id for s in sessions})
-    users_map = {
-        u.id: u.email
-        for u in db.scalars(select(User).where(User.id.in_(user_ids))).all()
-    }
-    items = [
-        SessionOut(
-            token_id=s.token_id,
-            user_id=s.user_id,
-            user_email=users_map.get(s.user_id),
-            ip_address=s.ip_address,
-            user_agent=s.user_agent,
-            device_name=s.device_name,
-            created_at=s.created_at,
-            expires_at=s.expires_at,
+    """Lista todas as sessões ativas (requer sessions:read), paginadas por cursor."""
+    try:
+        items, next_cursor, total, is_estimate = list_active_sessions(
+            db,
+            limit=limit,
+            cursor=cursor,
+            user_id=user_id,
+            cidr=cidr,
+            user_agent=user_agent,
+            device_class=device_class,
         )
-        for s in sessions
-    ]
-    return SessionListResponse(items=items, total=total)
+    except ValueError as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc))
+    return ORJSONResponse(
+        {
+            "items": items,
+            "total": total,
+            "total_is_estimate": is_estimate,
+            "next_cursor": next_cursor,
+        }
+    )
 
 
 @router.delete("/{token_id}")
@@ -149,3 +207,55 @@ def admin_revoke_session(
     )
     db.commit()
     return {"ok": True, "message": "Sessão revogada."}
+
+
+@router.post("/revoke-bulk", response_model=RevokeBulkOut)
+def revoke_sessions_bulk_endpoint(
+    request: Request,
+    data: RevokeBulkIn,
+    db: Session = Depends(get_db),
+    user: User = Depends(require_permission("sessions:revoke")),
+):
+    """Revoga de uma vez todas as sessões ativas que atendem aos critérios (requer sessions:revoke)."""
+    started = time.perf_counter()
+    revoked = revoke_sessions_bulk(
+        db, user_ids=data.user_ids, cidr=data.cidr, user_agent=data.user_agent
+    )
+    updated = time.perf_counter()
+
+    users_affected = len({user_id for _, user_id in revoked})
+    audit_service.log_event(
+        db,
+        action="session.revoke.bulk",
+        result="success",
+        user_id=user.id,
+        user_email=user.email,
+        resource_type="session",
+        changes={
+            "criteria": data.model_dump(exclude_none=True),
+            "revoked": len(revoked),
+            "users_affected": users_affected,
+        },
+        request=request,
+    )
+    db.commit()
+    committed = time.perf_counter()
+
+    # Access tokens já emitidos continuam válidos até expirar; marca as sessões no Redis
+    try:
+        invalidated = blacklist_sessions(session_id_for(token_id) for token_id, _ in revoked)
+    except Exception:
+        invalidated = 0
+    finished = time.perf_counter()
+
+    return RevokeBulkOut(
+        revoked=len(revoked),
+        users_affected=users_affected,
+        access_tokens_invalidated=invalidated,
+        timings_ms={
+            "update": round((updated - started) * 1000, 2),
+            "audit_commit": round((committed - updated) * 1000, 2),
+            "redis": round((finished - committed) * 1000, 2),
+            "total": round((finished - started) * 1000, 2),
+        },
+    )
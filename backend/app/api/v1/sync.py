@@ -0,0 +1,49 @@
+"""Feed incremental de usuários e RBAC para serviços que espelham esses dados."""
+from typing import Any, Literal, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import ORJSONResponse
+from pydantic import BaseModel
+from sqlalchemy.orm import Session
+
+from app.api.deps import require_permission
+from app.core.config import settings
+from app.db.session import get_db
+from app.services.change_feed_service import CursorExpired, list_changes
+
+router = APIRouter(prefix="/sync", tags=["sync"])
+
+
+class ChangeOut(BaseModel):
+    version: int
+    entity: Literal["user", "role", "permission", "user_role", "role_permission"]
+    id: str
+    deleted: bool
+    data: Optional[dict[str, Any]] = None
+
+
+class ChangeListResponse(BaseModel):
+    changes: list[ChangeOut]
+    cursor: int
+    has_more: bool
+
+
+@router.get("/changes", response_model=ChangeListResponse)
+def get_changes(
+    since: int = Query(0, ge=0, description="cursor da resposta anterior (0 = carga completa)"),
+    limit: int = Query(1000, ge=1),
+    db: Session = Depends(get_db),
+    _=Depends(require_permission("sync:read")),
+):
+    """
+    Usuários, papéis, permissões e associações criados, alterados ou removidos depois de
+    `since`, em ordem de versão (requer sync:read). Com has_more=true, chame de novo com
+    o cursor devolvido. 410 quando o cursor é antigo demais: refazer com since=0.
+    """
+    try:
+        items, cursor, has_more = list_changes(
+            db, since=since, limit=min(limit, settings.sync_changes_max_limit)
+        )
+    except CursorExpired as exc:
+        raise HTTPException(status_code=status.HTTP_410_GONE, detail=str(exc))
+    return ORJSONResponse({"changes": items, "cursor": cursor, "has_more": has_more})
@@ -1,11 +1,26 @@
-from fastapi import APIRouter, Depends, Request, status
+import codecs
+import csv
+import json
+from collections.abc import AsyncIterator
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import ORJSONResponse
 from pydantic import BaseModel, field_validator
 from sqlalchemy.orm import Session
 
 from app.api.deps import get_db, get_current_user, require_permission
+from app.core.config import settings
 from app.models import User
-from app.schemas.user import UserCreate, UserOut, UserUpdate, _validate_password_strength
-from app.services import user_service
+from app.schemas.user import (
+    BulkUserImportResult,
+    UserCreate,
+    UserOut,
+    UserUpdate,
+    _validate_password_strength,
+    user_payload,
+)
+from app.services import effective_permission_service, response_cache_service, user_service
 
 router = APIRouter()
 
@@ -23,14 +38,22 @@ class SelfUpdate(BaseModel):
 
 
 @router.get("/me", response_model=UserOut)
-def me(user: User = Depends(get_current_user)):
-    return UserOut(
-        id=user.id,
-        email=user.email,
-        full_name=user.full_name,
-        is_active=user.is_active,
-        roles=sorted({r.name for r in user.roles}),
-        permissions=sorted({p.name for r in user.roles for p in r.permissions}),
+def me(
+    request: Request,
+    db: Session = Depends(get_db),
+    user: User = Depends(get_current_user),
+):
+    """Perfil do usuário autenticado, pré-serializado por versão e com suporte a ETag/304."""
+    return response_cache_service.cached_json_response(
+        request,
+        scope=("users:me", user.id),
+        version_keys=(
+            response_cache_service.user_version_key(user.id),
+            response_cache_service.RBAC_VERSION_KEY,
+        ),
+        build=lambda: user_payload(
+            user, effective_permission_service.permission_names(db, user.id)
+        ),
     )
 
 
@@ -50,14 +73,7 @@ def update_me(
         current_user=user,
         request=request,
     )
-    return UserOut(
-        id=u.id,
-        email=u.email,
-        full_name=u.full_name,
-        is_active=u.is_active,
-        roles=sorted({r.name for r in u.roles}),
-        permissions=sorted({p.name for r in u.roles for p in r.permissions}),
-    )
+    return UserOut(**user_payload(u, effective_permission_service.permission_names(db, u.id)))
 
 
 @router.get("/", response_model=list[UserOut])
@@ -65,18 +81,10 @@ def list_users(
     db: Session = Depends(get_db),
     _=Depends(require_permission("users:read")),
 ):
+    # Serializa direto para JSON: response_model fica só para a documentação OpenAPI
     users = user_service.list_users(db)
-    return [
-        UserOut(
-            id=u.id,
-            email=u.email,
-            full_name=u.full_name,
-            is_active=u.is_active,
-            roles=sorted({r.name for r in u.roles}),
-            permissions=sorted({p.name for r in u.roles for p in r.permissions}),
-        )
-        for u in users
-    ]
+    permissions = effective_permission_service.permissions_by_user(db, [u.id for u in users])
+    return ORJSONResponse([user_payload(u, permissions[u.id]) for u in users])
 
 
 @router.get("/{user_id}", response_model=UserOut)
@@ -86,14 +94,7 @@ def get_user(
     _=Depends(require_permission("users:read")),
 ):
     u = user_service.get_user_or_404(db, user_id)
-    return UserOut(
-        id=u.id,
-        email=u.email,
-        full_name=u.full_name,
-        is_active=u.is_active,
-        roles=sorted({r.name for r in u.roles}),
-        permissions=sorted({p.name for r in u.roles for p in r.permissions}),
-    )
+    return UserOut(**user_payload(u, effective_permission_service.permission_names(db, u.id)))
 
 
 @router.post("/", response_model=UserOut, status_code=status.HTTP_201_CREATED)
@@ -113,13 +114,115 @@ def create_user(
         current_user=current_user,
         request=request,
     )
-    return UserOut(
-        id=u.id,
-        email=u.email,
-        full_name=u.full_name,
-        is_active=u.is_active,
-        roles=sorted({r.name for r in u.roles}),
-        permissions=sorted({p.name for r in u.roles for p in r.permissions}),
+    return UserOut(**user_payload(u, effective_permission_service.permission_names(db, u.id)))
+
+
+async def _iter_lines(request: Request) -> AsyncIterator[str]:
+    """Lê o corpo da requisição em streaming, linha a linha (UTF-8, com ou sem BOM)."""
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    buffer = ""
+    async for chunk in request.stream():
+        buffer += decoder.decode(chunk)
+        *lines, buffer = buffer.split("\n")
+        for line in lines:
+            yield line.rstrip("\r")
+    buffer += decoder.decode(b"", final=True)
+    if buffer:
+        yield buffer.rstrip("\r")
+
+
+def _csv_row(header: list[str], values: list[str]) -> dict:
+    raw = {key.strip(): value.strip() for key, value in zip(header, values)}
+    if not raw.get("is_active"):
+        raw.pop("is_active", None)
+    role_ids = raw.pop("role_ids", "")
+    raw["role_ids"] = [r.strip() for r in role_ids.replace("|", ";").split(";") if r.strip()] or None
+    return raw
+
+
+async def _iter_bulk_rows(request: Request, fmt: str) -> AsyncIterator[tuple[int, dict]]:
+    """Converte CSV (com cabeçalho) ou NDJSON em (número da linha, dados brutos)."""
+    header: list[str] | None = None
+    line_number = 0
+    async for line in _iter_lines(request):
+        line_number += 1
+        if not line.strip():
+            continue
+        if fmt == "csv":
+            values = next(csv.reader([line]))
+            if header is None:
+                header = values
+                continue
+            yield line_number, _csv_row(header, values)
+        else:
+            try:
+                raw = json.loads(line)
+            except json.JSONDecodeError:
+                raw = None
+            yield line_number, raw
+
+
+def _detect_format(content_type: str) -> str:
+    if "csv" in content_type:
+        return "csv"
+    if "ndjson" in content_type or "jsonl" in content_type or "json-seq" in content_type:
+        return "ndjson"
+    raise HTTPException(
+        status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+        detail="Envie text/csv ou application/x-ndjson",
+    )
+
+
+@router.post("/bulk", response_model=BulkUserImportResult)
+async def bulk_create_users(
+    request: Request,
+    dry_run: bool = Query(False),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_permission("users:create")),
+):
+    """
+    Importa usuários em massa a partir de CSV ou NDJSON enviados no corpo.
+    CSV: cabeçalho email,full_name,password[,is_active][,role_ids] (role_ids separados por ';').
+    Com dry_run=true apenas valida, sem gravar nada. Cada lote é gravado em sua própria
+    transação; ao exceder bulk_import_max_rows os lotes anteriores permanecem gravados.
+    """
+    fmt = _detect_format(request.headers.get("content-type", ""))
+    items: list[dict] = []
+    seen_emails: set[str] = set()
+    batch: list[tuple[int, dict]] = []
+    total = 0
+
+    async def flush() -> None:
+        items.extend(
+            await run_in_threadpool(
+                user_service.bulk_create_users,
+                db,
+                batch,
+                seen_emails=seen_emails,
+                dry_run=dry_run,
+                current_user=current_user,
+                request=request,
+            )
+        )
+        batch.clear()
+
+    async for row in _iter_bulk_rows(request, fmt):
+        total += 1
+        if total > settings.bulk_import_max_rows:
+            raise HTTPException(
+                status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                detail=f"Limite de {settings.bulk_import_max_rows} linhas por importação",
+            )
+        batch.append(row)
+        if len(batch) >= settings.bulk_import_batch_size:
+            await flush()
+    if batch:
+        await flush()
+
+    created = sum(1 for item in items if item["status"] == "created")
+    failed = sum(1 for item in items if item["status"] == "error")
+    return ORJSONResponse(
+        {"dry_run": dry_run, "total": total, "created": created, "failed": failed, "items": items}
     )
 
 
@@ -142,14 +245,7 @@ def update_user(
         current_user=current_user,
         request=request,
     )
-    return UserOut(
-        id=u.id,
-        email=u.email,
-        full_name=u.full_name,
-        is_active=u.is_active,
-        roles=sorted({r.name for r in u.roles}),
-        permissions=sorted({p.name for r in u.roles for p in r.permissions}),
-    )
+    return UserOut(**user_payload(u, effective_permission_service.permission_names(db, u.id)))
 
 
 @router.delete("/{user_id}", status_code=status.HTTP_204_NO_CONTENT)
@@ -35,6 +35,75 @@ class Settings(BaseSettings):
     account_lockout_attempts: int = 5
     account_lockout_minutes: int = 15
     audit_log_retention_days: int = 90
+    # Agregação de actions ruidosas (separadas por vírgula; vazio desliga): repetições de
+    # (action, detail, ip, user_email) dentro da janela viram um contador na 1ª linha
+    audit_aggregate_actions: str = "login.failure"
+    audit_aggregate_window_seconds: int = 60
+    audit_aggregate_flush_seconds: int = 10
+    # Camada fria: diretório dos arquivos diários de audit_logs gravados antes da purga
+    # (vazio = a purga só apaga). Consultas com date_from anterior à janela quente leem
+    # também os arquivos.
+    audit_archive_dir: str = ""
+    audit_archive_retention_days: int = 2555
+    # Jobs de export (POST /audit-logs/exports): arquivos CSV gzip em audit_export_dir,
+    # no máximo audit_export_max_concurrent jobs lendo o banco ao mesmo tempo
+    audit_export_dir: str = "var/audit_exports"
+    audit_export_max_concurrent: int = 2
+    audit_export_chunk_size: int = 5_000
+    audit_export_poll_seconds: int = 5
+    audit_export_stale_seconds: int = 300
+    # Heartbeat do job em execução por tempo (thread), bem abaixo de audit_export_stale_seconds
+    audit_export_heartbeat_seconds: int = 30
+    audit_export_ttl_hours: int = 24
+    # Rollups de audit_logs (GET /audit-logs/stats): job incremental a cada N segundos.
+    # Só entram eventos com mais de audit_rollup_lag_seconds, para não pular transações
+    # que ainda não fizeram commit com ids menores.
+    audit_rollup_interval_seconds: int = 60
+    audit_rollup_lag_seconds: int = 60
+    audit_rollup_batch_size: int = 50_000
+    # Tail ao vivo (GET /audit-logs/stream): Redis Stream com os eventos recentes e
+    # buffer por conexão SSE (cliente lento perde os mais antigos)
+    audit_stream_key: str = "audit:events"
+    audit_stream_maxlen: int = 10_000
+    audit_stream_client_buffer: int = 500
+    audit_stream_keepalive_seconds: int = 15
+
+    # ── Outbox de eventos para consumidores externos ───────────
+    # outbox_sink: vazio (outbox desligada, nada é gravado) | webhook | file | redis
+    outbox_actions: str = "user.,role.,permission.,session.,login.,logout"
+    outbox_sink: str = ""
+    outbox_webhook_url: str = ""
+    outbox_webhook_secret: str = ""
+    outbox_webhook_timeout_seconds: float = 10.0
+    outbox_file_path: str = "var/outbox/events.ndjson"
+    outbox_redis_stream: str = "outbox:events"
+    outbox_relay_interval_seconds: int = 2
+    outbox_batch_size: int = 100
+    outbox_max_attempts: int = 10
+    outbox_retention_hours: int = 72
+    # Pendentes mais antigos que isso são descartados (sink fora do ar)
+    outbox_pending_retention_hours: int = 168
+
+    # ── Feed de mudanças de RBAC (GET /sync/changes) ───────────
+    # Tombstones mais antigos são removidos; cursores anteriores recebem 410 (resync)
+    sync_tombstone_retention_days: int = 30
+    sync_changes_max_limit: int = 5000
+
+    # ── Importação em massa de usuários ────────────────────────
+    bulk_import_batch_size: int = 500
+    bulk_import_hash_workers: int = 4
+    bulk_import_max_rows: int = 50_000
+
+    # ── Store de sessões ───────────────────────────────────────
+    # database: refresh tokens direto no Postgres | redis: Redis com write-behind
+    session_store: str = "database"
+    session_write_behind_interval_seconds: int = 5
+    session_write_behind_batch_size: int = 1000
+    # Sessões ativas por usuário; no login as mais antigas além do limite são revogadas (0 = sem limite)
+    max_sessions_per_user: int = 20
+    # last_seen_at: no máximo uma escrita por sessão a cada N segundos, gravadas em lote
+    session_last_seen_granularity_seconds: int = 300
+    session_last_seen_flush_seconds: int = 60
 
     @field_validator("jwt_secret_key")
     @classmethod
@@ -57,6 +126,13 @@ class Settings(BaseSettings):
             raise ValueError("ENVIRONMENT deve ser: development, production ou testing")
         return v
 
+    @field_validator("session_store")
+    @classmethod
+    def session_store_must_be_valid(cls, v: str) -> str:
+        if v not in ("database", "redis"):
+            raise ValueError("SESSION_STORE deve ser: database ou redis")
+        return v
+
     def get_cors_origins(self) -> list[str]:
         return [o.strip() for o in self.cors_origins.split(",") if o.strip()]
 
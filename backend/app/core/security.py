@@ -1,3 +1,4 @@
+import hashlib
 from datetime import datetime, timedelta, timezone
 from uuid import uuid4
 
@@ -24,11 +25,20 @@ def hash_password(password: str) -> str:
     return bcrypt.hashpw(_prepare_password(password), bcrypt.gensalt()).decode("utf-8")
 
 
-def create_access_token(subject: str) -> str:
+def session_id_for(refresh_token: str) -> str:
+    """
+    Identificador público da sessão derivado do refresh token (que é secreto e não
+    pode ir no JWT). Permite invalidar os access tokens de uma sessão revogada.
+    """
+    return hashlib.sha256(refresh_token.encode()).hexdigest()[:32]
+
+
+def create_access_token(subject: str, refresh_token: str | None = None) -> str:
     """
     Gera um JWT de acesso.
     - sub: email do usuário
     - jti: ID único do token (usado para blacklist futura)
+    - sid: sessão (refresh token) que emitiu o token, quando houver
     - type: 'access' (impede uso de refresh token como access)
     - iss: issuer da aplicação
     """
@@ -42,6 +52,8 @@ def create_access_token(subject: str) -> str:
         "exp": expire,
         "iat": now,
     }
+    if refresh_token:
+        payload["sid"] = session_id_for(refresh_token)
     return jwt.encode(payload, settings.jwt_secret_key, algorithm=settings.jwt_algorithm)
 
 
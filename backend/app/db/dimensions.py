@@ -0,0 +1,152 @@
+"""
+Tabelas de dimensão (valores repetidos internados e referenciados por id).
+
+Dimension.id_for() resolve valor -> id com um cache por worker: no caminho comum não há
+ida ao banco. Numa falta do cache o valor é buscado e, se preciso, inserido com
+ON CONFLICT DO NOTHING na transação corrente. Ids de linhas criadas por uma transação
+só entram no cache depois do commit dela (num rollback a linha some junto), então o
+cache nunca aponta para um id inexistente.
+"""
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Any
+
+from sqlalchemy import Table, event, func, insert, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+_PENDING_KEY = "dimension_pending"
+
+
+def sha256_hex(value: str) -> str:
+    return hashlib.sha256(value.encode("utf-8")).hexdigest()
+
+
+class Dimension:
+    """
+    Dimensão sobre `table`, com valores em `value_column`. Se `hash_column` for dado,
+    a busca usa o hash SHA-256 do valor (índice único pequeno para textos longos).
+    """
+
+    def __init__(
+        self,
+        table: Table,
+        value_column: str,
+        *,
+        hash_column: str | None = None,
+        max_entries: int = 4096,
+    ) -> None:
+        self.table = table
+        self.value_column = value_column
+        self.hash_column = hash_column
+        self.max_entries = max_entries
+        self._cache: OrderedDict[str, int] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _key(self, value: str) -> str:
+        return sha256_hex(value) if self.hash_column else value
+
+    @property
+    def _key_column(self):
+        return self.table.c[self.hash_column or self.value_column]
+
+    def id_for(self, db: Session, value: str | None) -> int | None:
+        """Id do valor na dimensão (criando a linha se necessário). None para valor vazio."""
+        if not value:
+            return None
+        key = self._key(value)
+        row_id = self._lookup(db, key)
+        if row_id is not None:
+            return row_id
+
+        row_id = self._insert(db, key, value)
+        db.info.setdefault(_PENDING_KEY, {})[(self, key)] = row_id
+        return row_id
+
+    def lookup(self, db: Session, value: str | None) -> int | None:
+        """Id do valor se ele já existe na dimensão (sem inserir). Para filtros de leitura."""
+        if not value:
+            return None
+        return self._lookup(db, self._key(value))
+
+    def ids_matching(self, db: Session, value: str, mode: str = "contains") -> list[int]:
+        """
+        Ids dos valores iguais a / começando com / contendo `value` (mode = exact, prefix
+        ou contains; sem diferenciar caixa). Para dimensões pequenas: o filtro vira
+        `coluna_id IN (...)` resolvido antes da consulta principal.
+        """
+        column = self.table.c[self.value_column]
+        if mode == "exact":
+            condition = func.lower(column) == value.lower()
+        elif mode == "prefix":
+            condition = column.istartswith(value, autoescape=True)
+        else:
+            condition = column.icontains(value, autoescape=True)
+        return list(db.scalars(select(self.table.c.id).where(condition)))
+
+    def _lookup(self, db: Session, key: str) -> int | None:
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached is not None:
+                self._cache.move_to_end(key)
+                return cached
+
+        pending = db.info.get(_PENDING_KEY, {})
+        if (self, key) in pending:
+            return pending[(self, key)]
+
+        row_id = db.scalar(select(self.table.c.id).where(self._key_column == key))
+        if row_id is not None:
+            self._remember(key, row_id)
+        return row_id
+
+    def _insert(self, db: Session, key: str, value: str) -> int:
+        values: dict[str, Any] = {self.value_column: value}
+        if self.hash_column:
+            values[self.hash_column] = key
+        dialect = db.get_bind().dialect.name
+        if dialect in ("postgresql", "sqlite"):
+            dialect_insert = pg_insert if dialect == "postgresql" else sqlite_insert
+            row_id = db.scalar(
+                dialect_insert(self.table)
+                .values(**values)
+                .on_conflict_do_nothing()
+                .returning(self.table.c.id)
+            )
+        else:
+            try:
+                with db.begin_nested():
+                    row_id = db.scalar(
+                        insert(self.table).values(**values).returning(self.table.c.id)
+                    )
+            except IntegrityError:
+                row_id = None
+        if row_id is None:
+            # Outra transação inseriu o mesmo valor entre o SELECT e o INSERT
+            row_id = db.scalar(select(self.table.c.id).where(self._key_column == key))
+        return row_id
+
+    def _remember(self, key: str, row_id: int) -> None:
+        with self._lock:
+            self._cache[key] = row_id
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._cache.clear()
+
+
+@event.listens_for(Session, "after_commit")
+def _promote_pending(session: Session) -> None:
+    for (dimension, key), row_id in session.info.pop(_PENDING_KEY, {}).items():
+        dimension._remember(key, row_id)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_pending(session: Session) -> None:
+    session.info.pop(_PENDING_KEY, None)
@@ -1,5 +1,8 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+from collections.abc import Iterator
+from contextlib import contextmanager
+
+from sqlalchemy import Select, create_engine, func, select
+from sqlalchemy.orm import Session, sessionmaker
 from sqlalchemy.pool import StaticPool
 
 from app.core.config import get_settings
@@ -32,3 +35,45 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+@contextmanager
+def unit_of_work(db: Session) -> Iterator[Session]:
+    """
+    Agrupa uma mutação e seu evento de auditoria numa única transação (um commit).
+    Os objetos não são expirados no commit, então a resposta pode ser montada a partir
+    deles sem recarregar do banco. Em caso de erro faz rollback e propaga a exceção.
+    """
+    previous = db.expire_on_commit
+    db.expire_on_commit = False
+    try:
+        yield db
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.expire_on_commit = previous
+
+
+# Abaixo disso a estimativa do planner é pouco confiável e a contagem exata é barata
+_EXACT_COUNT_THRESHOLD = 1000
+
+
+def estimate_count(db: Session, stmt: Select) -> tuple[int, bool]:
+    """
+    Total de linhas de `stmt` para paginação. Devolve (total, is_estimate).
+
+    No Postgres usa a estimativa do planner (EXPLAIN, sem executar a consulta) e só
+    conta de verdade quando ela é pequena. Nos demais bancos faz COUNT(*).
+    """
+    count_stmt = select(func.count()).select_from(stmt.order_by(None).subquery())
+    if db.get_bind().dialect.name == "postgresql":
+        compiled = stmt.order_by(None).compile(dialect=db.get_bind().dialect)
+        plan = db.connection().exec_driver_sql(
+            f"EXPLAIN (FORMAT JSON) {compiled.string}", compiled.params
+        ).scalar()
+        estimate = int(plan[0]["Plan"]["Plan Rows"])
+        if estimate >= _EXACT_COUNT_THRESHOLD:
+            return estimate, True
+    return db.scalar(count_stmt) or 0, False
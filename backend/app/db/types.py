@@ -0,0 +1,83 @@
+"""
+Tipos de coluna próprios.
+
+IPAddress guarda endereços IP em forma nativa: `inet` no Postgres (indexável com GiST,
+filtro por rede com <<=) e 16 bytes empacotados nos demais bancos (IPv4 mapeado em
+IPv6), onde uma rede vira um intervalo contíguo e o filtro é um BETWEEN sobre o índice.
+Na aplicação o valor continua sendo uma string ('203.0.113.7').
+"""
+import ipaddress
+
+from sqlalchemy import LargeBinary, cast, literal
+from sqlalchemy.dialects.postgresql import CIDR, INET
+from sqlalchemy.orm import Session
+from sqlalchemy.types import TypeDecorator
+
+_IPV4_MAPPED_PREFIX = bytes(10) + b"\xff\xff"
+
+
+def normalize_ip(value: str | None) -> str | None:
+    """Forma canônica do IP, ou None se vazio/inválido (ex.: 'testclient')."""
+    if not value:
+        return None
+    try:
+        return str(ipaddress.ip_address(value.strip()))
+    except ValueError:
+        return None
+
+
+def parse_network(cidr: str) -> ipaddress.IPv4Network | ipaddress.IPv6Network:
+    """Rede a partir de '203.0.113.0/24' (bits de host são ignorados). Levanta ValueError."""
+    try:
+        return ipaddress.ip_network(cidr.strip(), strict=False)
+    except ValueError as exc:
+        raise ValueError("CIDR inválido") from exc
+
+
+def _pack(ip: ipaddress.IPv4Address | ipaddress.IPv6Address) -> bytes:
+    if ip.version == 4:
+        return _IPV4_MAPPED_PREFIX + ip.packed
+    return ip.packed
+
+
+def _unpack(raw: bytes) -> str:
+    ip = ipaddress.IPv6Address(raw)
+    return str(ip.ipv4_mapped or ip)
+
+
+class IPAddress(TypeDecorator):
+    """Endereço IPv4/IPv6: `inet` no Postgres, 16 bytes nos demais bancos."""
+
+    impl = LargeBinary(16)
+    cache_ok = True
+
+    def load_dialect_impl(self, dialect):
+        if dialect.name == "postgresql":
+            return dialect.type_descriptor(INET())
+        return dialect.type_descriptor(LargeBinary(16))
+
+    def process_bind_param(self, value, dialect):
+        value = normalize_ip(value)
+        if value is None:
+            return None
+        if dialect.name == "postgresql":
+            return value
+        return _pack(ipaddress.ip_address(value))
+
+    def process_result_value(self, value, dialect):
+        if value is None:
+            return None
+        if isinstance(value, (bytes, bytearray, memoryview)):
+            return _unpack(bytes(value))
+        return str(value)
+
+
+def ip_in_network(db: Session, column, cidr: str):
+    """
+    Condição "column pertence à rede cidr". No Postgres usa <<= (atendido pelo índice
+    GiST inet_ops); nos demais, o intervalo [primeiro, último endereço] da rede.
+    """
+    network = parse_network(cidr)
+    if db.get_bind().dialect.name == "postgresql":
+        return column.op("<<=")(cast(literal(str(network)), CIDR))
+    return column.between(str(network.network_address), str(network.broadcast_address))
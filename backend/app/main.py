@@ -3,7 +3,7 @@ import logging
 from apscheduler.schedulers.background import BackgroundScheduler
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import ORJSONResponse
 from slowapi import Limiter, _rate_limit_exceeded_handler
 from slowapi.errors import RateLimitExceeded
 from slowapi.util import get_remote_address
@@ -15,9 +15,20 @@ from app.core.redis import redis_ping
 from app.core.security import hash_password
 from app.db.session import SessionLocal
 from app.models import Role, User
+from app.services import (
+    audit_aggregation_service,
+    audit_export_service,
+    audit_rollup_service,
+    last_seen_service,
+    outbox_service,
+    session_store,
+)
+from app.services.outbox_sinks import get_sink
 from app.services.cleanup_service import cleanup_expired_tokens
 from app.services.rbac_service import ensure_base_rbac
 
+logger = logging.getLogger(__name__)
+
 
 def _run_token_cleanup() -> None:
     db = SessionLocal()
@@ -27,6 +38,68 @@ def _run_token_cleanup() -> None:
         db.close()
 
 
+def _run_session_write_behind() -> None:
+    db = SessionLocal()
+    try:
+        session_store.drain_write_behind(db)
+    except Exception:
+        logger.exception("session_store: falha no write-behind; lote devolvido à fila")
+    finally:
+        db.close()
+
+
+def _run_last_seen_flush() -> None:
+    db = SessionLocal()
+    try:
+        last_seen_service.flush(db)
+    except Exception:
+        logger.exception("last_seen: falha ao gravar; registros devolvidos ao buffer")
+    finally:
+        db.close()
+
+
+def _run_audit_rollup() -> None:
+    db = SessionLocal()
+    try:
+        audit_rollup_service.refresh_rollups(db)
+    except Exception:
+        logger.exception("audit_rollup: falha ao agregar; o lote é refeito na próxima execução")
+    finally:
+        db.close()
+
+
+def _run_audit_aggregation_flush() -> None:
+    db = SessionLocal()
+    try:
+        audit_aggregation_service.flush(db)
+    except Exception:
+        logger.exception("audit_aggregation: falha ao gravar; janelas devolvidas ao buffer")
+    finally:
+        db.close()
+
+
+def _run_audit_exports() -> None:
+    db = SessionLocal()
+    try:
+        audit_export_service.run_next(db)
+    except Exception:
+        logger.exception("audit_export: falha ao processar a fila de exports")
+    finally:
+        db.close()
+
+
+def _run_outbox_relay(sink) -> None:
+    db = SessionLocal()
+    try:
+        # Esvazia o acumulado antes de esperar o próximo intervalo
+        while outbox_service.relay(db, sink):
+            pass
+    except Exception:
+        logger.exception("outbox: falha no relay; eventos continuam pendentes")
+    finally:
+        db.close()
+
+
 settings = get_settings()
 
 limiter = Limiter(key_func=get_remote_address)
@@ -35,6 +108,7 @@ app = FastAPI(
     title=settings.project_name,
     docs_url="/docs" if settings.environment != "production" else None,
     redoc_url="/redoc" if settings.environment != "production" else None,
+    default_response_class=ORJSONResponse,
 )
 
 app.state.limiter = limiter
@@ -45,7 +119,8 @@ app.add_middleware(
     allow_origins=settings.get_cors_origins(),
     allow_credentials=True,
     allow_methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"],
-    allow_headers=["Authorization", "Content-Type"],
+    allow_headers=["Authorization", "Content-Type", "If-None-Match"],
+    expose_headers=["ETag"],
 )
 
 
@@ -63,9 +138,8 @@ async def security_headers_middleware(request: Request, call_next):
 
 @app.exception_handler(Exception)
 async def global_exception_handler(request: Request, exc: Exception):
-    logger = logging.getLogger(__name__)
     logger.error("Unhandled error: %s", exc, exc_info=True)
-    return JSONResponse(
+    return ORJSONResponse(
         status_code=500,
         content={"detail": "Erro interno. Tente novamente mais tarde."},
     )
@@ -109,10 +183,64 @@ def startup_seed() -> None:
             admin_user.roles.append(admin_role)
             db.add(admin_user)
             db.commit()
+
+        if session_store.is_enabled():
+            try:
+                session_store.rebuild_from_database(db)
+            except Exception:
+                # Sem Redis no boot: a reconstrução é refeita na primeira operação de sessão
+                logger.exception("session_store: falha ao carregar sessões do banco")
     finally:
         db.close()
 
     if settings.environment != "testing":
         scheduler = BackgroundScheduler()
         scheduler.add_job(_run_token_cleanup, "interval", hours=24, id="token_cleanup")
+        scheduler.add_job(
+            _run_last_seen_flush,
+            "interval",
+            seconds=settings.session_last_seen_flush_seconds,
+            id="last_seen_flush",
+            max_instances=1,
+        )
+        scheduler.add_job(
+            _run_audit_rollup,
+            "interval",
+            seconds=settings.audit_rollup_interval_seconds,
+            id="audit_rollup",
+            max_instances=1,
+        )
+        scheduler.add_job(
+            _run_audit_aggregation_flush,
+            "interval",
+            seconds=settings.audit_aggregate_flush_seconds,
+            id="audit_aggregation_flush",
+            max_instances=1,
+        )
+        scheduler.add_job(
+            _run_audit_exports,
+            "interval",
+            seconds=settings.audit_export_poll_seconds,
+            id="audit_exports",
+            # Cada execução roda um export inteiro; o limite global fica em run_next
+            max_instances=settings.audit_export_max_concurrent,
+        )
+        outbox_sink = get_sink()
+        if outbox_sink is not None:
+            scheduler.add_job(
+                _run_outbox_relay,
+                "interval",
+                seconds=settings.outbox_relay_interval_seconds,
+                id="outbox_relay",
+                max_instances=1,
+                args=[outbox_sink],
+            )
+        if session_store.is_enabled():
+            scheduler.add_job(
+                _run_session_write_behind,
+                "interval",
+                seconds=settings.session_write_behind_interval_seconds,
+                id="session_write_behind",
+                max_instances=1,
+            )
         scheduler.start()
\ No newline at end of file
@@ -1,10 +1,24 @@
 # Uma única fonte de verdade: rbac.py (evita tabelas duplicadas no MetaData do SQLAlchemy)
 from app.models.rbac import (
+    AuditAction,
+    AuditChangeValue,
+    AuditDailyCount,
+    AuditDailyUserCount,
+    AuditExportJob,
+    AuditHourlyCount,
     AuditLog,
+    AuditResourceType,
+    AuditResult,
+    AuditRollupState,
+    OutboxEvent,
     Permission,
+    RbacChange,
+    RbacChangeState,
     RefreshToken,
     Role,
     User,
+    UserAgent,
+    UserEffectivePermission,
     role_permissions,
     user_roles,
 )
@@ -15,6 +29,20 @@ __all__ = [
     "Permission",
     "RefreshToken",
     "AuditLog",
+    "AuditAction",
+    "AuditResult",
+    "AuditResourceType",
+    "AuditChangeValue",
+    "AuditHourlyCount",
+    "AuditDailyCount",
+    "AuditDailyUserCount",
+    "AuditRollupState",
+    "AuditExportJob",
+    "OutboxEvent",
+    "RbacChange",
+    "RbacChangeState",
+    "UserAgent",
+    "UserEffectivePermission",
     "user_roles",
     "role_permissions",
 ]
@@ -2,19 +2,30 @@ from datetime import datetime, timezone
 from typing import Optional
 
 from sqlalchemy import (
+    DDL,
+    BigInteger,
     Boolean,
     Column,
+    Date,
     DateTime,
     ForeignKey,
+    Index,
     Integer,
+    SmallInteger,
     String,
     Table,
     Text,
+    event,
+    select,
+    text,
 )
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.types import JSON
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import column_property, relationship
 
+from app.core.security import session_id_for
 from app.db.base import Base
+from app.db.types import IPAddress
 
 # Tabelas de associacao Many-to-Many
 user_roles = Table(
@@ -35,14 +46,19 @@ role_permissions = Table(
 class User(Base):
     __tablename__ = "users"
 
-    id = Column(Integer, primary_key=True, index=True)
+    id = Column(Integer, primary_key=True)
     email = Column(String(255), unique=True, nullable=False, index=True)
     full_name = Column(String(255), nullable=False)
     hashed_password = Column(String(255), nullable=False)
     is_active = Column(Boolean, default=True, nullable=False)
     created_at = Column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc), nullable=False)
+    updated_at = Column(DateTime(timezone=True), nullable=True, onupdate=lambda: datetime.now(timezone.utc))
     deleted_at = Column(DateTime(timezone=True), nullable=True, default=None)
 
+    # Rastreabilidade (quem criou/alterou)
+    created_by = Column(Integer, ForeignKey("users.id", ondelete="SET NULL"), nullable=True)
+    updated_by = Column(Integer, ForeignKey("users.id", ondelete="SET NULL"), nullable=True)
+
     # Lockout de conta
     failed_login_attempts = Column(Integer, default=0, nullable=False)
     locked_until = Column(DateTime(timezone=True), nullable=True, default=None)
@@ -68,9 +84,13 @@ class User(Base):
 class Role(Base):
     __tablename__ = "roles"
 
-    id = Column(Integer, primary_key=True, index=True)
+    id = Column(Integer, primary_key=True)
     name = Column(String(50), unique=True, nullable=False, index=True)
     description = Column(String(255), nullable=True)
+    created_at = Column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc), nullable=False)
+    updated_at = Column(DateTime(timezone=True), nullable=True, onupdate=lambda: datetime.now(timezone.utc))
+    created_by = Column(Integer, ForeignKey("users.id", ondelete="SET NULL"), nullable=True)
+    updated_by = Column(Integer, ForeignKey("users.id", ondelete="SET NULL"), nullable=True)
     users = relationship("User", secondary=user_roles, back_populates="roles")
     permissions = relationship("Permission", secondary=role_permissions, back_populates="roles", lazy="selectin")
 
@@ -78,41 +98,377 @@ class Role(Base):
 class Permission(Base):
     __tablename__ = "permissions"
 
-    id = Column(Integer, primary_key=True, index=True)
+    id = Column(Integer, primary_key=True)
     name = Column(String(100), unique=True, nullable=False, index=True)
     description = Column(String(255), nullable=True)
+    created_at = Column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc), nullable=False)
+    created_by = Column(Integer, ForeignKey("users.id", ondelete="SET NULL"), nullable=True)
+    updated_by = Column(Integer, ForeignKey("users.id", ondelete="SET NULL"), nullable=True)
     roles = relationship("Role", secondary=role_permissions, back_populates="permissions")
 
 
+class UserAgent(Base):
+    """Dimensão de User-Agents: cada string distinta é gravada uma vez (busca pelo hash)."""
+    __tablename__ = "user_agents"
+
+    id = Column(Integer, primary_key=True)
+    ua_hash = Column(String(64), unique=True, nullable=False)  # SHA-256 hex do texto
+    user_agent = Column(String(512), nullable=False)
+
+
+def _dimension_value(model, value_column: str, id_column: Column):
+    """
+    Valor textual lido por subconsulta na dimensão. Somente leitura: a gravação é pelo
+    id (ver dimension_service).
+    """
+    return column_property(
+        select(getattr(model, value_column))
+        .where(model.id == id_column)
+        .correlate_except(model)
+        .scalar_subquery(),
+        expire_on_flush=False,
+    )
+
+
+# SQLite só gera o id automaticamente para INTEGER PRIMARY KEY
+_SMALL_ID = SmallInteger().with_variant(Integer, "sqlite")
+
+
+class AuditAction(Base):
+    """Códigos de AuditLog.action (poucas dezenas de valores distintos)."""
+    __tablename__ = "audit_actions"
+
+    id = Column(_SMALL_ID, primary_key=True)
+    name = Column(String(50), unique=True, nullable=False)
+
+
+class AuditResult(Base):
+    """Códigos de AuditLog.result."""
+    __tablename__ = "audit_results"
+
+    id = Column(_SMALL_ID, primary_key=True)
+    name = Column(String(20), unique=True, nullable=False)
+
+
+class AuditResourceType(Base):
+    """Códigos de AuditLog.resource_type."""
+    __tablename__ = "audit_resource_types"
+
+    id = Column(_SMALL_ID, primary_key=True)
+    name = Column(String(50), unique=True, nullable=False)
+
+
+def _session_id_default(context) -> str:
+    return session_id_for(context.get_current_parameters()["token_id"])
+
+
+# Predicado dos índices parciais de sessões ativas. As consultas precisam usar
+# `RefreshToken.revoked == false()` (e não `.is_(False)`) para o planner casar o índice.
+_ACTIVE_SESSION_PG = text("revoked = false")
+_ACTIVE_SESSION_SQLITE = text("revoked = 0")
+
+
+def _ip_index(table: str) -> Index:
+    """Índice de ip_address: GiST (inet_ops) no Postgres para filtros por rede; B-tree nos demais."""
+    return Index(
+        f"ix_{table}_ip_address",
+        "ip_address",
+        postgresql_using="gist",
+        postgresql_ops={"ip_address": "inet_ops"},
+    )
+
+
 class RefreshToken(Base):
     __tablename__ = "refresh_tokens"
+    __table_args__ = (
+        # get_user_sessions / logout-all: sessões ativas do usuário, mais recentes primeiro
+        Index(
+            "ix_refresh_tokens_active_user_created",
+            "user_id",
+            text("created_at DESC"),
+            postgresql_where=_ACTIVE_SESSION_PG,
+            sqlite_where=_ACTIVE_SESSION_SQLITE,
+        ),
+        # list_active_sessions: todas as sessões ativas, paginação por (created_at, id)
+        Index(
+            "ix_refresh_tokens_active_created",
+            text("created_at DESC"),
+            text("id DESC"),
+            postgresql_where=_ACTIVE_SESSION_PG,
+            sqlite_where=_ACTIVE_SESSION_SQLITE,
+        ),
+        _ip_index("refresh_tokens"),
+    )
 
-    id = Column(Integer, primary_key=True, index=True)
+    id = Column(Integer, primary_key=True)
     token_id = Column(String(36), unique=True, nullable=False, index=True)  # UUID v4
     user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
     expires_at = Column(DateTime(timezone=True), nullable=False)
     revoked = Column(Boolean, default=False, nullable=False)
     created_at = Column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc), nullable=False)
-    ip_address = Column(String(45), nullable=True)
-    user_agent = Column(String(512), nullable=True)
+    ip_address = Column(IPAddress, nullable=True)
+    user_agent_id = Column(Integer, ForeignKey("user_agents.id"), nullable=True)
+    user_agent = _dimension_value(UserAgent, "user_agent", user_agent_id)
     device_name = Column(String(100), nullable=True)
+    device_class = Column(String(20), nullable=True)  # desktop | mobile | tablet | bot | other
+    # Claim `sid` dos access tokens da sessão (hash do token_id), usado pelo last-seen
+    session_id = Column(String(32), nullable=True, index=True, default=_session_id_default)
+    last_seen_at = Column(DateTime(timezone=True), nullable=True)
     user = relationship("User", back_populates="refresh_tokens")
 
 
 class AuditLog(Base):
     __tablename__ = "audit_logs"
+    __table_args__ = (
+        # list_audit_logs: filtro por igualdade + ordenação/intervalo em created_at
+        Index("ix_audit_logs_user_created", "user_id", text("created_at DESC")),
+        Index("ix_audit_logs_action_created", "action_id", text("created_at DESC")),
+        Index("ix_audit_logs_result_created", "result_id", text("created_at DESC")),
+        Index("ix_audit_logs_resource_type_created", "resource_type_id", text("created_at DESC")),
+        _ip_index("audit_logs"),
+        # Filtro por email: exato e (no SQLite) prefixo pelo lower(); trecho por trigramas
+        Index("ix_audit_logs_user_email_lower", text("lower(user_email)")),
+        Index(
+            "ix_audit_logs_user_email_trgm",
+            "user_email",
+            postgresql_using="gin",
+            postgresql_ops={"user_email": "gin_trgm_ops"},
+        ).ddl_if(dialect="postgresql"),
+        # Filtro changes_contains (@>); sem JSONB o filtro usa audit_change_values
+        Index(
+            "ix_audit_logs_changes",
+            "changes",
+            postgresql_using="gin",
+            postgresql_ops={"changes": "jsonb_path_ops"},
+        ).ddl_if(dialect="postgresql"),
+    )
 
-    id = Column(Integer, primary_key=True, index=True)
+    id = Column(Integer, primary_key=True)
     user_id = Column(Integer, ForeignKey("users.id", ondelete="SET NULL"), nullable=True)
     user_email = Column(String(255), nullable=True)
-    action = Column(String(50), nullable=False, index=True)
-    resource_type = Column(String(50), nullable=True, index=True)
+    # action/result/resource_type são códigos em tabelas de lookup; o texto é lido por
+    # subconsulta e gravado via dimension_service (audit_actions, audit_results, ...)
+    action_id = Column(SmallInteger, ForeignKey("audit_actions.id"), nullable=False)
+    action = _dimension_value(AuditAction, "name", action_id)
+    resource_type_id = Column(SmallInteger, ForeignKey("audit_resource_types.id"), nullable=True)
+    resource_type = _dimension_value(AuditResourceType, "name", resource_type_id)
     resource_id = Column(String(100), nullable=True)
-    result = Column(String(20), nullable=False)
-    ip_address = Column(String(45), nullable=True)
-    user_agent = Column(String(512), nullable=True)
-    changes = Column(JSON, nullable=True)
+    result_id = Column(SmallInteger, ForeignKey("audit_results.id"), nullable=False)
+    result = _dimension_value(AuditResult, "name", result_id)
+    ip_address = Column(IPAddress, nullable=True)
+    user_agent_id = Column(Integer, ForeignKey("user_agents.id"), nullable=True)
+    user_agent = _dimension_value(UserAgent, "user_agent", user_agent_id)
+    changes = Column(JSON().with_variant(JSONB(), "postgresql"), nullable=True)
     detail = Column(Text, nullable=True)
     created_at = Column(
-        DateTime(timezone=True), default=lambda: datetime.now(timezone.utc), nullable=False
-    )
\ No newline at end of file
+        DateTime(timezone=True), default=lambda: datetime.now(timezone.utc), nullable=False, index=True
+    )
+    # Actions agregadas (audit_aggregation_service): repetições da mesma chave na janela
+    # somam aqui; created_at é a primeira ocorrência e last_occurred_at a última
+    occurrence_count = Column(Integer, nullable=False, default=1, server_default=text("1"))
+    last_occurred_at = Column(DateTime(timezone=True), nullable=True)
+
+
+class AuditChangeValue(Base):
+    """
+    Fallback para bancos sem JSONB: folhas escalares de AuditLog.changes, uma linha por
+    caminho (ex.: 'after.is_active' -> 'false', valor em JSON), indexadas para o filtro
+    changes_contains. No Postgres a tabela fica vazia (o filtro usa o GIN em changes).
+    """
+    __tablename__ = "audit_change_values"
+    __table_args__ = (
+        Index("ix_audit_change_values_path_value", "path", "value", "audit_log_id"),
+    )
+
+    audit_log_id = Column(Integer, ForeignKey("audit_logs.id", ondelete="CASCADE"), primary_key=True)
+    path = Column(String(200), primary_key=True)
+    value = Column(String(255), nullable=False)
+
+
+class AuditHourlyCount(Base):
+    """Rollup de audit_logs: eventos por (hora, action, result). Mantido por audit_rollup_service."""
+    __tablename__ = "audit_hourly_counts"
+
+    bucket = Column(DateTime(timezone=True), primary_key=True)  # início da hora (UTC)
+    action_id = Column(SmallInteger, ForeignKey("audit_actions.id"), primary_key=True)
+    result_id = Column(SmallInteger, ForeignKey("audit_results.id"), primary_key=True)
+    count = Column(Integer, nullable=False)
+
+
+class AuditDailyCount(Base):
+    """Rollup de audit_logs: eventos por (dia UTC, action, result), para interval=day."""
+    __tablename__ = "audit_daily_counts"
+
+    day = Column(Date, primary_key=True)
+    action_id = Column(SmallInteger, ForeignKey("audit_actions.id"), primary_key=True)
+    result_id = Column(SmallInteger, ForeignKey("audit_results.id"), primary_key=True)
+    count = Column(Integer, nullable=False)
+
+
+class AuditDailyUserCount(Base):
+    """Rollup de audit_logs: eventos por (dia UTC, usuário). Sem FK: sobrevive à remoção do usuário."""
+    __tablename__ = "audit_daily_user_counts"
+
+    day = Column(Date, primary_key=True)
+    user_id = Column(Integer, primary_key=True)
+    count = Column(Integer, nullable=False)
+
+
+class AuditRollupState(Base):
+    """Marca d'água dos rollups: audit_logs com id <= last_audit_log_id já foram agregados."""
+    __tablename__ = "audit_rollup_state"
+
+    name = Column(String(50), primary_key=True)
+    last_audit_log_id = Column(Integer, nullable=False, default=0)
+    rolled_up_to = Column(DateTime(timezone=True), nullable=True)
+
+
+class OutboxEvent(Base):
+    """
+    Outbox transacional: eventos de usuários, papéis, permissões, sessões e login para
+    consumidores externos, gravados na mesma transação da mutação (via log_event) e
+    entregues em ordem por agregado pelo relay (outbox_service.relay).
+    """
+    __tablename__ = "outbox_events"
+    __table_args__ = (
+        # Relay: pendentes em ordem de id
+        Index(
+            "ix_outbox_events_pending",
+            "id",
+            postgresql_where=text("status = 'pending'"),
+            sqlite_where=text("status = 'pending'"),
+        ),
+        # Relay: agregados retidos por um evento aguardando nova tentativa
+        Index(
+            "ix_outbox_events_retrying",
+            "aggregate_type",
+            "aggregate_id",
+            "id",
+            postgresql_where=text("status = 'pending' AND next_attempt_at IS NOT NULL"),
+            sqlite_where=text("status = 'pending' AND next_attempt_at IS NOT NULL"),
+        ),
+    )
+
+    id = Column(Integer, primary_key=True)
+    aggregate_type = Column(String(50), nullable=False)  # user | role | permission
+    aggregate_id = Column(String(255), nullable=False)
+    event_type = Column(String(50), nullable=False)  # action do evento de auditoria
+    payload = Column(JSON, nullable=False)
+    status = Column(String(10), nullable=False, default="pending")  # pending | delivered | dead
+    attempts = Column(Integer, nullable=False, default=0)
+    next_attempt_at = Column(DateTime(timezone=True), nullable=True)
+    last_error = Column(String(500), nullable=True)
+    created_at = Column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc), nullable=False)
+    delivered_at = Column(DateTime(timezone=True), nullable=True)
+
+
+class UserEffectivePermission(Base):
+    """
+    Permissões efetivas materializadas (user_roles × role_permissions), mantidas na
+    mesma transação das mudanças de papéis por effective_permission_service. As
+    checagens de permissão e o UserOut leem daqui em vez de percorrer os relacionamentos.
+    """
+    __tablename__ = "user_effective_permissions"
+    __table_args__ = (Index("ix_user_effective_permissions_permission_id", "permission_id"),)
+
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    permission_id = Column(Integer, ForeignKey("permissions.id", ondelete="CASCADE"), primary_key=True)
+
+
+class RbacChange(Base):
+    """
+    Feed de mudanças (GET /sync/changes): uma linha por usuário, papel, permissão ou
+    associação (user_role "user_id:role_id", role_permission "role_id:permission_id"),
+    com a versão da última mudança. deleted=True é tombstone (removido ou soft delete).
+    """
+    __tablename__ = "rbac_changes"
+
+    entity = Column(String(20), primary_key=True)  # user | role | permission | user_role | role_permission
+    entity_id = Column(String(64), primary_key=True)
+    version = Column(BigInteger, nullable=False, unique=True)
+    deleted = Column(Boolean, nullable=False, default=False)
+    changed_at = Column(DateTime(timezone=True), nullable=False)
+
+
+class RbacChangeState(Base):
+    """
+    Contador do feed (linha única, id=1). version é a última versão atribuída; o lock da
+    linha no UPDATE serializa as transações que mudam RBAC, então as versões ficam
+    visíveis em ordem. purged_through: maior versão de tombstone já removido.
+    """
+    __tablename__ = "rbac_change_state"
+
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    version = Column(BigInteger, nullable=False, default=0)
+    purged_through = Column(BigInteger, nullable=False, default=0)
+
+
+event.listen(
+    RbacChangeState.__table__,
+    "after_create",
+    DDL("INSERT INTO rbac_change_state (id, version, purged_through) VALUES (1, 0, 0)"),
+)
+
+
+_ACTIVE_EXPORT = text("status IN ('queued', 'running')")
+
+
+class AuditExportJob(Base):
+    """
+    Job de export de audit_logs (POST /audit-logs/exports), executado em segundo plano
+    por audit_export_service. params são os filtros da listagem; params_hash deduplica
+    pedidos idênticos enquanto o job está na fila ou rodando.
+    """
+    __tablename__ = "audit_export_jobs"
+    __table_args__ = (
+        Index(
+            "ux_audit_export_jobs_active_params",
+            "params_hash",
+            unique=True,
+            postgresql_where=_ACTIVE_EXPORT,
+            sqlite_where=_ACTIVE_EXPORT,
+        ),
+        Index("ix_audit_export_jobs_status_created", "status", "created_at"),
+    )
+
+    id = Column(String(32), primary_key=True)  # UUID v4 (hex)
+    params_hash = Column(String(64), nullable=False)  # SHA-256 dos filtros normalizados
+    params = Column(JSON, nullable=False)
+    status = Column(String(10), nullable=False, default="queued")  # queued | running | done | failed
+    created_by = Column(Integer, ForeignKey("users.id", ondelete="SET NULL"), nullable=True)
+    rows_written = Column(Integer, nullable=False, default=0)
+    rows_estimated = Column(Integer, nullable=True)
+    file_size = Column(BigInteger, nullable=True)
+    error = Column(String(500), nullable=True)
+    created_at = Column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc), nullable=False)
+    started_at = Column(DateTime(timezone=True), nullable=True)
+    heartbeat_at = Column(DateTime(timezone=True), nullable=True)
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+    # Token da tentativa em curso: cada claim gera um novo e toda escrita do worker o confere
+    attempt = Column(String(32), nullable=True)
+
+
+# No SQLite a busca por trecho do email usa uma tabela FTS5 com tokenizer trigram
+# (conteúdo externo: só o índice, mantido por triggers). No Postgres o papel é do
+# índice GIN pg_trgm acima.
+AUDIT_EMAIL_FTS = "audit_logs_email_fts"
+
+for _statement in (
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {AUDIT_EMAIL_FTS} USING fts5("
+    "user_email, content='audit_logs', content_rowid='id', tokenize='trigram')",
+    f"CREATE TRIGGER audit_logs_email_fts_ai AFTER INSERT ON audit_logs BEGIN "
+    f"INSERT INTO {AUDIT_EMAIL_FTS}(rowid, user_email) VALUES (new.id, new.user_email); END",
+    f"CREATE TRIGGER audit_logs_email_fts_ad AFTER DELETE ON audit_logs BEGIN "
+    f"INSERT INTO {AUDIT_EMAIL_FTS}({AUDIT_EMAIL_FTS}, rowid, user_email) "
+    "VALUES ('delete', old.id, old.user_email); END",
+    f"CREATE TRIGGER audit_logs_email_fts_au AFTER UPDATE OF user_email ON audit_logs BEGIN "
+    f"INSERT INTO {AUDIT_EMAIL_FTS}({AUDIT_EMAIL_FTS}, rowid, user_email) "
+    "VALUES ('delete', old.id, old.user_email); "
+    f"INSERT INTO {AUDIT_EMAIL_FTS}(rowid, user_email) VALUES (new.id, new.user_email); END",
+):
+    event.listen(AuditLog.__table__, "after_create", DDL(_statement).execute_if(dialect="sqlite"))
+event.listen(
+    AuditLog.__table__,
+    "after_drop",
+    DDL(f"DROP TABLE IF EXISTS {AUDIT_EMAIL_FTS}").execute_if(dialect="sqlite"),
+)
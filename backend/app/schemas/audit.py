@@ -3,7 +3,9 @@
 from datetime import datetime
 from typing import Optional
 
-from pydantic import BaseModel
+from pydantic import BaseModel, Field, field_validator
+
+from app.db.types import parse_network
 
 
 class AuditLogOut(BaseModel):
@@ -19,6 +21,61 @@ class AuditLogOut(BaseModel):
     changes: Optional[dict] = None
     detail: Optional[str] = None
     created_at: datetime
+    occurrence_count: int = 1
+    last_occurred_at: Optional[datetime] = None
+
+    model_config = {"from_attributes": True}
+
+
+class AuditStatsPoint(BaseModel):
+    bucket: str  # início da hora (ISO 8601, UTC) ou dia (YYYY-MM-DD)
+    action: Optional[str] = None
+    result: Optional[str] = None
+    user_id: Optional[int] = None
+    count: int
+
+
+class AuditStatsResponse(BaseModel):
+    by: str
+    interval: str
+    date_from: datetime
+    date_to: datetime
+    rolled_up_to: Optional[datetime] = None  # eventos depois disso ainda não estão nos rollups
+    points: list[AuditStatsPoint]
+
+
+class AuditExportCreate(BaseModel):
+    """Filtros do export em segundo plano (os mesmos de GET /audit-logs/)."""
+
+    user_id: Optional[int] = None
+    user_email: Optional[str] = Field(None, max_length=255)
+    action: Optional[str] = Field(None, max_length=50)
+    resource_type: Optional[str] = Field(None, max_length=50)
+    result: Optional[str] = Field(None, max_length=20)
+    date_from: Optional[datetime] = None
+    date_to: Optional[datetime] = None
+    cidr: Optional[str] = Field(None, max_length=49)
+    changes_contains: Optional[str] = Field(None, max_length=300)
+    email_match: str = Field("contains", pattern="^(exact|prefix|contains)$")
+    action_match: str = Field("contains", pattern="^(exact|prefix|contains)$")
+
+    @field_validator("cidr")
+    @classmethod
+    def normalize_cidr(cls, v: Optional[str]) -> Optional[str]:
+        return str(parse_network(v)) if v else v
+
+
+class AuditExportJobOut(BaseModel):
+    id: str
+    status: str  # queued | running | done | failed
+    rows_written: int
+    rows_estimated: Optional[int] = None  # limite superior, para a barra de progresso
+    file_size: Optional[int] = None
+    error: Optional[str] = None
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    download_url: Optional[str] = None
 
     model_config = {"from_attributes": True}
 
@@ -28,3 +85,26 @@ class AuditLogListResponse(BaseModel):
     total: int
     skip: int
     limit: int
+
+
+def audit_log_payload(log) -> dict:
+    """
+    Serializa um AuditLog direto para dict, sem passar pela validação do Pydantic.
+    Usado nas listagens, que devolvem ORJSONResponse em vez de AuditLogOut.
+    """
+    return {
+        "id": log.id,
+        "user_id": log.user_id,
+        "user_email": log.user_email,
+        "action": log.action,
+        "resource_type": log.resource_type,
+        "resource_id": log.resource_id,
+        "result": log.result,
+        "ip_address": log.ip_address,
+        "user_agent": log.user_agent,
+        "changes": log.changes,
+        "detail": log.detail,
+        "created_at": log.created_at,
+        "occurrence_count": log.occurrence_count,
+        "last_occurred_at": log.last_occurred_at,
+    }
@@ -51,6 +51,22 @@ class UserUpdate(BaseModel):
         return v
 
 
+class BulkUserRowResult(BaseModel):
+    row: int
+    email: str | None = None
+    status: str  # created | valid | error
+    id: int | None = None
+    errors: list[str] = []
+
+
+class BulkUserImportResult(BaseModel):
+    dry_run: bool
+    total: int
+    created: int
+    failed: int
+    items: list[BulkUserRowResult]
+
+
 class UserOut(BaseModel):
     id: int
     email: str
@@ -60,3 +76,19 @@ class UserOut(BaseModel):
     permissions: list[str] = []
 
     model_config = {"from_attributes": True}
+
+
+def user_payload(user, permissions: list[str]) -> dict:
+    """
+    Serializa um User (com roles carregados) direto para dict no formato de UserOut;
+    permissions vem de user_effective_permissions (effective_permission_service).
+    Evita a dupla validação (UserOut + response_model) nas listagens.
+    """
+    return {
+        "id": user.id,
+        "email": user.email,
+        "full_name": user.full_name,
+        "is_active": user.is_active,
+        "roles": sorted({r.name for r in user.roles}),
+        "permissions": permissions,
+    }
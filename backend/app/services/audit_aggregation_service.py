@@ -0,0 +1,152 @@
+"""
+Agregação de eventos de auditoria ruidosos (ex.: login.failure num ataque de
+credential stuffing).
+
+Para as actions de AUDIT_AGGREGATE_ACTIONS, a primeira ocorrência de cada chave
+(action, detail, ip, user_email) é gravada na hora, como qualquer evento. Depois do
+commit ela abre uma janela de AUDIT_AGGREGATE_WINDOW_SECONDS: as repetições dentro da
+janela não geram linhas, só contam num buffer em memória do worker. Um job periódico
+(flush) fecha as janelas vencidas somando as repetições em occurrence_count e gravando
+last_occurred_at na linha da primeira ocorrência e publicando na outbox um evento com
+o número de repetições (outbox_service.record_repeats).
+
+As janelas são por worker (cada processo grava a sua primeira ocorrência) e contagens
+ainda não gravadas se perdem se o processo cair.
+"""
+import logging
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Optional
+
+from sqlalchemy import DateTime, Integer, bindparam, event, update
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models import AuditLog
+from app.services import outbox_service
+
+logger = logging.getLogger(__name__)
+
+# Limite de memória por worker: chaves com janela aberta. Acima disso os eventos são
+# gravados um a um (sem agregação), como antes.
+_MAX_WINDOWS = 100_000
+
+_PENDING_KEY = "audit_aggregation_pending"
+
+Key = tuple[str, Optional[str], Optional[str], Optional[str]]
+
+
+class _Window:
+    __slots__ = ("audit_log_id", "opened", "repeats", "last_at")
+
+    def __init__(self, audit_log_id: int, opened: float) -> None:
+        self.audit_log_id = audit_log_id
+        self.opened = opened  # time.monotonic()
+        self.repeats = 0
+        self.last_at: Optional[datetime] = None
+
+
+_windows: dict[Key, _Window] = {}
+_closed: list[_Window] = []
+_lock = threading.Lock()
+_actions_cache: tuple[str, frozenset[str]] = ("", frozenset())
+
+
+def aggregated_actions() -> frozenset[str]:
+    global _actions_cache
+    raw = settings.audit_aggregate_actions
+    if _actions_cache[0] != raw:
+        _actions_cache = (raw, frozenset(a.strip() for a in raw.split(",") if a.strip()))
+    return _actions_cache[1]
+
+
+def absorb(key: Key) -> bool:
+    """Conta a repetição se a chave tem janela aberta (o evento não deve ser gravado). O(1), sem I/O."""
+    if key[0] not in aggregated_actions():
+        return False
+    now = time.monotonic()
+    with _lock:
+        window = _windows.get(key)
+        if window is None or now - window.opened >= settings.audit_aggregate_window_seconds:
+            return False
+        window.repeats += 1
+        window.last_at = datetime.now(timezone.utc)
+        return True
+
+
+def track(db: Session, key: Key, audit_log_id: int) -> None:
+    """Primeira ocorrência gravada: a janela abre no commit da sessão (não em rollback)."""
+    if key[0] in aggregated_actions():
+        db.info.setdefault(_PENDING_KEY, []).append((key, audit_log_id))
+
+
+@event.listens_for(Session, "after_commit")
+def _open_windows(session: Session) -> None:
+    pending = session.info.pop(_PENDING_KEY, None)
+    if not pending:
+        return
+    now = time.monotonic()
+    with _lock:
+        for key, audit_log_id in pending:
+            previous = _windows.get(key)
+            if previous is not None:
+                # Janela vencida ainda não gravada pelo flush
+                if previous.repeats:
+                    _closed.append(previous)
+            elif len(_windows) >= _MAX_WINDOWS:
+                continue
+            _windows[key] = _Window(audit_log_id=audit_log_id, opened=now)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_pending(session: Session) -> None:
+    session.info.pop(_PENDING_KEY, None)
+
+
+def flush(db: Session) -> int:
+    """Fecha as janelas vencidas e grava as repetições. Retorna quantas linhas foram atualizadas."""
+    global _closed
+    now = time.monotonic()
+    with _lock:
+        expired = [
+            key for key, w in _windows.items() if now - w.opened >= settings.audit_aggregate_window_seconds
+        ]
+        batch = _closed
+        _closed = []
+        for key in expired:
+            window = _windows.pop(key)
+            if window.repeats:
+                batch.append(window)
+    if not batch:
+        return 0
+    try:
+        _write(db, batch)
+        outbox_service.record_repeats(db, {w.audit_log_id: w.repeats for w in batch})
+        db.commit()
+    except Exception:
+        db.rollback()
+        with _lock:
+            _closed.extend(batch)
+        raise
+    logger.info("audit_aggregation: %s janelas gravadas (%s repetições)", len(batch), sum(w.repeats for w in batch))
+    return len(batch)
+
+
+def _write(db: Session, batch: list[_Window]) -> None:
+    stmt = (
+        update(AuditLog.__table__)
+        .where(AuditLog.id == bindparam("b_id", type_=Integer))
+        .values(
+            occurrence_count=AuditLog.occurrence_count + bindparam("b_repeats", type_=Integer),
+            last_occurred_at=bindparam("b_last", type_=DateTime(timezone=True)),
+        )
+    )
+    params = [{"b_id": w.audit_log_id, "b_repeats": w.repeats, "b_last": w.last_at} for w in batch]
+    db.connection().execute(stmt, params)
+
+
+def clear() -> None:
+    with _lock:
+        _windows.clear()
+        _closed.clear()
@@ -0,0 +1,405 @@
+"""
+Camada fria de audit_logs: arquivos diários comprimidos em AUDIT_ARCHIVE_DIR.
+
+Antes de apagar os eventos que saíram da janela de retenção, purge_old_audit_logs grava
+cada dia (UTC) em `AAAA/MM/audit-AAAA-MM-DD.ndjson.gz`: NDJSON em gzip seguido de um
+rodapé JSON não comprimido (intervalo de created_at/id, user_ids e actions do dia) e do
+trailer `<tamanho do rodapé: 8 bytes><MAGIC>`. O rodapé é lido com um seek no fim do
+arquivo, então a consulta descarta dias inteiros sem descomprimir nada e só percorre os
+arquivos que podem ter eventos do filtro.
+
+A gravação é idempotente: reescrever um dia já arquivado (ex.: queda entre gravar o
+arquivo e apagar as linhas) junta os eventos por (id, created_at). Arquivos mais antigos que
+AUDIT_ARCHIVE_RETENTION_DAYS são removidos.
+"""
+import gzip
+import heapq
+import logging
+import os
+import struct
+import threading
+import zlib
+from collections import OrderedDict
+from collections.abc import Iterator
+from datetime import date, datetime, time, timedelta, timezone
+from itertools import groupby, islice
+from pathlib import Path
+from typing import Any, NamedTuple, Optional
+
+import orjson
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.db.types import normalize_ip
+from app.models import AuditLog
+from app.schemas.audit import audit_log_payload
+from app.services.audit_stream_service import build_event_filter
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"GCAUDIT1"
+_TRAILER = struct.Struct(">Q")
+_CHUNK = 1 << 16
+_FILE_PREFIX = "audit-"
+_FILE_SUFFIX = ".ndjson.gz"
+
+
+class ArchivedAuditLog(NamedTuple):
+    """Evento lido do arquivo frio; mesmos atributos de AuditLog usados nas listagens."""
+
+    id: int
+    user_id: Optional[int]
+    user_email: Optional[str]
+    action: str
+    resource_type: Optional[str]
+    resource_id: Optional[str]
+    result: str
+    ip_address: Optional[str]
+    user_agent: Optional[str]
+    changes: Optional[dict]
+    detail: Optional[str]
+    created_at: datetime
+    # Ausentes nos arquivos gravados antes da agregação de eventos
+    occurrence_count: int = 1
+    last_occurred_at: Optional[datetime] = None
+
+
+def enabled() -> bool:
+    return bool(settings.audit_archive_dir)
+
+
+def _as_utc(value: datetime) -> datetime:
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value.astimezone(timezone.utc)
+
+
+def _iso(value: datetime) -> str:
+    # Sempre com microssegundos, para a comparação como texto ser cronológica
+    return _as_utc(value).isoformat(timespec="microseconds")
+
+
+def hot_window_start(now: Optional[datetime] = None) -> datetime:
+    """Meia-noite (UTC) do dia mais antigo que ainda fica em audit_logs."""
+    now = now or datetime.now(timezone.utc)
+    oldest_day = (now - timedelta(days=settings.audit_log_retention_days)).date()
+    return datetime.combine(oldest_day, time.min, tzinfo=timezone.utc)
+
+
+def reaches_archive(date_from: Optional[datetime]) -> bool:
+    """Se uma consulta a partir de date_from precisa ler também a camada fria."""
+    return enabled() and date_from is not None and _as_utc(date_from) < hot_window_start()
+
+
+def _path_for(day: date) -> Path:
+    return Path(settings.audit_archive_dir) / f"{day:%Y}" / f"{day:%m}" / f"{_FILE_PREFIX}{day.isoformat()}{_FILE_SUFFIX}"
+
+
+def _archived_days() -> list[date]:
+    root = Path(settings.audit_archive_dir)
+    if not root.is_dir():
+        return []
+    days = []
+    for path in root.glob(f"*/*/{_FILE_PREFIX}*{_FILE_SUFFIX}"):
+        try:
+            days.append(date.fromisoformat(path.name[len(_FILE_PREFIX):-len(_FILE_SUFFIX)]))
+        except ValueError:
+            continue
+    return sorted(days)
+
+
+# ── Formato do arquivo ───────────────────────────────────────────────────────
+
+
+def read_footer(path: Path) -> tuple[dict, int]:
+    """Rodapé do arquivo e o tamanho do corpo gzip. Levanta ValueError se o arquivo não é um arquivo frio."""
+    with path.open("rb") as f:
+        f.seek(0, os.SEEK_END)
+        size = f.tell()
+        tail = _TRAILER.size + len(MAGIC)
+        if size < tail:
+            raise ValueError(f"Arquivo de auditoria inválido: {path}")
+        f.seek(size - tail)
+        trailer = f.read(tail)
+        if trailer[_TRAILER.size:] != MAGIC:
+            raise ValueError(f"Arquivo de auditoria inválido: {path}")
+        (footer_size,) = _TRAILER.unpack(trailer[:_TRAILER.size])
+        body_size = size - tail - footer_size
+        f.seek(body_size)
+        return orjson.loads(f.read(footer_size)), body_size
+
+
+def _iter_records(path: Path, body_size: int) -> Iterator[dict]:
+    """Descomprime o corpo em blocos (sem carregar o arquivo inteiro), uma linha por evento."""
+    decompressor = zlib.decompressobj(zlib.MAX_WBITS | 16)
+    pending = b""
+    remaining = body_size
+    with path.open("rb") as f:
+        while remaining:
+            chunk = f.read(min(_CHUNK, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            *lines, pending = (pending + decompressor.decompress(chunk)).split(b"\n")
+            for line in lines:
+                if line:
+                    yield orjson.loads(line)
+    pending += decompressor.flush()
+    for line in pending.split(b"\n"):
+        if line:
+            yield orjson.loads(line)
+
+
+def _write_day(day: date, records: Iterator[dict]) -> int:
+    """Grava o arquivo do dia (temporário + rename atômico). Retorna quantos eventos ele contém."""
+    path = _path_for(day)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + ".tmp")
+    footer: dict[str, Any] = {"version": 1, "day": day.isoformat(), "count": 0}
+    user_ids: set[int] = set()
+    actions: set[str] = set()
+    min_created = max_created = None
+    min_id = max_id = None
+    with tmp.open("wb") as raw:
+        with gzip.GzipFile(fileobj=raw, mode="wb", mtime=0) as body:
+            for record in records:
+                body.write(orjson.dumps(record) + b"\n")
+                footer["count"] += 1
+                created = record["created_at"]
+                min_created = created if min_created is None else min(min_created, created)
+                max_created = created if max_created is None else max(max_created, created)
+                min_id = record["id"] if min_id is None else min(min_id, record["id"])
+                max_id = record["id"] if max_id is None else max(max_id, record["id"])
+                if record["user_id"] is not None:
+                    user_ids.add(record["user_id"])
+                actions.add(record["action"])
+        footer.update(
+            min_created_at=min_created,
+            max_created_at=max_created,
+            min_id=min_id,
+            max_id=max_id,
+            user_ids=sorted(user_ids),
+            actions=sorted(actions),
+        )
+        encoded = orjson.dumps(footer)
+        raw.write(encoded + _TRAILER.pack(len(encoded)) + MAGIC)
+        raw.flush()
+        os.fsync(raw.fileno())
+    os.replace(tmp, path)
+    return footer["count"]
+
+
+def _record(entry: AuditLog) -> dict:
+    record = audit_log_payload(entry)
+    record["ip_address"] = normalize_ip(record["ip_address"])
+    # Timestamps ISO em UTC: comparáveis como texto no rodapé e na leitura
+    record["created_at"] = _iso(entry.created_at)
+    return record
+
+
+# ── Arquivamento ─────────────────────────────────────────────────────────────
+
+
+def archive_before(db: Session, cutoff: datetime) -> int:
+    """
+    Grava nos arquivos frios os eventos com created_at < cutoff (alinhado ao dia), sem
+    apagá-los. Dias já arquivados são reescritos juntando os eventos já gravados. Os
+    eventos passam em streaming do cursor para o gzip: a memória não depende do tamanho
+    do dia.
+    """
+    stmt = (
+        select(AuditLog)
+        .where(AuditLog.created_at < cutoff)
+        .order_by(AuditLog.created_at, AuditLog.id)
+        .execution_options(yield_per=2_000)
+    )
+    records = (_record(entry) for entry in db.scalars(stmt))
+    archived = 0
+    for day, day_records in groupby(records, key=lambda r: date.fromisoformat(r["created_at"][:10])):
+        archived += _merge_day(day, day_records)
+    return archived
+
+
+def _sort_key(record: dict) -> tuple[str, int]:
+    return record["created_at"], record["id"]
+
+
+def _merge_day(day: date, records: Iterator[dict]) -> int:
+    """
+    Grava o dia juntando em streaming os eventos novos (em ordem de created_at, id) com
+    os do arquivo existente (gravado na mesma ordem). Na mesma chave (id, created_at) fica
+    o evento novo: o SQLite pode reaproveitar ids de linhas já purgadas, daí o created_at.
+    """
+    path = _path_for(day)
+    if path.exists():
+        _, body_size = read_footer(path)
+        # heapq.merge é estável: em chaves iguais o evento novo (primeira entrada) vem antes
+        merged = heapq.merge(records, _iter_records(path, body_size), key=_sort_key)
+        records = (r for r, previous in _pairwise_keys(merged) if _sort_key(r) != previous)
+    count = _write_day(day, records)
+    logger.info("audit_archive: %s eventos arquivados em %s", count, path.name)
+    return count
+
+
+def _pairwise_keys(records: Iterator[dict]) -> Iterator[tuple[dict, Optional[tuple[str, int]]]]:
+    """Cada evento com a chave do anterior (para descartar a cópia antiga da mesma chave)."""
+    previous = None
+    for record in records:
+        yield record, previous
+        previous = _sort_key(record)
+
+
+def prune_archive(now: Optional[datetime] = None) -> int:
+    """Remove arquivos de dias mais antigos que AUDIT_ARCHIVE_RETENTION_DAYS."""
+    now = now or datetime.now(timezone.utc)
+    oldest_kept = (now - timedelta(days=settings.audit_archive_retention_days)).date()
+    removed = 0
+    for day in _archived_days():
+        if day < oldest_kept:
+            _path_for(day).unlink(missing_ok=True)
+            removed += 1
+    return removed
+
+
+# ── Consulta ─────────────────────────────────────────────────────────────────
+
+
+def _footer_may_match(footer: dict, user_id: Optional[int], action_filter) -> bool:
+    if not footer["count"]:
+        return False
+    if user_id is not None and user_id not in footer["user_ids"]:
+        return False
+    return action_filter is None or any(action_filter({"action": a}) for a in footer["actions"])
+
+
+def _candidate_days(
+    date_from: datetime,
+    date_to: Optional[datetime],
+    filters: dict,
+    *,
+    newest_first: bool,
+) -> Iterator[tuple[Path, dict, int, str, str]]:
+    """Arquivos cujo rodapé pode ter eventos do filtro no período: (path, rodapé, corpo, de, até)."""
+    date_from = _as_utc(date_from)
+    date_to = _as_utc(date_to) if date_to else datetime.now(timezone.utc)
+    lower, upper = _iso(date_from), _iso(date_to)
+    action = filters.get("action")
+    action_filter = (
+        build_event_filter(action=action, action_match=filters.get("action_match", "contains"))
+        if action
+        else None
+    )
+    days = _archived_days()
+    for day in reversed(days) if newest_first else days:
+        if not date_from.date() <= day <= date_to.date():
+            continue
+        path = _path_for(day)
+        footer, body_size = read_footer(path)
+        if not _footer_may_match(footer, filters.get("user_id"), action_filter):
+            continue
+        if footer["max_created_at"] < lower or footer["min_created_at"] > upper:
+            continue
+        yield path, footer, body_size, lower, upper
+
+
+def _day_matches(path: Path, body_size: int, lower: str, upper: str, event_filter) -> Iterator[dict]:
+    """Eventos do arquivo no período e no filtro, em ordem cronológica (como foram gravados)."""
+    for record in _iter_records(path, body_size):
+        if lower <= record["created_at"] <= upper and event_filter(record):
+            yield record
+
+
+# Contagens por dia já calculadas (arquivo, recorte do dia, filtros): a paginação
+# descomprime só os dias da página, não todos os candidatos a cada chamada
+_COUNT_CACHE: "OrderedDict[tuple, int]" = OrderedDict()
+_COUNT_CACHE_SIZE = 4096
+_count_lock = threading.Lock()
+
+
+def _has_row_filter(filters: dict) -> bool:
+    return any(value not in (None, "") for key, value in filters.items() if not key.endswith("_match"))
+
+
+def _day_count(
+    path: Path, footer: dict, body_size: int, lower: str, upper: str, filters: dict, event_filter
+) -> int:
+    """Eventos do dia no período e no filtro: pelo rodapé quando não há filtro por linha."""
+    # Recorte do período dentro do dia (None: o dia inteiro está no período)
+    bounds = (
+        lower if lower > footer["min_created_at"] else None,
+        upper if upper < footer["max_created_at"] else None,
+    )
+    if bounds == (None, None) and not _has_row_filter(filters):
+        return footer["count"]
+    stat = path.stat()
+    filters_key = orjson.dumps(filters, option=orjson.OPT_SORT_KEYS)
+    key = (str(path), stat.st_mtime_ns, stat.st_size, bounds, filters_key)
+    with _count_lock:
+        cached = _COUNT_CACHE.get(key)
+        if cached is not None:
+            _COUNT_CACHE.move_to_end(key)
+            return cached
+    count = sum(1 for _ in _day_matches(path, body_size, lower, upper, event_filter))
+    with _count_lock:
+        _COUNT_CACHE[key] = count
+        if len(_COUNT_CACHE) > _COUNT_CACHE_SIZE:
+            _COUNT_CACHE.popitem(last=False)
+    return count
+
+
+def _archived(record: dict) -> ArchivedAuditLog:
+    last = record.get("last_occurred_at")
+    return ArchivedAuditLog(
+        **{
+            **record,
+            "created_at": datetime.fromisoformat(record["created_at"]),
+            "last_occurred_at": datetime.fromisoformat(last) if last else None,
+        }
+    )
+
+
+def query_archive(
+    *,
+    date_from: datetime,
+    date_to: Optional[datetime] = None,
+    skip: int = 0,
+    limit: int = 50,
+    **filters,
+) -> tuple[list[ArchivedAuditLog], int]:
+    """
+    Eventos arquivados entre date_from e date_to com os filtros de list_audit_logs
+    (user_id, user_email, action, ..., email_match, action_match), do mais novo para o
+    mais antigo. O total usa a contagem do rodapé quando não há filtro por linha (ou a
+    contagem em cache do dia); só os dias da página são descomprimidos.
+    Retorna (página, total).
+    """
+    event_filter = build_event_filter(**filters)
+    items: list[ArchivedAuditLog] = []
+    total = 0
+    candidates = _candidate_days(date_from, date_to, filters, newest_first=True)
+    for path, footer, body_size, lower, upper in candidates:
+        count = _day_count(path, footer, body_size, lower, upper, filters, event_filter)
+        start = max(skip - total, 0)
+        if len(items) < limit and start < count:
+            # O arquivo está em ordem cronológica e a página vai do mais novo para o mais antigo
+            stop = count - start
+            matches = _day_matches(path, body_size, lower, upper, event_filter)
+            page = list(islice(matches, max(stop - (limit - len(items)), 0), stop))
+            items.extend(_archived(r) for r in reversed(page))
+        total += count
+    return items, total
+
+
+def iter_archive(*, date_from: datetime, date_to: Optional[datetime] = None, **filters) -> Iterator[ArchivedAuditLog]:
+    """Como query_archive, sem paginação e em ordem cronológica, em streaming."""
+    event_filter = build_event_filter(**filters)
+    for path, _, body_size, lower, upper in _candidate_days(date_from, date_to, filters, newest_first=False):
+        for record in _day_matches(path, body_size, lower, upper, event_filter):
+            yield _archived(record)
+
+
+def estimate_archive(*, date_from: datetime, date_to: Optional[datetime] = None, **filters) -> int:
+    """Limite superior de eventos arquivados do filtro, só pelos rodapés (sem descomprimir)."""
+    return sum(
+        footer["count"]
+        for _, footer, _, _, _ in _candidate_days(date_from, date_to, filters, newest_first=True)
+    )
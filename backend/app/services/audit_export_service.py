@@ -0,0 +1,358 @@
+"""
+Jobs de export de audit_logs em segundo plano (POST /audit-logs/exports).
+
+O pedido só grava o job (status queued); um job periódico do worker (run_next) assume
+o mais antigo da fila se houver vaga (AUDIT_EXPORT_MAX_CONCURRENT jobs rodando em todos
+os workers, para proteger o banco principal) e grava o CSV gzip em AUDIT_EXPORT_DIR em
+lotes por id, registrando o progresso a cada lote; uma thread grava o heartbeat a cada
+AUDIT_EXPORT_HEARTBEAT_SECONDS. Pedidos idênticos enquanto o job está na fila ou rodando
+devolvem o mesmo job (índice único parcial em params_hash). Jobs sem heartbeat há
+AUDIT_EXPORT_STALE_SECONDS (worker caiu) voltam para a fila; o próximo claim gera um
+novo token de tentativa (attempt) e toda escrita do worker confere o token, então uma
+tentativa antiga que ainda esteja rodando para sem gravar nada. Arquivos prontos
+expiram após AUDIT_EXPORT_TTL_HOURS.
+"""
+import csv
+import gzip
+import hashlib
+import io
+import logging
+import os
+import threading
+import uuid
+from collections.abc import Iterable
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Optional
+
+import orjson
+from sqlalchemy import and_, func, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models import AuditExportJob, AuditLog
+from app.services import audit_archive_service
+from app.services.audit_service import audit_log_conditions, parse_changes_predicate
+
+logger = logging.getLogger(__name__)
+
+ACTIVE_STATUSES = ("queued", "running")
+
+CSV_HEADER = [
+    "id",
+    "created_at",
+    "user_id",
+    "user_email",
+    "action",
+    "resource_type",
+    "resource_id",
+    "result",
+    "ip_address",
+    "detail",
+    "occurrence_count",
+    "last_occurred_at",
+]
+
+# Chave do pg_advisory_xact_lock que serializa a escolha do próximo job entre workers
+_CLAIM_LOCK_KEY = 0x61756478  # "audx"
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def _params_hash(params: dict) -> str:
+    return hashlib.sha256(orjson.dumps(params, option=orjson.OPT_SORT_KEYS)).hexdigest()
+
+
+def file_path(job: AuditExportJob) -> Path:
+    return Path(settings.audit_export_dir) / f"audit_logs-{job.id}.csv.gz"
+
+
+def csv_row(log) -> list:
+    """Linha do CSV de export (AuditLog ou ArchivedAuditLog); usada também por GET /export."""
+    return [
+        log.id,
+        log.created_at.isoformat(),
+        log.user_id,
+        log.user_email,
+        log.action,
+        log.resource_type,
+        log.resource_id,
+        log.result,
+        log.ip_address,
+        log.detail,
+        log.occurrence_count,
+        log.last_occurred_at.isoformat() if log.last_occurred_at else None,
+    ]
+
+
+# ── Pedido ───────────────────────────────────────────────────────────────────
+
+
+def request_export(db: Session, params: dict, *, user_id: Optional[int]) -> tuple[AuditExportJob, bool]:
+    """
+    Enfileira o export com os filtros `params` (chaves de AuditExportCreate, datas em
+    ISO 8601). Retorna (job, criado); criado=False quando já havia um job idêntico na
+    fila ou rodando. Levanta ValueError para changes_contains inválido.
+    """
+    if params.get("changes_contains"):
+        parse_changes_predicate(params["changes_contains"])
+    params_hash = _params_hash(params)
+    active = select(AuditExportJob).where(
+        AuditExportJob.params_hash == params_hash, AuditExportJob.status.in_(ACTIVE_STATUSES)
+    )
+    existing = db.scalars(active).first()
+    if existing is not None:
+        return existing, False
+
+    job = AuditExportJob(
+        id=uuid.uuid4().hex,
+        params_hash=params_hash,
+        params=params,
+        status="queued",
+        created_by=user_id,
+        rows_written=0,
+    )
+    db.add(job)
+    try:
+        db.commit()
+    except IntegrityError:
+        # Outro pedido idêntico gravou primeiro (índice único parcial em params_hash)
+        db.rollback()
+        existing = db.scalars(active).first()
+        if existing is None:
+            raise
+        return existing, False
+    return job, True
+
+
+# ── Worker ───────────────────────────────────────────────────────────────────
+
+
+class ClaimLost(RuntimeError):
+    """O job voltou para a fila (sem heartbeat) e outra tentativa o assumiu."""
+
+
+def _claim(db: Session) -> Optional[AuditExportJob]:
+    """
+    Assume o job mais antigo da fila se houver vaga, com um token de tentativa novo;
+    commit antes de começar a exportar.
+    """
+    if db.get_bind().dialect.name == "postgresql":
+        db.execute(select(func.pg_advisory_xact_lock(_CLAIM_LOCK_KEY)))
+    stale = _now() - timedelta(seconds=settings.audit_export_stale_seconds)
+    requeued = db.execute(
+        update(AuditExportJob)
+        .where(AuditExportJob.status == "running", AuditExportJob.heartbeat_at < stale)
+        .values(status="queued", rows_written=0, attempt=None)
+    ).rowcount
+    if requeued:
+        logger.warning("audit_export: %s jobs sem heartbeat voltaram para a fila", requeued)
+
+    running = db.scalar(
+        select(func.count()).select_from(AuditExportJob).where(AuditExportJob.status == "running")
+    )
+    job = None
+    if running < settings.audit_export_max_concurrent:
+        job = db.scalars(
+            select(AuditExportJob)
+            .where(AuditExportJob.status == "queued")
+            .order_by(AuditExportJob.created_at)
+            .limit(1)
+        ).first()
+    if job is not None:
+        job.status = "running"
+        job.attempt = uuid.uuid4().hex
+        job.started_at = job.heartbeat_at = _now()
+    db.commit()
+    return job
+
+
+def _owned(job_id: str, attempt: str):
+    """Condição das escritas do worker: o job ainda está com esta tentativa."""
+    return and_(
+        AuditExportJob.id == job_id,
+        AuditExportJob.attempt == attempt,
+        AuditExportJob.status == "running",
+    )
+
+
+class _Heartbeat(threading.Thread):
+    """
+    Heartbeat por tempo, numa sessão própria: cobre a contagem estimada, a leitura do
+    arquivo frio e filtros seletivos que demoram a produzir linhas. Se o job não é mais
+    desta tentativa, marca `lost` e o export para no próximo lote.
+    """
+
+    def __init__(self, bind, job_id: str, attempt: str) -> None:
+        super().__init__(name=f"audit-export-heartbeat-{job_id}", daemon=True)
+        self.bind = bind
+        self.job_id = job_id
+        self.attempt = attempt
+        self.lost = threading.Event()
+        self._done = threading.Event()
+
+    def run(self) -> None:
+        while not self._done.wait(settings.audit_export_heartbeat_seconds):
+            try:
+                with Session(self.bind) as db:
+                    beat = db.execute(
+                        update(AuditExportJob)
+                        .where(_owned(self.job_id, self.attempt))
+                        .values(heartbeat_at=_now())
+                    )
+                    db.commit()
+            except Exception:
+                logger.exception("audit_export: falha no heartbeat do job %s", self.job_id)
+                continue
+            if not beat.rowcount:
+                self.lost.set()
+                return
+
+    def stop(self) -> None:
+        self._done.set()
+        self.join()
+
+
+def _filters(params: dict) -> dict:
+    filters = dict(params)
+    for key in ("date_from", "date_to"):
+        if filters.get(key):
+            filters[key] = datetime.fromisoformat(filters[key])
+    return filters
+
+
+def _hot_rows(db: Session, conditions: list) -> Iterable[list]:
+    """Linhas CSV de audit_logs do filtro em ordem de id, em lotes (keyset: sem OFFSET)."""
+    last_id = 0
+    while True:
+        batch = db.scalars(
+            select(AuditLog)
+            .where(and_(*conditions, AuditLog.id > last_id))
+            .order_by(AuditLog.id)
+            .limit(settings.audit_export_chunk_size)
+        ).all()
+        if not batch:
+            return
+        last_id = batch[-1].id
+        # Converte antes de soltar os objetos: o progresso faz commit no meio do lote
+        rows = [csv_row(log) for log in batch]
+        db.expunge_all()
+        yield from rows
+
+
+def _write(db: Session, owner: _Heartbeat, rows: Iterable[list], out) -> None:
+    """Grava as linhas no arquivo, registrando o progresso a cada lote."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    pending = 0
+    for row in rows:
+        writer.writerow(row)
+        pending += 1
+        if pending == settings.audit_export_chunk_size:
+            _flush_chunk(db, owner, buffer, out, pending)
+            pending = 0
+    _flush_chunk(db, owner, buffer, out, pending)
+
+
+def _flush_chunk(db: Session, owner: _Heartbeat, buffer: io.StringIO, out, rows: int) -> None:
+    if owner.lost.is_set():
+        raise ClaimLost(owner.job_id)
+    out.write(buffer.getvalue().encode())
+    buffer.seek(0)
+    buffer.truncate()
+    updated = db.execute(
+        update(AuditExportJob)
+        .where(_owned(owner.job_id, owner.attempt))
+        .values(rows_written=AuditExportJob.rows_written + rows)
+    ).rowcount
+    db.commit()
+    if not updated:
+        raise ClaimLost(owner.job_id)
+
+
+def _export(db: Session, job: AuditExportJob, owner: _Heartbeat, tmp: Path) -> None:
+    job_id, attempt = job.id, job.attempt
+    filters = _filters(job.params)
+    conditions = audit_log_conditions(db, **filters)
+    estimated = 0
+    if conditions is not None:
+        estimated += db.scalar(
+            select(func.count()).select_from(AuditLog).where(and_(*conditions))
+        ) or 0
+    reaches_archive = audit_archive_service.reaches_archive(filters.get("date_from"))
+    if reaches_archive:
+        estimated += audit_archive_service.estimate_archive(**filters)
+    db.execute(update(AuditExportJob).where(_owned(job_id, attempt)).values(rows_estimated=estimated))
+    db.commit()
+
+    path = file_path(job)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with gzip.open(tmp, "wb") as out:
+        out.write((",".join(CSV_HEADER) + "\r\n").encode())
+        # Ordem cronológica: primeiro a camada fria (dias mais antigos), depois audit_logs
+        if reaches_archive:
+            archived = audit_archive_service.iter_archive(**filters)
+            _write(db, owner, (csv_row(log) for log in archived), out)
+        if conditions is not None:
+            _write(db, owner, _hot_rows(db, conditions), out)
+
+    # Trava a linha do job (Postgres) entre a checagem da tentativa e a publicação do arquivo
+    owned = db.scalars(select(AuditExportJob).where(_owned(job_id, attempt)).with_for_update()).first()
+    if owned is None:
+        db.rollback()
+        raise ClaimLost(job_id)
+    os.replace(tmp, path)
+    owned.status = "done"
+    owned.file_size = path.stat().st_size
+    owned.finished_at = _now()
+    db.commit()
+
+
+def run_next(db: Session) -> Optional[str]:
+    """Executa um job da fila, se houver vaga. Retorna o id do job executado."""
+    purge_expired(db)
+    job = _claim(db)
+    if job is None:
+        return None
+    job_id, attempt = job.id, job.attempt
+    # Arquivo temporário por tentativa: uma tentativa antiga ainda rodando não o compartilha
+    tmp = file_path(job).with_name(f"{file_path(job).name}.{attempt}.tmp")
+    owner = _Heartbeat(db.get_bind(), job_id, attempt)
+    owner.start()
+    try:
+        _export(db, job, owner, tmp)
+        logger.info("audit_export: job %s concluído", job_id)
+    except ClaimLost:
+        db.rollback()
+        logger.warning("audit_export: job %s assumido por outra tentativa; abandonando", job_id)
+    except Exception as exc:
+        db.rollback()
+        logger.exception("audit_export: job %s falhou", job_id)
+        db.execute(
+            update(AuditExportJob)
+            .where(_owned(job_id, attempt))
+            .values(status="failed", error=str(exc)[:500], finished_at=_now())
+        )
+        db.commit()
+    finally:
+        owner.stop()
+        tmp.unlink(missing_ok=True)
+    return job_id
+
+
+def purge_expired(db: Session) -> int:
+    """Remove jobs concluídos (e seus arquivos) há mais de AUDIT_EXPORT_TTL_HOURS."""
+    cutoff = _now() - timedelta(hours=settings.audit_export_ttl_hours)
+    expired = db.scalars(
+        select(AuditExportJob).where(
+            AuditExportJob.status.in_(("done", "failed")), AuditExportJob.finished_at < cutoff
+        )
+    ).all()
+    for job in expired:
+        file_path(job).unlink(missing_ok=True)
+        db.delete(job)
+    db.commit()
+    return len(expired)
@@ -0,0 +1,268 @@
+"""
+Rollups de audit_logs para o dashboard (GET /audit-logs/stats).
+
+Três tabelas pré-agregadas: eventos por (hora, action, result), por (dia, action,
+result) e por (dia, usuário).
+Um job periódico (refresh_rollups) agrega em lotes por faixa de id os eventos depois da
+marca d'água e soma as contagens com upsert; a consulta de estatísticas lê só os
+rollups, então o custo não depende do tamanho de audit_logs. Eventos mais novos que
+AUDIT_ROLLUP_LAG_SECONDS ainda não entram (transações abertas podem gravar ids menores),
+nem mais novos que a janela de agregação (occurrence_count ainda pode crescer).
+
+rebuild_rollups recalcula a partir de uma data (ou de tudo), para backfill e correção.
+"""
+import logging
+from datetime import date, datetime, time, timedelta, timezone
+
+from sqlalchemy import Date, and_, cast, delete, func, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models import (
+    AuditAction,
+    AuditDailyCount,
+    AuditDailyUserCount,
+    AuditHourlyCount,
+    AuditLog,
+    AuditResult,
+    AuditRollupState,
+)
+from app.services.dimension_service import audit_actions, audit_results
+
+logger = logging.getLogger(__name__)
+
+ROLLUP_NAME = "audit_logs"
+
+# Janela máxima por consulta de estatísticas (pontos devolvidos ficam limitados)
+MAX_RANGE = {"hour": timedelta(days=31), "day": timedelta(days=366)}
+
+
+def _is_postgres(db: Session) -> bool:
+    return db.get_bind().dialect.name == "postgresql"
+
+
+def _hour_bucket(db: Session):
+    if _is_postgres(db):
+        # Truncar em UTC (não no TimeZone da sessão) e voltar a timestamptz
+        return func.timezone("UTC", func.date_trunc("hour", func.timezone("UTC", AuditLog.created_at)))
+    # Mesmo formato em que o SQLAlchemy grava DateTime no SQLite
+    return func.strftime("%Y-%m-%d %H:00:00.000000", AuditLog.created_at)
+
+
+def _day_bucket(db: Session):
+    if _is_postgres(db):
+        return cast(func.timezone("UTC", AuditLog.created_at), Date)
+    return func.date(AuditLog.created_at)
+
+
+def _upsert(db: Session, table, key_columns: list[str], rows_select) -> None:
+    dialect_insert = pg_insert if _is_postgres(db) else sqlite_insert
+    stmt = dialect_insert(table).from_select(key_columns + ["count"], rows_select)
+    db.execute(
+        stmt.on_conflict_do_update(
+            index_elements=key_columns,
+            set_={"count": table.c.count + stmt.excluded.count},
+        )
+    )
+
+
+def _aggregate(db: Session, condition) -> None:
+    """Soma nos rollups os eventos de audit_logs que atendem à condição (com as repetições agregadas)."""
+    hour = _hour_bucket(db).label("bucket")
+    _upsert(
+        db,
+        AuditHourlyCount.__table__,
+        ["bucket", "action_id", "result_id"],
+        select(hour, AuditLog.action_id, AuditLog.result_id, func.sum(AuditLog.occurrence_count))
+        .where(condition)
+        .group_by(hour, AuditLog.action_id, AuditLog.result_id),
+    )
+    day = _day_bucket(db).label("day")
+    _upsert(
+        db,
+        AuditDailyCount.__table__,
+        ["day", "action_id", "result_id"],
+        select(day, AuditLog.action_id, AuditLog.result_id, func.sum(AuditLog.occurrence_count))
+        .where(condition)
+        .group_by(day, AuditLog.action_id, AuditLog.result_id),
+    )
+    _upsert(
+        db,
+        AuditDailyUserCount.__table__,
+        ["day", "user_id"],
+        select(day, AuditLog.user_id, func.sum(AuditLog.occurrence_count))
+        .where(condition, AuditLog.user_id.is_not(None))
+        .group_by(day, AuditLog.user_id),
+    )
+
+
+def _locked_state(db: Session) -> AuditRollupState:
+    """Estado dos rollups, travado até o commit (dois workers não agregam o mesmo lote)."""
+    stmt = select(AuditRollupState).where(AuditRollupState.name == ROLLUP_NAME)
+    state = db.scalars(stmt.with_for_update().execution_options(populate_existing=True)).first()
+    if state is None:
+        state = AuditRollupState(name=ROLLUP_NAME, last_audit_log_id=0)
+        db.add(state)
+        db.flush()
+    return state
+
+
+def refresh_rollups(db: Session, *, batch_size: int | None = None) -> int:
+    """
+    Agrega os eventos novos (id acima da marca d'água e mais antigos que o lag), um
+    commit por lote. Retorna quantos eventos entraram nos rollups.
+    """
+    batch_size = batch_size or settings.audit_rollup_batch_size
+    # Linhas de actions agregadas só ficam completas depois que a janela fecha e é gravada
+    lag = max(
+        settings.audit_rollup_lag_seconds,
+        settings.audit_aggregate_window_seconds + settings.audit_aggregate_flush_seconds,
+    )
+    cutoff = datetime.now(timezone.utc) - timedelta(seconds=lag)
+    upper = db.scalar(select(func.max(AuditLog.id)).where(AuditLog.created_at < cutoff)) or 0
+
+    processed = 0
+    while True:
+        state = _locked_state(db)
+        start = state.last_audit_log_id
+        if start >= upper:
+            state.rolled_up_to = cutoff
+            db.commit()
+            break
+        end = min(start + batch_size, upper)
+        in_batch = and_(AuditLog.id > start, AuditLog.id <= end)
+        processed += db.scalar(select(func.count()).select_from(AuditLog).where(in_batch)) or 0
+        _aggregate(db, in_batch)
+        state.last_audit_log_id = end
+        db.commit()
+
+    if processed:
+        logger.info("audit_rollup: %s eventos agregados", processed)
+    return processed
+
+
+def rebuild_rollups(db: Session, *, since: date | None = None) -> int:
+    """
+    Recalcula os rollups a partir do dia `since` (UTC) ou desde o início: apaga os
+    buckets do período e reagrega os eventos ainda presentes em audit_logs até a marca
+    d'água, em lotes. Eventos já removidos pela retenção deixam de ser contados.
+    """
+    state = _locked_state(db)
+    watermark = state.last_audit_log_id
+    hourly = delete(AuditHourlyCount)
+    daily = delete(AuditDailyCount)
+    daily_users = delete(AuditDailyUserCount)
+    first_id = 0
+    if since is not None:
+        boundary = datetime.combine(since, time.min, tzinfo=timezone.utc)
+        hourly = hourly.where(AuditHourlyCount.bucket >= boundary)
+        daily = daily.where(AuditDailyCount.day >= since)
+        daily_users = daily_users.where(AuditDailyUserCount.day >= since)
+        first_id = (db.scalar(
+            select(func.min(AuditLog.id)).where(AuditLog.created_at >= boundary)
+        ) or watermark + 1) - 1
+    db.execute(hourly)
+    db.execute(daily)
+    db.execute(daily_users)
+
+    processed = 0
+    batch_size = settings.audit_rollup_batch_size
+    for start in range(first_id, watermark, batch_size):
+        in_batch = and_(AuditLog.id > start, AuditLog.id <= min(start + batch_size, watermark))
+        if since is not None:
+            in_batch = and_(in_batch, AuditLog.created_at >= boundary)
+        processed += db.scalar(select(func.count()).select_from(AuditLog).where(in_batch)) or 0
+        _aggregate(db, in_batch)
+    db.commit()
+    logger.info("audit_rollup: rebuild com %s eventos (desde %s)", processed, since or "o início")
+    return processed
+
+
+def _as_utc(value: datetime) -> datetime:
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value.astimezone(timezone.utc)
+
+
+def get_stats(
+    db: Session,
+    *,
+    by: str = "action",
+    interval: str = "hour",
+    date_from: datetime | None = None,
+    date_to: datetime | None = None,
+    action: str | None = None,
+    result: str | None = None,
+    user_id: int | None = None,
+) -> dict:
+    """
+    Série temporal a partir dos rollups. by=action: contagens por (bucket, action,
+    result) em horas ou dias (cada intervalo tem a sua tabela, sem somar em Python);
+    by=user: contagens por (dia, usuário). Levanta ValueError
+    para combinação inválida ou janela maior que MAX_RANGE.
+    """
+    if by == "user" and interval != "day":
+        raise ValueError("Estatísticas por usuário só existem por dia (interval=day)")
+    date_to = _as_utc(date_to or datetime.now(timezone.utc))
+    date_from = _as_utc(date_from or date_to - (timedelta(days=1) if interval == "hour" else timedelta(days=30)))
+    if date_from > date_to or date_to - date_from > MAX_RANGE[interval]:
+        raise ValueError(f"Período inválido: máximo de {MAX_RANGE[interval].days} dias para interval={interval}")
+
+    state = db.get(AuditRollupState, ROLLUP_NAME)
+    response = {
+        "by": by,
+        "interval": interval,
+        "date_from": date_from,
+        "date_to": date_to,
+        "rolled_up_to": state.rolled_up_to if state else None,
+        "points": [],
+    }
+
+    if by == "user":
+        stmt = (
+            select(AuditDailyUserCount.day, AuditDailyUserCount.user_id, AuditDailyUserCount.count)
+            .where(AuditDailyUserCount.day >= date_from.date(), AuditDailyUserCount.day <= date_to.date())
+            .order_by(AuditDailyUserCount.day, AuditDailyUserCount.user_id)
+        )
+        if user_id is not None:
+            stmt = stmt.where(AuditDailyUserCount.user_id == user_id)
+        response["points"] = [
+            {"bucket": row.day.isoformat(), "user_id": row.user_id, "count": row.count}
+            for row in db.execute(stmt)
+        ]
+        return response
+
+    if interval == "day":
+        table = AuditDailyCount
+        bucket_column = AuditDailyCount.day
+        window = (AuditDailyCount.day >= date_from.date(), AuditDailyCount.day <= date_to.date())
+    else:
+        table = AuditHourlyCount
+        bucket_column = AuditHourlyCount.bucket
+        window = (AuditHourlyCount.bucket >= date_from, AuditHourlyCount.bucket <= date_to)
+    stmt = select(bucket_column.label("bucket"), table.action_id, table.result_id, table.count).where(*window)
+    if action:
+        action_ids = audit_actions.ids_matching(db, action)
+        if not action_ids:
+            return response
+        stmt = stmt.where(table.action_id.in_(action_ids))
+    if result:
+        result_id = audit_results.lookup(db, result)
+        if result_id is None:
+            return response
+        stmt = stmt.where(table.result_id == result_id)
+
+    action_names = dict(db.execute(select(AuditAction.id, AuditAction.name)).all())
+    result_names = dict(db.execute(select(AuditResult.id, AuditResult.name)).all())
+    points = [
+        {
+            "bucket": row.bucket.isoformat() if interval == "day" else _as_utc(row.bucket).isoformat(),
+            "action": action_names.get(row.action_id),
+            "result": result_names.get(row.result_id),
+            "count": row.count,
+        }
+        for row in db.execute(stmt)
+    ]
+    points.sort(key=lambda p: (p["bucket"], p["action"] or "", p["result"] or ""))
+    response["points"] = points
+    return response
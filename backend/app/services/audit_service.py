@@ -1,13 +1,29 @@
 # app/services/audit_service.py
 
 from __future__ import annotations
+import json
 from datetime import datetime, timezone, timedelta
+from itertools import islice
 from typing import Optional, Any
 from sqlalchemy.orm import Session
-from sqlalchemy import select, func, delete, and_
+from sqlalchemy import cast, column, insert, literal, select, func, delete, and_, table
+from sqlalchemy.dialects.postgresql import JSONB
 
-from app.models.rbac import AuditLog
+from app.models.rbac import AUDIT_EMAIL_FTS, AuditChangeValue, AuditLog
 from app.core.config import settings
+from app.db.types import ip_in_network
+from app.services import (
+    audit_aggregation_service,
+    audit_archive_service,
+    audit_stream_service,
+    outbox_service,
+)
+from app.services.dimension_service import (
+    audit_actions,
+    audit_resource_types,
+    audit_results,
+    user_agents,
+)
 
 
 def _extract_ip(request) -> Optional[str]:
@@ -27,6 +43,70 @@ def _extract_ua(request) -> Optional[str]:
     return (request.headers.get("User-Agent") or "")[:512]
 
 
+# Limites do fallback audit_change_values (colunas path/value)
+_MAX_CHANGE_PATH = 200
+_MAX_CHANGE_VALUE = 255
+_MAX_CHANGE_LEAVES = 100
+
+
+def _uses_jsonb(db: Session) -> bool:
+    return db.get_bind().dialect.name == "postgresql"
+
+
+def _encode_change_value(value: Any) -> str:
+    # Float inteiro vira int: no JSONB 2 e 2.0 são o mesmo número
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":"))
+
+
+def _change_leaves(changes: dict, prefix: str = ""):
+    """Folhas escalares de changes como (caminho com pontos, valor em JSON). Listas são ignoradas."""
+    for key, value in changes.items():
+        path = f"{prefix}{key}"
+        if isinstance(value, dict):
+            yield from _change_leaves(value, f"{path}.")
+        elif not isinstance(value, list):
+            encoded = _encode_change_value(value)
+            if len(path) <= _MAX_CHANGE_PATH and len(encoded) <= _MAX_CHANGE_VALUE:
+                yield path, encoded
+
+
+def parse_changes_predicate(predicate: str) -> tuple[list[str], Any]:
+    """
+    Lê 'after.is_active=false' como (['after', 'is_active'], False). O valor é JSON
+    (false, 42, null, "texto"); se não for JSON válido, é tratado como string.
+    Levanta ValueError para predicado malformado ou valor não escalar.
+    """
+    path, sep, raw = predicate.partition("=")
+    keys = path.strip().split(".")
+    if not sep or not all(keys):
+        raise ValueError("changes_contains deve ter o formato caminho.da.chave=valor")
+    try:
+        value = json.loads(raw)
+    except ValueError:
+        value = raw
+    if isinstance(value, (dict, list)):
+        raise ValueError("changes_contains aceita apenas valores escalares")
+    return keys, value
+
+
+def _changes_condition(db: Session, predicate: str):
+    """Condição "changes contém caminho=valor": @> sobre o GIN no Postgres, side table nos demais."""
+    keys, value = parse_changes_predicate(predicate)
+    if _uses_jsonb(db):
+        document: Any = value
+        for key in reversed(keys):
+            document = {key: document}
+        return AuditLog.changes.op("@>")(cast(literal(json.dumps(document)), JSONB))
+    return AuditLog.id.in_(
+        select(AuditChangeValue.audit_log_id).where(
+            AuditChangeValue.path == ".".join(keys),
+            AuditChangeValue.value == _encode_change_value(value),
+        )
+    )
+
+
 def log_event(
     db: Session,
     *,
@@ -41,32 +121,81 @@ def log_event(
     request=None,
     ip_address: Optional[str] = None,
     user_agent: Optional[str] = None,
-) -> AuditLog:
+) -> Optional[AuditLog]:
     """
     Registra um evento de auditoria no banco.
     Pode receber ip/ua diretamente ou extrair do Request.
+
+    Para actions agregadas (AUDIT_AGGREGATE_ACTIONS), uma repetição dentro da janela da
+    primeira ocorrência só é contada em memória e retorna None.
     """
     ip = ip_address or _extract_ip(request)
     ua = user_agent or _extract_ua(request)
+    aggregation_key = (action, detail, ip, user_email)
+    if audit_aggregation_service.absorb(aggregation_key):
+        return None
 
     entry = AuditLog(
         action=action,
+        action_id=audit_actions.id_for(db, action),
         result=result,
+        result_id=audit_results.id_for(db, result),
         user_id=user_id,
         user_email=user_email,
         resource_type=resource_type,
+        resource_type_id=audit_resource_types.id_for(db, resource_type),
         resource_id=str(resource_id) if resource_id is not None else None,
         changes=changes,
         detail=detail,
         ip_address=ip,
         user_agent=ua,
+        user_agent_id=user_agents.id_for(db, ua),
     )
     db.add(entry)
     db.flush()
+    if changes and not _uses_jsonb(db):
+        leaves = [
+            {"audit_log_id": entry.id, "path": path, "value": value}
+            for path, value in islice(_change_leaves(changes), _MAX_CHANGE_LEAVES)
+        ]
+        if leaves:
+            db.execute(insert(AuditChangeValue), leaves)
+    audit_stream_service.queue_event(db, entry)
+    audit_aggregation_service.track(db, aggregation_key, entry.id)
+    outbox_service.record(db, entry)
     return entry
 
 
-def list_audit_logs(
+# Modos dos filtros de texto (user_email, action)
+MATCH_MODES = ("exact", "prefix", "contains")
+
+# Tokenizer trigram: trechos menores que isso não usam o índice FTS5
+_TRIGRAM = 3
+
+_email_fts = table(AUDIT_EMAIL_FTS, column("rowid"), column("user_email"))
+
+
+def _email_condition(db: Session, value: str, mode: str):
+    """
+    Filtro de user_email sem diferenciar caixa, cada modo atendido por um índice:
+    exact pelo índice em lower(user_email); prefix e contains pelo GIN pg_trgm no
+    Postgres e, no SQLite, pelo intervalo em lower(user_email) e pela tabela FTS5.
+    """
+    if mode == "exact":
+        return func.lower(AuditLog.user_email) == value.lower()
+    postgres = db.get_bind().dialect.name == "postgresql"
+    if mode == "prefix":
+        if postgres:
+            return AuditLog.user_email.istartswith(value, autoescape=True)
+        lowered = func.lower(AuditLog.user_email)
+        return and_(lowered >= value.lower(), lowered < value.lower() + "\U0010ffff")
+    if postgres or len(value) < _TRIGRAM:
+        return AuditLog.user_email.icontains(value, autoescape=True)
+    phrase = '"' + value.replace('"', '""') + '"'
+    return AuditLog.id.in_(select(_email_fts.c.rowid).where(_email_fts.c.user_email.match(phrase)))
+
+
+def audit_log_conditions(
     db: Session,
     *,
     user_id: Optional[int] = None,
@@ -76,43 +205,145 @@ def list_audit_logs(
     result: Optional[str] = None,
     date_from: Optional[datetime] = None,
     date_to: Optional[datetime] = None,
-    skip: int = 0,
-    limit: int = 50,
-) -> tuple[list[AuditLog], int]:
-    """Retorna lista paginada e contagem total."""
+    cidr: Optional[str] = None,
+    changes_contains: Optional[str] = None,
+    email_match: str = "contains",
+    action_match: str = "contains",
+) -> Optional[list]:
+    """
+    Condições WHERE dos filtros de auditoria (listagem, export e jobs de export).
+    Retorna None quando o resultado certamente é vazio: action/result/resource_type são
+    resolvidos para códigos antes da consulta e um valor que não existe na dimensão
+    dispensa consultar audit_logs. `cidr` ou `changes_contains` inválidos levantam
+    ValueError.
+    """
     conditions = []
 
     if user_id is not None:
         conditions.append(AuditLog.user_id == user_id)
     if user_email:
-        conditions.append(AuditLog.user_email.ilike(f"%{user_email}%"))
+        conditions.append(_email_condition(db, user_email, email_match))
     if action:
-        conditions.append(AuditLog.action.ilike(f"%{action}%"))
+        action_ids = audit_actions.ids_matching(db, action, action_match)
+        if not action_ids:
+            return None
+        conditions.append(AuditLog.action_id.in_(action_ids))
     if resource_type:
-        conditions.append(AuditLog.resource_type == resource_type)
+        resource_type_id = audit_resource_types.lookup(db, resource_type)
+        if resource_type_id is None:
+            return None
+        conditions.append(AuditLog.resource_type_id == resource_type_id)
     if result:
-        conditions.append(AuditLog.result == result)
+        result_id = audit_results.lookup(db, result)
+        if result_id is None:
+            return None
+        conditions.append(AuditLog.result_id == result_id)
     if date_from:
         conditions.append(AuditLog.created_at >= date_from)
     if date_to:
         conditions.append(AuditLog.created_at <= date_to)
+    if cidr:
+        conditions.append(ip_in_network(db, AuditLog.ip_address, cidr))
+    if changes_contains:
+        conditions.append(_changes_condition(db, changes_contains))
+    return conditions
+
+
+def list_audit_logs(
+    db: Session,
+    *,
+    user_id: Optional[int] = None,
+    user_email: Optional[str] = None,
+    action: Optional[str] = None,
+    resource_type: Optional[str] = None,
+    result: Optional[str] = None,
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    cidr: Optional[str] = None,
+    changes_contains: Optional[str] = None,
+    email_match: str = "contains",
+    action_match: str = "contains",
+    skip: int = 0,
+    limit: int = 50,
+) -> tuple[list[AuditLog], int]:
+    """
+    Retorna lista paginada e contagem total. `cidr` ou `changes_contains` inválidos
+    levantam ValueError.
+
+    user_email e action aceitam os modos de MATCH_MODES (padrão: contains). Filtros em
+    audit_log_conditions; com date_from anterior à janela quente a camada fria
+    (audit_archive_service) também é lida.
+    """
+    conditions = audit_log_conditions(
+        db,
+        user_id=user_id,
+        user_email=user_email,
+        action=action,
+        resource_type=resource_type,
+        result=result,
+        date_from=date_from,
+        date_to=date_to,
+        cidr=cidr,
+        changes_contains=changes_contains,
+        email_match=email_match,
+        action_match=action_match,
+    )
+    if conditions is None:
+        return [], 0
 
     base = select(AuditLog)
     if conditions:
         base = base.where(and_(*conditions))
 
-    total = db.scalar(select(func.count()).select_from(base.subquery()))
-    rows = db.scalars(
+    total = db.scalar(select(func.count()).select_from(base.subquery())) or 0
+    rows = list(db.scalars(
         base.order_by(AuditLog.created_at.desc()).offset(skip).limit(limit)
-    ).all()
+    ).all())
 
-    return list(rows), total or 0
+    if audit_archive_service.reaches_archive(date_from):
+        # Período alcança a camada fria: os arquivados vêm depois dos quentes (mais antigos)
+        archived, archived_total = audit_archive_service.query_archive(
+            date_from=date_from,
+            date_to=date_to,
+            user_id=user_id,
+            user_email=user_email,
+            action=action,
+            resource_type=resource_type,
+            result=result,
+            cidr=cidr,
+            changes_contains=changes_contains,
+            email_match=email_match,
+            action_match=action_match,
+            skip=max(skip - total, 0),
+            limit=limit - len(rows),
+        )
+        rows.extend(archived)
+        total += archived_total
+
+    return rows, total
 
 
 def purge_old_audit_logs(db: Session) -> int:
-    """Remove audit logs mais antigos que AUDIT_LOG_RETENTION_DAYS. Retorna quantidade deletada."""
+    """
+    Remove audit logs mais antigos que AUDIT_LOG_RETENTION_DAYS. Retorna quantidade
+    deletada. Com AUDIT_ARCHIVE_DIR os eventos são antes gravados na camada fria (dias
+    inteiros) e os arquivos vencidos são removidos.
+    """
     retention_days = getattr(settings, "audit_log_retention_days", 90)
     cutoff = datetime.now(timezone.utc) - timedelta(days=retention_days)
+    if audit_archive_service.enabled():
+        cutoff = audit_archive_service.hot_window_start()
+        audit_archive_service.archive_before(db, cutoff)
+        audit_archive_service.prune_archive()
+    if not _uses_jsonb(db):
+        # Sem Postgres o ON DELETE CASCADE pode não estar ativo (SQLite sem foreign_keys)
+        db.execute(
+            delete(AuditChangeValue).where(
+                AuditChangeValue.audit_log_id.in_(
+                    select(AuditLog.id).where(AuditLog.created_at < cutoff)
+                )
+            )
+        )
     result = db.execute(
         delete(AuditLog).where(AuditLog.created_at < cutoff)
     )
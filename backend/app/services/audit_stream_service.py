@@ -0,0 +1,285 @@
+"""
+Tail ao vivo de audit_logs (GET /audit-logs/stream, Server-Sent Events).
+
+log_event enfileira o evento na sessão; só depois do commit ele é publicado num Redis
+Stream (XADD com MAXLEN aproximado), então eventos de transações desfeitas nunca
+aparecem. Em cada worker um único leitor (thread com XREAD bloqueante) distribui os
+eventos para todas as conexões SSE; cada conexão tem um buffer limitado: um cliente
+lento perde os eventos mais antigos (e é avisado) em vez de acumular memória ou atrasar
+os demais.
+"""
+import asyncio
+import ipaddress
+import logging
+import re
+import threading
+import time
+from collections import deque
+from collections.abc import Callable
+from typing import Any, NamedTuple, Optional
+
+import orjson
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.redis import get_redis
+from app.db.types import normalize_ip, parse_network
+from app.schemas.audit import audit_log_payload
+
+logger = logging.getLogger(__name__)
+
+_PENDING_KEY = "audit_stream_pending"
+_STREAM_ID = re.compile(r"^\d{1,20}-\d{1,20}$")
+
+EventFilter = Callable[[dict], bool]
+
+
+# ── Publicação ───────────────────────────────────────────────────────────────
+
+
+def queue_event(db: Session, entry) -> None:
+    """Guarda o evento recém-gravado para publicar no commit da sessão."""
+    payload = audit_log_payload(entry)
+    payload["ip_address"] = normalize_ip(payload["ip_address"])
+    db.info.setdefault(_PENDING_KEY, []).append(payload)
+
+
+@event.listens_for(Session, "after_commit")
+def _publish_pending(session: Session) -> None:
+    pending = session.info.pop(_PENDING_KEY, None)
+    if not pending:
+        return
+    try:
+        pipe = get_redis().pipeline(transaction=False)
+        for payload in pending:
+            pipe.xadd(
+                settings.audit_stream_key,
+                {"data": orjson.dumps(payload).decode()},
+                maxlen=settings.audit_stream_maxlen,
+                approximate=True,
+            )
+        pipe.execute()
+    except Exception:
+        # O evento já está no banco; só o tail ao vivo deixa de vê-lo
+        logger.warning("audit_stream: falha ao publicar %s eventos", len(pending), exc_info=True)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_pending(session: Session) -> None:
+    session.info.pop(_PENDING_KEY, None)
+
+
+# ── Filtros (mesma semântica de list_audit_logs) ─────────────────────────────
+
+
+def _text_matches(value: str | None, expected: str, mode: str) -> bool:
+    if value is None:
+        return False
+    value, expected = value.lower(), expected.lower()
+    if mode == "exact":
+        return value == expected
+    if mode == "prefix":
+        return value.startswith(expected)
+    return expected in value
+
+
+def build_event_filter(
+    *,
+    user_id: int | None = None,
+    user_email: str | None = None,
+    action: str | None = None,
+    resource_type: str | None = None,
+    result: str | None = None,
+    cidr: str | None = None,
+    changes_contains: str | None = None,
+    email_match: str = "contains",
+    action_match: str = "contains",
+) -> EventFilter:
+    """Predicado sobre o payload do evento. Levanta ValueError para cidr/changes_contains inválidos."""
+    # Import tardio: audit_service importa este módulo para publicar os eventos
+    from app.services.audit_service import parse_changes_predicate
+
+    checks: list[EventFilter] = []
+    if user_id is not None:
+        checks.append(lambda e: e["user_id"] == user_id)
+    if user_email:
+        checks.append(lambda e: _text_matches(e["user_email"], user_email, email_match))
+    if action:
+        checks.append(lambda e: _text_matches(e["action"], action, action_match))
+    if resource_type:
+        checks.append(lambda e: e["resource_type"] == resource_type)
+    if result:
+        checks.append(lambda e: e["result"] == result)
+    if cidr:
+        network = parse_network(cidr)
+
+        def in_network(e: dict) -> bool:
+            if e["ip_address"] is None:
+                return False
+            address = ipaddress.ip_address(e["ip_address"])
+            return address.version == network.version and address in network
+
+        checks.append(in_network)
+    if changes_contains:
+        keys, expected = parse_changes_predicate(changes_contains)
+
+        def changes_match(e: dict) -> bool:
+            node: Any = e["changes"]
+            for key in keys:
+                if not isinstance(node, dict) or key not in node:
+                    return False
+                node = node[key]
+            # Como no JSONB: 2 == 2.0, mas true != 1
+            return node == expected and isinstance(node, bool) == isinstance(expected, bool)
+
+        checks.append(changes_match)
+    return lambda e: all(check(e) for check in checks)
+
+
+# ── Fan-out ──────────────────────────────────────────────────────────────────
+
+
+class Subscription:
+    """Conexão SSE: buffer limitado (descarta os mais antigos) e sinal para o loop asyncio."""
+
+    def __init__(self, event_filter: EventFilter, loop: asyncio.AbstractEventLoop, maxlen: int) -> None:
+        self.event_filter = event_filter
+        self.loop = loop
+        self.buffer: deque[tuple[str, dict]] = deque(maxlen=maxlen)
+        self.dropped = 0
+        self.ready = asyncio.Event()
+        self._lock = threading.Lock()
+
+    def offer(self, stream_id: str, payload: dict) -> None:
+        if not self.event_filter(payload):
+            return
+        with self._lock:
+            if len(self.buffer) == self.buffer.maxlen:
+                self.dropped += 1
+            self.buffer.append((stream_id, payload))
+        self.loop.call_soon_threadsafe(self.ready.set)
+
+    def drain(self) -> tuple[list[tuple[str, dict]], int]:
+        """Eventos pendentes e quantos foram descartados desde a última chamada."""
+        with self._lock:
+            items = list(self.buffer)
+            self.buffer.clear()
+            dropped, self.dropped = self.dropped, 0
+        self.ready.clear()
+        return items, dropped
+
+
+class AuditStreamHub:
+    """Uma leitura do Redis Stream por worker, distribuída para todas as inscrições."""
+
+    def __init__(self) -> None:
+        self._subscriptions: set[Subscription] = set()
+        self._lock = threading.Lock()
+        self._thread: threading.Thread | None = None
+
+    def subscribe(self, event_filter: EventFilter, loop: asyncio.AbstractEventLoop) -> Subscription:
+        subscription = Subscription(event_filter, loop, settings.audit_stream_client_buffer)
+        with self._lock:
+            self._subscriptions.add(subscription)
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="audit-stream", daemon=True)
+                self._thread.start()
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        with self._lock:
+            self._subscriptions.discard(subscription)
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscriptions)
+
+    def dispatch(self, entries: list[tuple[str, dict]]) -> None:
+        """Entrega entradas (id, campos) do stream a todas as inscrições."""
+        with self._lock:
+            subscriptions = list(self._subscriptions)
+        for stream_id, fields in entries:
+            try:
+                payload = orjson.loads(fields["data"])
+            except (KeyError, orjson.JSONDecodeError):
+                continue
+            for subscription in subscriptions:
+                subscription.offer(stream_id, payload)
+
+    def _run(self) -> None:
+        last_id = "$"
+        while True:
+            with self._lock:
+                if not self._subscriptions:
+                    # Sem ouvintes a thread termina; a próxima inscrição inicia outra
+                    self._thread = None
+                    return
+            try:
+                response = get_redis().xread(
+                    {settings.audit_stream_key: last_id}, block=1000, count=500
+                )
+            except Exception:
+                logger.warning("audit_stream: falha ao ler o stream; nova tentativa em 1s", exc_info=True)
+                time.sleep(1)
+                continue
+            for _, entries in response or []:
+                if entries:
+                    last_id = entries[-1][0]
+                    self.dispatch(entries)
+
+
+hub = AuditStreamHub()
+
+
+def _id_key(stream_id: str) -> tuple[int, int]:
+    ms, _, seq = stream_id.partition("-")
+    return int(ms), int(seq)
+
+
+class Replay(NamedTuple):
+    """Resultado de replay_since: eventos (os mais novos, até o buffer), descartados e último id lido."""
+
+    events: list[tuple[str, dict]]
+    dropped: int
+    last_id: Optional[str]
+
+    def covers(self, stream_id: str) -> bool:
+        """O evento ao vivo já foi lido no replay (a assinatura começou antes do XRANGE)."""
+        return self.last_id is not None and _id_key(stream_id) <= _id_key(self.last_id)
+
+
+def replay_since(last_event_id: str, event_filter: EventFilter) -> Replay:
+    """
+    Eventos do filtro ainda no stream depois de Last-Event-ID (reconexão), até o último
+    evento no momento da chamada. Lê o stream em páginas; como no buffer da conexão,
+    ficam os AUDIT_STREAM_CLIENT_BUFFER mais novos e os anteriores contam em dropped.
+    """
+    if not _STREAM_ID.match(last_event_id):
+        return Replay([], 0, None)
+    redis = get_redis()
+    newest = redis.xrevrange(settings.audit_stream_key, count=1)
+    if not newest or _id_key(newest[0][0]) <= _id_key(last_event_id):
+        return Replay([], 0, None)
+    page_size = settings.audit_stream_client_buffer
+    events: deque[tuple[str, dict]] = deque(maxlen=page_size)
+    matched = 0
+    last_id = last_event_id
+    while True:
+        entries = redis.xrange(
+            settings.audit_stream_key, min=f"({last_id}", max=newest[0][0], count=page_size
+        )
+        for stream_id, fields in entries:
+            payload = orjson.loads(fields["data"])
+            if event_filter(payload):
+                events.append((stream_id, payload))
+                matched += 1
+        if entries:
+            last_id = entries[-1][0]
+        if len(entries) < page_size:
+            break
+    return Replay(list(events), matched - len(events), last_id)
+
+
+def format_sse(stream_id: str, payload: dict) -> bytes:
+    return b"id: " + stream_id.encode() + b"\nevent: audit\ndata: " + orjson.dumps(payload) + b"\n\n"
@@ -1,6 +1,6 @@
 from datetime import datetime, timezone
 
-from sqlalchemy import select
+from sqlalchemy import false, select, update
 from sqlalchemy.orm import Session, selectinload
 
 from app.core.security import (
@@ -10,6 +10,9 @@ from app.core.security import (
     verify_password,
 )
 from app.models import RefreshToken, Role, User
+from app.services import session_store
+from app.services.dimension_service import user_agents
+from app.services.user_agent_service import device_fields
 
 
 def authenticate_user(db: Session, email: str, password: str) -> User | None:
@@ -39,30 +42,139 @@ def issue_tokens(db: Session, user: User) -> tuple[str, str]:
     return access_token, raw_refresh
 
 
-def rotate_refresh_token(db: Session, token_id: str) -> tuple[str, str]:
-    rt = db.execute(
-        select(RefreshToken).where(RefreshToken.token_id == token_id)
-    ).scalar_one_or_none()
+INVALID_REFRESH_TOKEN = "Invalid refresh token"
+EXPIRED_REFRESH_TOKEN = "Expired refresh token"
+REUSED_REFRESH_TOKEN = "Refresh token already used"
+INVALID_USER = "Invalid user"
 
-    if not rt or rt.revoked:
-        raise ValueError("Refresh token inválido ou revogado")
-    if rt.expires_at < datetime.now(timezone.utc):
-        rt.revoked = True
-        db.commit()
-        raise ValueError("Refresh token expirado")
 
-    rt.revoked = True
+def rotate_refresh_token(
+    db: Session,
+    token_id: str,
+    *,
+    ip_address: str | None = None,
+    user_agent: str | None = None,
+) -> tuple[str, str]:
+    """
+    Rotaciona o refresh token de forma atômica e devolve (access_token, novo refresh_token).
 
-    user = db.execute(
-        select(User)
-        .where(User.id == rt.user_id)
-        .options(selectinload(User.roles).selectinload(Role.permissions))
+    Um único UPDATE condicional (não revogado e não expirado) consome o token e devolve o
+    user_id; o novo token é inserido na mesma transação. Em refreshes concorrentes do mesmo
+    token (várias abas) só um UPDATE encontra a linha: os demais recebem ValueError com
+    REUSED_REFRESH_TOKEN e nada é gravado para eles.
+    """
+    if session_store.is_enabled():
+        return _rotate_in_store(db, token_id, ip_address=ip_address, user_agent=user_agent)
+
+    now = datetime.now(timezone.utc)
+    user_id = db.execute(
+        update(RefreshToken)
+        .where(
+            RefreshToken.token_id == token_id,
+            RefreshToken.revoked == false(),
+            RefreshToken.expires_at > now,
+        )
+        .values(revoked=True)
+        .returning(RefreshToken.user_id)
+        .execution_options(synchronize_session=False)
     ).scalar_one_or_none()
 
+    if user_id is None:
+        db.rollback()
+        raise ValueError(_rotation_failure_reason(db, token_id, now))
+
+    user = db.execute(
+        select(User.email, User.is_active).where(User.id == user_id, User.deleted_at.is_(None))
+    ).one_or_none()
+    if not user or not user.is_active:
+        # Desfaz o consumo: o token continua como estava
+        db.rollback()
+        raise ValueError(INVALID_USER)
+
+    new_refresh = generate_refresh_token()
+    db.add(
+        RefreshToken(
+            token_id=new_refresh,
+            user_id=user_id,
+            expires_at=refresh_token_expires_at(),
+            revoked=False,
+            ip_address=ip_address,
+            user_agent_id=user_agents.id_for(db, user_agent),
+            **device_fields(user_agent),
+        )
+    )
+    db.commit()
+    return create_access_token(user.email, new_refresh), new_refresh
+
+
+def _rotate_in_store(
+    db: Session,
+    token_id: str,
+    *,
+    ip_address: str | None,
+    user_agent: str | None,
+) -> tuple[str, str]:
+    """Rotação com SESSION_STORE=redis: o consumo atômico do hash decide o vencedor."""
+    session = session_store.consume_session(db, token_id)
+    if session is None:
+        if session_store.was_consumed(token_id):
+            raise ValueError(REUSED_REFRESH_TOKEN)
+        raise ValueError(_store_failure_reason(db, token_id))
+
+    user = db.execute(
+        select(User.email, User.is_active)
+        .where(User.id == session["user_id"], User.deleted_at.is_(None))
+    ).one_or_none()
     if not user or not user.is_active:
-        raise ValueError("Usuário inativo ou não encontrado")
+        session_store.restore_session(session)
+        raise ValueError(INVALID_USER)
 
-    return issue_tokens(db, user)
+    new_refresh = generate_refresh_token()
+    session_store.add_session(
+        db,
+        {
+            "token_id": new_refresh,
+            "user_id": session["user_id"],
+            "created_at": datetime.now(timezone.utc),
+            "expires_at": refresh_token_expires_at(),
+            "ip_address": ip_address,
+            "user_agent": user_agent,
+            **device_fields(user_agent),
+        },
+    )
+    # Revogação do token antigo no banco, na mesma fila do insert do novo
+    session_store.enqueue_revoke(token_id)
+    return create_access_token(user.email, new_refresh), new_refresh
+
+
+def _store_failure_reason(db: Session, token_id: str) -> str:
+    """
+    Classifica a falha no modo Redis. O banco pode estar atrasado em relação ao store
+    (write-behind): um token ainda ativo no banco mas ausente do Redis já foi revogado.
+    """
+    rt = db.execute(
+        select(RefreshToken.revoked, RefreshToken.expires_at).where(RefreshToken.token_id == token_id)
+    ).one_or_none()
+    if rt is None:
+        return INVALID_REFRESH_TOKEN
+    expires_at = rt.expires_at
+    if expires_at.tzinfo is None:
+        expires_at = expires_at.replace(tzinfo=timezone.utc)
+    if not rt.revoked and expires_at <= datetime.now(timezone.utc):
+        return EXPIRED_REFRESH_TOKEN
+    return REUSED_REFRESH_TOKEN
+
+
+def _rotation_failure_reason(db: Session, token_id: str, now: datetime) -> str:
+    """Classifica a falha (só executado no caminho de erro)."""
+    rt = db.execute(
+        select(RefreshToken.revoked, RefreshToken.expires_at).where(RefreshToken.token_id == token_id)
+    ).one_or_none()
+    if rt is None:
+        return INVALID_REFRESH_TOKEN
+    if rt.revoked:
+        return REUSED_REFRESH_TOKEN
+    return EXPIRED_REFRESH_TOKEN
 
 
 def revoke_refresh_token(db: Session, token_id: str) -> None:
@@ -0,0 +1,200 @@
+"""
+Feed incremental de usuários e RBAC (GET /sync/changes) para serviços que espelham
+usuários e papéis, no lugar de reler GET /users/ e GET /roles/ inteiros.
+
+Cada usuário, papel, permissão e associação (user_roles, role_permissions) tem uma linha
+em rbac_changes com a versão da sua última mudança. O listener after_flush detecta as
+mudanças feitas pelo ORM (só colunas que os consumidores veem: login e lockout não
+contam) e grava as versões na mesma transação; escritas em Core (importação em massa)
+chamam record(). O contador de versões é uma linha única atualizada na transação: o
+lock serializa as escritas de RBAC (pouco frequentes), então uma versão só fica visível
+depois de todas as menores e um cursor nunca pula mudanças.
+
+Tombstones (deleted=True) ficam SYNC_TOMBSTONE_RETENTION_DAYS; um cursor anterior ao
+último tombstone removido recebe CursorExpired e o consumidor refaz a carga (since=0).
+Tombstone de papel ou permissão implica a remoção das suas associações.
+"""
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from sqlalchemy import and_, delete, event, func, inspect, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models import Permission, RbacChange, RbacChangeState, Role, User
+
+logger = logging.getLogger(__name__)
+
+# Atributos que geram mudança no feed, por modelo: (entidade, colunas, relacionamentos)
+_TRACKED = {
+    User: ("user", ("email", "full_name", "is_active", "deleted_at"), ("roles",)),
+    Role: ("role", ("name", "description"), ("users", "permissions")),
+    Permission: ("permission", ("name", "description"), ("roles",)),
+}
+
+Change = tuple[str, str]  # (entidade, entity_id)
+
+
+class CursorExpired(ValueError):
+    """O cursor é anterior a tombstones já removidos: refazer a carga com since=0."""
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def _link(owner, rel: str, other) -> Change:
+    """Chave da associação, sempre na ordem user:role e role:permission."""
+    if rel == "roles" and isinstance(owner, User):
+        return "user_role", f"{owner.id}:{other.id}"
+    if rel == "users":
+        return "user_role", f"{other.id}:{owner.id}"
+    if rel == "permissions":
+        return "role_permission", f"{owner.id}:{other.id}"
+    return "role_permission", f"{other.id}:{owner.id}"
+
+
+@event.listens_for(Session, "after_flush")
+def _record_flush(session: Session, flush_context) -> None:
+    changes: dict[Change, bool] = {}
+    for obj in session.deleted:
+        tracked = _TRACKED.get(type(obj))
+        if tracked is not None:
+            changes[(tracked[0], str(obj.id))] = True
+
+    for obj in (*session.new, *session.dirty):
+        tracked = _TRACKED.get(type(obj))
+        if tracked is None or obj in session.deleted:
+            continue
+        entity, columns, relationships = tracked
+        state = inspect(obj)
+        if obj in session.new or any(state.attrs[c].history.has_changes() for c in columns):
+            changes[(entity, str(obj.id))] = entity == "user" and obj.deleted_at is not None
+        for rel in relationships:
+            history = state.attrs[rel].history
+            for other in history.added:
+                changes[_link(obj, rel, other)] = False
+            for other in history.deleted:
+                changes.setdefault(_link(obj, rel, other), True)
+
+    if changes:
+        record(session, changes)
+
+
+def record(db: Session, changes: dict[Change, bool]) -> None:
+    """Atribui versões às mudanças ({(entidade, id): deleted}) na transação corrente."""
+    conn = db.connection()
+    last = conn.execute(
+        update(RbacChangeState)
+        .where(RbacChangeState.id == 1)
+        .values(version=RbacChangeState.version + len(changes))
+        .returning(RbacChangeState.version)
+    ).scalar_one()
+    now = _now()
+    rows = [
+        {"entity": entity, "entity_id": entity_id, "version": version, "deleted": deleted, "changed_at": now}
+        for version, ((entity, entity_id), deleted) in enumerate(
+            sorted(changes.items()), start=last - len(changes) + 1
+        )
+    ]
+    dialect_insert = pg_insert if conn.dialect.name == "postgresql" else sqlite_insert
+    stmt = dialect_insert(RbacChange.__table__)
+    conn.execute(
+        stmt.on_conflict_do_update(
+            index_elements=["entity", "entity_id"],
+            set_={
+                "version": stmt.excluded.version,
+                "deleted": stmt.excluded.deleted,
+                "changed_at": stmt.excluded.changed_at,
+            },
+        ),
+        rows,
+    )
+
+
+# ── Leitura ──────────────────────────────────────────────────────────────────
+
+
+def _user_data(user: User) -> dict:
+    return {"id": user.id, "email": user.email, "full_name": user.full_name, "is_active": user.is_active}
+
+
+def _named_data(obj) -> dict:
+    return {"id": obj.id, "name": obj.name, "description": obj.description}
+
+
+def _link_data(entity: str, entity_id: str) -> dict:
+    left, right = (int(part) for part in entity_id.split(":"))
+    if entity == "user_role":
+        return {"user_id": left, "role_id": right}
+    return {"role_id": left, "permission_id": right}
+
+
+_LOADERS = {"user": (User, _user_data), "role": (Role, _named_data), "permission": (Permission, _named_data)}
+
+
+def list_changes(db: Session, *, since: int, limit: int) -> tuple[list[dict], int, bool]:
+    """
+    Mudanças com versão > since, em ordem de versão, com o estado atual de cada linha
+    (ou deleted=True sem dados). Retorna (itens, cursor para a próxima chamada, has_more).
+    Levanta CursorExpired se tombstones posteriores a since já foram removidos.
+    """
+    if since > 0:
+        purged_through = db.scalar(select(RbacChangeState.purged_through).where(RbacChangeState.id == 1))
+        if purged_through and since < purged_through:
+            raise CursorExpired("Cursor expirado: refaça a carga completa com since=0")
+
+    rows = db.execute(
+        select(RbacChange.entity, RbacChange.entity_id, RbacChange.version, RbacChange.deleted)
+        .where(RbacChange.version > since)
+        .order_by(RbacChange.version)
+        .limit(limit + 1)
+    ).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    current: dict[Change, dict] = {}
+    for entity, (model, to_data) in _LOADERS.items():
+        ids = [int(r.entity_id) for r in rows if r.entity == entity and not r.deleted]
+        if ids:
+            for obj in db.scalars(select(model).where(model.id.in_(ids))):
+                current[(entity, str(obj.id))] = to_data(obj)
+
+    items = []
+    for row in rows:
+        if row.entity in _LOADERS:
+            data = current.get((row.entity, row.entity_id))
+        else:
+            data = None if row.deleted else _link_data(row.entity, row.entity_id)
+        items.append(
+            {
+                "version": row.version,
+                "entity": row.entity,
+                "id": row.entity_id,
+                # Linha removida depois da versão lida: o tombstone vem numa versão maior
+                "deleted": row.deleted or data is None,
+                "data": None if row.deleted else data,
+            }
+        )
+    cursor = rows[-1].version if rows else since
+    return items, cursor, has_more
+
+
+def purge_tombstones(db: Session) -> int:
+    """Remove tombstones mais antigos que SYNC_TOMBSTONE_RETENTION_DAYS."""
+    cutoff = _now() - timedelta(days=settings.sync_tombstone_retention_days)
+    expired = and_(RbacChange.deleted.is_(True), RbacChange.changed_at < cutoff)
+    newest: Optional[int] = db.scalar(select(func.max(RbacChange.version)).where(expired))
+    if newest is None:
+        return 0
+    result = db.execute(delete(RbacChange).where(expired, RbacChange.version <= newest))
+    db.execute(
+        update(RbacChangeState)
+        .where(RbacChangeState.id == 1, RbacChangeState.purged_through < newest)
+        .values(purged_through=newest)
+    )
+    db.commit()
+    return result.rowcount or 0
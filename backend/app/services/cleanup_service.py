@@ -1,6 +1,7 @@
 """
 Job periódico para remover refresh tokens expirados e revogados,
-e purgar audit logs antigos.
+e purgar audit logs antigos, eventos entregues/dead/expirados da outbox e tombstones
+antigos do feed de mudanças.
 Evita crescimento indefinido das tabelas refresh_tokens e audit_logs.
 """
 import logging
@@ -11,6 +12,8 @@ from sqlalchemy.orm import Session
 
 from app.models import RefreshToken
 from app.services.audit_service import purge_old_audit_logs
+from app.services.change_feed_service import purge_tombstones
+from app.services.outbox_service import purge_outbox
 
 logger = logging.getLogger(__name__)
 
@@ -38,4 +41,10 @@ def cleanup_expired_tokens(db: Session, older_than_days: int = 30) -> int:
     purge_count = purge_old_audit_logs(db)
     logger.info("Audit log purge concluído: %s registros removidos", purge_count)
 
+    outbox_count = purge_outbox(db)
+    logger.info("Outbox purge concluído: %s eventos removidos", outbox_count)
+
+    tombstone_count = purge_tombstones(db)
+    logger.info("Feed de mudanças: %s tombstones removidos", tombstone_count)
+
     return count
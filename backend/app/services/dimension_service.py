@@ -0,0 +1,25 @@
+"""
+Dimensões usadas pelas tabelas quentes (audit_logs, refresh_tokens).
+
+audit_actions, audit_results e audit_resource_types têm poucas dezenas de valores: depois
+do aquecimento o mapa valor -> código inteiro fica todo no cache do worker.
+"""
+from sqlalchemy import Select, select
+
+from app.db.dimensions import Dimension
+from app.models import AuditAction, AuditResourceType, AuditResult, UserAgent
+
+user_agents = Dimension(UserAgent.__table__, "user_agent", hash_column="ua_hash")
+audit_actions = Dimension(AuditAction.__table__, "name")
+audit_results = Dimension(AuditResult.__table__, "name")
+audit_resource_types = Dimension(AuditResourceType.__table__, "name")
+
+
+def user_agent_ids_containing(fragment: str) -> Select:
+    """Subconsulta com os ids de User-Agents que contêm o trecho (sem diferenciar caixa)."""
+    return select(UserAgent.id).where(UserAgent.user_agent.icontains(fragment, autoescape=True))
+
+
+def clear_caches() -> None:
+    for dimension in (user_agents, audit_actions, audit_results, audit_resource_types):
+        dimension.clear()
@@ -0,0 +1,184 @@
+"""
+Permissões efetivas materializadas em user_effective_permissions.
+
+Antes cada checagem de permissão e cada UserOut percorria user.roles × role.permissions
+carregados pelo ORM. A tabela guarda o resultado (um par usuário/permissão por linha) e
+é mantida no after_flush, na mesma transação da mudança: só os usuários afetados são
+recalculados (vínculos de user.roles alterados, usuários de um papel cujas permissões
+mudaram, usuários de um papel removido). Escritas em Core (importação em massa) chamam
+refresh_users().
+
+Concorrência: o recálculo lê as associações confirmadas por outras transações, então
+duas transações simultâneas (T1 põe a permissão P no papel R, T2 põe o usuário U em R)
+poderiam cada uma recalcular sem ver a mudança da outra, e U ficaria sem P. Por isso,
+no Postgres, _refresh pega um pg_advisory_xact_lock antes do DELETE/INSERT, depois de as
+associações da própria transação já estarem gravadas no flush, e o segura até o commit.
+Em READ COMMITTED cada statement tem snapshot novo: quem pega o lock depois enxerga o
+que a anterior confirmou (a ordem é: gravar associações → lock → recalcular → commit).
+Isso pressupõe READ COMMITTED (o padrão); em REPEATABLE READ o snapshot seria antigo.
+
+check_consistency() compara a tabela com user_roles × role_permissions e, com
+repair=True, reconstrói tudo (scripts/check_effective_permissions.py).
+"""
+import logging
+from collections.abc import Iterable
+
+from sqlalchemy import Connection, delete, event, except_, func, insert, inspect, or_, select
+from sqlalchemy.orm import Session
+
+from app.models import Permission, Role, User, UserEffectivePermission, role_permissions, user_roles
+
+logger = logging.getLogger(__name__)
+
+_ROLE_USERS_KEY = "effective_permissions_deleted_role_users"
+
+_UEP = UserEffectivePermission.__table__
+
+# Chave do pg_advisory_xact_lock que serializa os recálculos entre transações
+_REFRESH_LOCK_KEY = 0x75657070  # "uepp"
+
+
+def _lock(conn: Connection) -> None:
+    if conn.dialect.name == "postgresql":
+        conn.execute(select(func.pg_advisory_xact_lock(_REFRESH_LOCK_KEY)))
+
+
+def _computed():
+    """Permissões efetivas calculadas a partir das associações."""
+    return (
+        select(user_roles.c.user_id, role_permissions.c.permission_id)
+        .join(role_permissions, role_permissions.c.role_id == user_roles.c.role_id)
+        .distinct()
+    )
+
+
+def _refresh(conn: Connection, *, user_ids: set[int], role_ids: set[int], new_user_ids: set[int]) -> None:
+    scope = []
+    if user_ids:
+        scope.append(user_roles.c.user_id.in_(user_ids))
+    if role_ids:
+        role_users = select(user_roles.c.user_id).where(user_roles.c.role_id.in_(role_ids))
+        scope.append(user_roles.c.user_id.in_(role_users))
+    if not scope:
+        return
+    _lock(conn)
+
+    # Usuários criados neste flush ainda não têm linhas: só INSERT
+    existing = user_ids - new_user_ids
+    stale = []
+    if existing:
+        stale.append(_UEP.c.user_id.in_(existing))
+    if role_ids:
+        stale.append(_UEP.c.user_id.in_(role_users))
+    if stale:
+        conn.execute(delete(_UEP).where(or_(*stale)))
+    conn.execute(
+        insert(_UEP).from_select(["user_id", "permission_id"], _computed().where(or_(*scope)))
+    )
+
+
+def refresh_users(db: Session, user_ids: Iterable[int]) -> None:
+    """Recalcula as permissões efetivas dos usuários (escritas em Core, fora do flush do ORM)."""
+    user_ids = set(user_ids)
+    if user_ids:
+        _refresh(db.connection(), user_ids=user_ids, role_ids=set(), new_user_ids=set())
+
+
+@event.listens_for(Session, "before_flush")
+def _collect_deleted_roles(session: Session, flush_context, instances) -> None:
+    # Os vínculos do papel somem no flush: guarda antes quem perde as permissões
+    role_ids = [obj.id for obj in session.deleted if isinstance(obj, Role)]
+    if role_ids:
+        users = session.connection().execute(
+            select(user_roles.c.user_id).where(user_roles.c.role_id.in_(role_ids))
+        ).scalars()
+        session.info.setdefault(_ROLE_USERS_KEY, set()).update(users)
+
+
+@event.listens_for(Session, "after_flush")
+def _refresh_flushed(session: Session, flush_context) -> None:
+    user_ids: set[int] = session.info.pop(_ROLE_USERS_KEY, set())
+    role_ids: set[int] = set()
+    permission_ids = [obj.id for obj in session.deleted if isinstance(obj, Permission)]
+
+    for obj in (*session.new, *session.dirty):
+        if obj in session.deleted:
+            continue
+        if isinstance(obj, User):
+            if inspect(obj).attrs.roles.history.has_changes():
+                user_ids.add(obj.id)
+        elif isinstance(obj, Role):
+            users = inspect(obj).attrs.users.history
+            user_ids.update(u.id for u in (*users.added, *users.deleted))
+            if inspect(obj).attrs.permissions.history.has_changes():
+                role_ids.add(obj.id)
+        elif isinstance(obj, Permission):
+            roles = inspect(obj).attrs.roles.history
+            role_ids.update(r.id for r in (*roles.added, *roles.deleted))
+
+    conn = session.connection()
+    if permission_ids:
+        _lock(conn)
+        conn.execute(delete(_UEP).where(_UEP.c.permission_id.in_(permission_ids)))
+    new_user_ids = {obj.id for obj in session.new if isinstance(obj, User)} & user_ids
+    _refresh(conn, user_ids=user_ids, role_ids=role_ids, new_user_ids=new_user_ids)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_collected(session: Session) -> None:
+    session.info.pop(_ROLE_USERS_KEY, None)
+
+
+# ── Leitura ──────────────────────────────────────────────────────────────────
+
+
+def has_permission(db: Session, user_id: int, name: str) -> bool:
+    """Numa consulta: a permissão pelo nome (índice único) e o par pela chave primária."""
+    return db.scalar(
+        select(_UEP.c.user_id)
+        .join(Permission, Permission.id == _UEP.c.permission_id)
+        .where(_UEP.c.user_id == user_id, Permission.name == name)
+        .limit(1)
+    ) is not None
+
+
+def permissions_by_user(db: Session, user_ids: Iterable[int]) -> dict[int, list[str]]:
+    """Nomes das permissões efetivas (ordenados) por usuário, numa consulta."""
+    result: dict[int, list[str]] = {user_id: [] for user_id in user_ids}
+    if not result:
+        return result
+    rows = db.execute(
+        select(_UEP.c.user_id, Permission.name)
+        .join(Permission, Permission.id == _UEP.c.permission_id)
+        .where(_UEP.c.user_id.in_(result))
+        .order_by(_UEP.c.user_id, Permission.name)
+    )
+    for user_id, name in rows:
+        result[user_id].append(name)
+    return result
+
+
+def permission_names(db: Session, user_id: int) -> list[str]:
+    return permissions_by_user(db, [user_id])[user_id]
+
+
+# ── Consistência ─────────────────────────────────────────────────────────────
+
+
+def check_consistency(db: Session, *, repair: bool = False) -> tuple[int, int]:
+    """
+    Conta (faltando, sobrando) na tabela em relação a user_roles × role_permissions.
+    Com repair=True e alguma divergência, reconstrói a tabela inteira numa transação.
+    """
+    actual = select(_UEP.c.user_id, _UEP.c.permission_id)
+    missing = db.scalar(select(func.count()).select_from(except_(_computed(), actual).subquery()))
+    extra = db.scalar(select(func.count()).select_from(except_(actual, _computed()).subquery()))
+    if (missing or extra) and repair:
+        _lock(db.connection())
+        db.execute(delete(_UEP))
+        db.execute(insert(_UEP).from_select(["user_id", "permission_id"], _computed()))
+        logger.warning(
+            "effective_permissions: tabela reconstruída (%s faltando, %s sobrando)", missing, extra
+        )
+    db.commit()
+    return missing, extra
@@ -1,9 +1,13 @@
 """Serviço de blacklist de tokens JWT via Redis."""
 import time
+from collections.abc import Iterable
 
+from app.core.config import settings
 from app.core.redis import get_redis
 
 PREFIX = "jwt:blacklist:"
+SESSION_PREFIX = "jwt:session:"
+_PIPELINE_BATCH = 1000
 
 
 def blacklist_token(jti: str, exp: int) -> None:
@@ -18,14 +22,35 @@ def blacklist_token(jti: str, exp: int) -> None:
     r.setex(key, ttl, "1")
 
 
-def is_token_blacklisted(jti: str) -> bool:
+def blacklist_sessions(session_ids: Iterable[str]) -> int:
     """
-    Verifica se o JTI está na blacklist.
+    Invalida os access tokens emitidos pelas sessões informadas (claim `sid`).
+    Cada marca dura o tempo de vida de um access token; as escritas vão em pipelines
+    de até _PIPELINE_BATCH comandos. Retorna quantas sessões foram marcadas.
+    """
+    r = get_redis()
+    ttl = settings.access_token_expire_minutes * 60
+    count = 0
+    pipe = r.pipeline(transaction=False)
+    for sid in session_ids:
+        pipe.setex(f"{SESSION_PREFIX}{sid}", ttl, "1")
+        count += 1
+        if count % _PIPELINE_BATCH == 0:
+            pipe.execute()
+    pipe.execute()
+    return count
+
+
+def is_token_blacklisted(jti: str, sid: str | None = None) -> bool:
+    """
+    Verifica se o JTI (ou a sessão que emitiu o token) está na blacklist.
     Retorna False em caso de falha no Redis (fail-open — token expira naturalmente).
     """
     try:
         r = get_redis()
-        key = f"{PREFIX}{jti}"
-        return bool(r.exists(key))
+        keys = [f"{PREFIX}{jti}"]
+        if sid:
+            keys.append(f"{SESSION_PREFIX}{sid}")
+        return bool(r.exists(*keys))
     except Exception:
         return False
@@ -0,0 +1,94 @@
+"""
+Registro coalescido de atividade (last_seen_at) das sessões.
+
+Cada request autenticado chama touch(sid) com o claim `sid` do access token. O registro
+fica num buffer em memória do worker e só entra no buffer se a sessão não foi marcada
+nos últimos SESSION_LAST_SEEN_GRANULARITY_SECONDS; um job periódico grava o buffer no
+banco com um único UPDATE ... FROM (VALUES ...) no Postgres (executemany nos demais).
+"""
+import logging
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+
+from sqlalchemy import DateTime, String, bindparam, column, or_, update, values
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models import RefreshToken
+
+logger = logging.getLogger(__name__)
+
+# Limites de memória por worker: sessões no buffer e marcações recentes lembradas
+_MAX_PENDING = 50_000
+_MAX_RECENT = 200_000
+
+_pending: dict[str, datetime] = {}
+_recent: OrderedDict[str, float] = OrderedDict()
+_lock = threading.Lock()
+
+
+def touch(sid: str | None) -> None:
+    """Marca atividade da sessão. Custo O(1) e sem I/O."""
+    if not sid:
+        return
+    now = time.monotonic()
+    with _lock:
+        last = _recent.get(sid)
+        if last is not None and now - last < settings.session_last_seen_granularity_seconds:
+            return
+        if len(_pending) >= _MAX_PENDING:
+            return
+        _recent[sid] = now
+        _recent.move_to_end(sid)
+        while len(_recent) > _MAX_RECENT:
+            _recent.popitem(last=False)
+        _pending[sid] = datetime.now(timezone.utc)
+
+
+def flush(db: Session) -> int:
+    """Grava o buffer no banco. Retorna o número de sessões enviadas no UPDATE."""
+    global _pending
+    with _lock:
+        batch, _pending = _pending, {}
+    if not batch:
+        return 0
+    try:
+        _write(db, batch)
+        db.commit()
+    except Exception:
+        db.rollback()
+        with _lock:
+            for sid, seen in batch.items():
+                _pending.setdefault(sid, seen)
+        raise
+    return len(batch)
+
+
+def _write(db: Session, batch: dict[str, datetime]) -> None:
+    if db.get_bind().dialect.name == "postgresql":
+        rows = values(
+            column("sid", String(32)), column("seen", DateTime(timezone=True)), name="v"
+        ).data(list(batch.items()))
+        sid, seen = rows.c.sid, rows.c.seen
+        params = None
+    else:
+        sid = bindparam("b_sid", type_=String(32))
+        seen = bindparam("b_seen", type_=DateTime(timezone=True))
+        params = [{"b_sid": k, "b_seen": v} for k, v in batch.items()]
+
+    stmt = (
+        update(RefreshToken.__table__)
+        .where(RefreshToken.session_id == sid)
+        # Nunca retrocede: outro worker pode ter gravado um horário mais recente
+        .where(or_(RefreshToken.last_seen_at.is_(None), RefreshToken.last_seen_at < seen))
+        .values(last_seen_at=seen)
+    )
+    db.connection().execute(stmt, params)
+
+
+def clear() -> None:
+    with _lock:
+        _pending.clear()
+        _recent.clear()
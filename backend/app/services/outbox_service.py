@@ -0,0 +1,197 @@
+"""
+Outbox transacional para consumidores externos (SIEM, sincronização de RH, outros
+serviços), no lugar de consultar /audit-logs/.
+
+log_event chama record() para as actions de OUTBOX_ACTIONS: o evento entra em
+outbox_events na mesma transação da mutação (usuários, papéis, permissões, sessões,
+login), então só eventos confirmados são publicados. Sem OUTBOX_SINK não há relay e
+nada é gravado. Repetições absorvidas pela agregação (audit_aggregation_service) saem
+no flush da janela, como um evento com "repeats". O relay (job periódico ou
+scripts/outbox_relay.py) entrega lotes ao sink configurado (outbox_sinks) em ordem de
+id; quando um evento está aguardando nova tentativa, os seguintes do mesmo agregado
+(ex.: user 42) esperam, preservando a ordem por agregado. Após OUTBOX_MAX_ATTEMPTS o
+evento é marcado como dead e deixa de bloquear o agregado.
+
+purge_outbox (limpeza diária) remove entregues e dead depois de OUTBOX_RETENTION_HOURS
+e pendentes depois de OUTBOX_PENDING_RETENTION_HOURS (sink fora do ar por dias).
+"""
+import logging
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import and_, delete, exists, func, or_, select
+from sqlalchemy.orm import Session, aliased
+
+from app.core.config import settings
+from app.db.types import normalize_ip
+from app.models import AuditLog, OutboxEvent
+from app.schemas.audit import audit_log_payload
+from app.services.outbox_sinks import OutboxSink
+
+logger = logging.getLogger(__name__)
+
+# Agregados com id próprio; os demais eventos (login, sessões, bulk) ordenam pelo usuário
+_AGGREGATE_TYPES = ("user", "role", "permission")
+
+# Chave do pg_try_advisory_xact_lock: um relay por vez entre processos (ordem global)
+_RELAY_LOCK_KEY = 0x6F626F78  # "obox"
+
+_MAX_BACKOFF_SECONDS = 300
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def _as_utc(value: datetime) -> datetime:
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value
+
+
+def _publishes(action: str) -> bool:
+    # Sem sink não há relay: gravar só faria a tabela crescer
+    if not settings.outbox_sink:
+        return False
+    prefixes = tuple(p.strip() for p in settings.outbox_actions.split(",") if p.strip())
+    return bool(prefixes) and action.startswith(prefixes)
+
+
+def _aggregate(entry: AuditLog) -> tuple[str, str]:
+    if entry.resource_type in _AGGREGATE_TYPES and entry.resource_id is not None:
+        return entry.resource_type, entry.resource_id
+    if entry.user_id is not None:
+        return "user", str(entry.user_id)
+    return "user", f"email:{entry.user_email or '-'}"
+
+
+def record(db: Session, entry: AuditLog, *, repeats: int = 0) -> None:
+    """
+    Grava na outbox (mesma transação) o evento de auditoria, se a action é publicada.
+    repeats > 0: repetições agregadas na linha depois do primeiro evento.
+    """
+    if not _publishes(entry.action):
+        return
+    payload = audit_log_payload(entry)
+    payload["ip_address"] = normalize_ip(payload["ip_address"])
+    payload["created_at"] = _as_utc(entry.created_at or _now()).isoformat()
+    if entry.last_occurred_at is not None:
+        payload["last_occurred_at"] = _as_utc(entry.last_occurred_at).isoformat()
+    if repeats:
+        payload["repeats"] = repeats
+    if entry.resource_type == "session":
+        # resource_id de sessão pode ser o próprio refresh token: não sai do sistema
+        payload["resource_id"] = None
+    aggregate_type, aggregate_id = _aggregate(entry)
+    db.add(
+        OutboxEvent(
+            aggregate_type=aggregate_type,
+            aggregate_id=aggregate_id[:255],
+            event_type=entry.action,
+            payload=payload,
+            status="pending",
+            attempts=0,
+        )
+    )
+
+
+def record_repeats(db: Session, repeats: dict[int, int]) -> None:
+    """Um evento por linha agregada ({audit_log_id: repetições}), no flush da agregação."""
+    if not settings.outbox_sink or not repeats:
+        return
+    entries = db.scalars(
+        select(AuditLog).where(AuditLog.id.in_(repeats)).execution_options(populate_existing=True)
+    )
+    for entry in entries:
+        record(db, entry, repeats=repeats[entry.id])
+
+
+def _envelope(event: OutboxEvent) -> dict:
+    return {
+        "id": event.id,
+        "type": event.event_type,
+        "aggregate_type": event.aggregate_type,
+        "aggregate_id": event.aggregate_id,
+        "occurred_at": event.payload.get("created_at"),
+        "data": event.payload,
+    }
+
+
+def relay(db: Session, sink: OutboxSink, *, batch_size: int | None = None) -> int:
+    """
+    Entrega um lote de eventos pendentes ao sink. Retorna quantos foram entregues; em
+    falha o lote inteiro volta a ser tentado com backoff exponencial.
+    """
+    batch_size = batch_size or settings.outbox_batch_size
+    if db.get_bind().dialect.name == "postgresql":
+        if not db.scalar(select(func.pg_try_advisory_xact_lock(_RELAY_LOCK_KEY))):
+            db.rollback()
+            return 0
+
+    now = _now()
+    # Evento anterior do mesmo agregado aguardando nova tentativa: este espera. O filtro
+    # fica no SQL para um agregado retido não ocupar o lote (ix_outbox_events_retrying)
+    retrying = aliased(OutboxEvent)
+    held = exists().where(
+        retrying.status == "pending",
+        retrying.next_attempt_at > now,
+        retrying.aggregate_type == OutboxEvent.aggregate_type,
+        retrying.aggregate_id == OutboxEvent.aggregate_id,
+        retrying.id < OutboxEvent.id,
+    )
+    batch = db.scalars(
+        select(OutboxEvent)
+        .where(
+            OutboxEvent.status == "pending",
+            or_(OutboxEvent.next_attempt_at.is_(None), OutboxEvent.next_attempt_at <= now),
+            ~held,
+        )
+        .order_by(OutboxEvent.id)
+        .limit(batch_size)
+    ).all()
+    if not batch:
+        db.commit()
+        return 0
+
+    try:
+        sink.deliver([_envelope(e) for e in batch])
+    except Exception as exc:
+        for event in batch:
+            event.attempts += 1
+            event.last_error = str(exc)[:500]
+            if event.attempts >= settings.outbox_max_attempts:
+                event.status = "dead"
+            else:
+                delay = min(2 ** event.attempts, _MAX_BACKOFF_SECONDS)
+                event.next_attempt_at = now + timedelta(seconds=delay)
+        db.commit()
+        logger.warning("outbox: falha ao entregar %s eventos: %s", len(batch), exc)
+        return 0
+
+    for event in batch:
+        event.status = "delivered"
+        event.delivered_at = now
+    db.commit()
+    return len(batch)
+
+
+def purge_outbox(db: Session) -> int:
+    """
+    Remove eventos entregues e dead há mais de OUTBOX_RETENTION_HOURS e pendentes há mais
+    de OUTBOX_PENDING_RETENTION_HOURS. Retorna quantos foram removidos.
+    """
+    now = _now()
+    cutoff = now - timedelta(hours=settings.outbox_retention_hours)
+    finished = db.execute(
+        delete(OutboxEvent).where(
+            or_(
+                and_(OutboxEvent.status == "delivered", OutboxEvent.delivered_at < cutoff),
+                and_(OutboxEvent.status == "dead", OutboxEvent.created_at < cutoff),
+            )
+        )
+    ).rowcount or 0
+    pending_cutoff = now - timedelta(hours=settings.outbox_pending_retention_hours)
+    expired = db.execute(
+        delete(OutboxEvent).where(OutboxEvent.status == "pending", OutboxEvent.created_at < pending_cutoff)
+    ).rowcount or 0
+    db.commit()
+    if expired:
+        logger.warning("outbox: %s eventos pendentes descartados sem entrega", expired)
+    return finished + expired
@@ -0,0 +1,92 @@
+"""
+Destinos do relay da outbox (OUTBOX_SINK): webhook HTTP, arquivo NDJSON ou Redis Stream.
+
+Um sink recebe um lote de eventos já em ordem e entrega tudo ou levanta exceção; em
+caso de erro o relay tenta o lote de novo mais tarde, então os consumidores devem
+deduplicar pelo `id` do evento (entrega pelo menos uma vez).
+"""
+import hashlib
+import hmac
+import os
+import urllib.error
+import urllib.request
+from pathlib import Path
+from typing import Optional, Protocol
+
+import orjson
+
+from app.core.config import settings
+from app.core.redis import get_redis
+
+
+class OutboxSink(Protocol):
+    def deliver(self, events: list[dict]) -> None: ...
+
+
+class WebhookSink:
+    """POST {"events": [...]} em JSON; com segredo, assina o corpo (X-Outbox-Signature: sha256=<hmac>)."""
+
+    def __init__(self, url: str, secret: str = "", timeout: float = 10.0) -> None:
+        self.url = url
+        self.secret = secret
+        self.timeout = timeout
+
+    def deliver(self, events: list[dict]) -> None:
+        body = orjson.dumps({"events": events})
+        headers = {"Content-Type": "application/json"}
+        if self.secret:
+            digest = hmac.new(self.secret.encode(), body, hashlib.sha256).hexdigest()
+            headers["X-Outbox-Signature"] = f"sha256={digest}"
+        request = urllib.request.Request(self.url, data=body, headers=headers, method="POST")
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                response.read()
+        except urllib.error.HTTPError as exc:
+            raise RuntimeError(f"webhook respondeu {exc.code}") from exc
+
+
+class FileSink:
+    """Acrescenta um evento por linha (NDJSON) e faz fsync antes de confirmar o lote."""
+
+    def __init__(self, path: str) -> None:
+        self.path = Path(path)
+
+    def deliver(self, events: list[dict]) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self.path.open("ab") as f:
+            f.write(b"".join(orjson.dumps(e) + b"\n" for e in events))
+            f.flush()
+            os.fsync(f.fileno())
+
+
+class RedisStreamSink:
+    """XADD de cada evento (campo `data` com o JSON) num Redis Stream."""
+
+    def __init__(self, key: str) -> None:
+        self.key = key
+
+    def deliver(self, events: list[dict]) -> None:
+        pipe = get_redis().pipeline(transaction=True)
+        for e in events:
+            pipe.xadd(self.key, {"data": orjson.dumps(e).decode()})
+        pipe.execute()
+
+
+def get_sink() -> Optional[OutboxSink]:
+    """Sink configurado em OUTBOX_SINK, ou None (relay desligado). Levanta ValueError para valor inválido."""
+    kind = settings.outbox_sink
+    if not kind:
+        return None
+    if kind == "webhook":
+        if not settings.outbox_webhook_url:
+            raise ValueError("OUTBOX_WEBHOOK_URL é obrigatório com OUTBOX_SINK=webhook")
+        return WebhookSink(
+            settings.outbox_webhook_url,
+            settings.outbox_webhook_secret,
+            settings.outbox_webhook_timeout_seconds,
+        )
+    if kind == "file":
+        return FileSink(settings.outbox_file_path)
+    if kind == "redis":
+        return RedisStreamSink(settings.outbox_redis_stream)
+    raise ValueError(f"OUTBOX_SINK inválido: {kind}")
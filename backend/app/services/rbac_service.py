@@ -1,7 +1,8 @@
 from sqlalchemy import select
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, object_session
 
 from app.models import Permission, Role, User
+from app.services import effective_permission_service
 
 DEFAULT_PERMISSIONS = {
     # Users
@@ -26,6 +27,9 @@ DEFAULT_PERMISSIONS = {
     "audit:read": "Visualizar logs de auditoria",
     "sessions:read": "Listar sessões ativas",
     "sessions:revoke": "Revogar sessões",
+
+    # Espelhamento
+    "sync:read": "Ler o feed de mudanças de usuários e RBAC",
 }
 
 
@@ -51,6 +55,10 @@ def ensure_base_rbac(db: Session) -> None:
 
 
 def get_user_permissions(user: User) -> set[str]:
+    """Permissões efetivas (user_effective_permissions); objeto sem sessão usa os relacionamentos."""
+    db = object_session(user)
+    if db is not None and user.id is not None:
+        return set(effective_permission_service.permission_names(db, user.id))
     permissions: set[str] = set()
     for role in getattr(user, "roles", []) or []:
         for permission in getattr(role, "permissions", []) or []:
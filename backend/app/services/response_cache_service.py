@@ -0,0 +1,126 @@
+"""
+Cache de respostas GET pré-serializadas com ETag forte e suporte a If-None-Match.
+
+Cada entrada é indexada por (escopo, versões), onde as versões são contadores no Redis
+incrementados pelas escritas (perfil do usuário, roles/permissões). O cache é local ao
+worker e limitado em tamanho; se o Redis estiver indisponível a resposta é montada a
+cada chamada, mas o ETag (hash do conteúdo) continua permitindo 304.
+"""
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable
+
+import orjson
+from fastapi import Request, Response
+
+from app.core.redis import get_redis
+
+VERSION_PREFIX = "cache:version:"
+RBAC_VERSION_KEY = f"{VERSION_PREFIX}rbac"
+
+_MAX_ENTRIES = 2048
+# Rede de segurança caso um incremento de versão se perca (Redis fora do ar na escrita)
+_ENTRY_TTL_SECONDS = 300
+
+_entries: OrderedDict[tuple, tuple[float, str, bytes]] = OrderedDict()
+_lock = threading.Lock()
+
+
+def user_version_key(user_id: int) -> str:
+    return f"{VERSION_PREFIX}user:{user_id}"
+
+
+def bump_user_version(user_id: int) -> None:
+    """Invalida as respostas cacheadas do usuário (ex.: /users/me). Chamar após o commit."""
+    _incr(user_version_key(user_id))
+
+
+def bump_rbac_version() -> None:
+    """Invalida respostas que dependem de roles/permissões. Chamar após o commit."""
+    _incr(RBAC_VERSION_KEY)
+
+
+def _incr(key: str) -> None:
+    try:
+        get_redis().incr(key)
+    except Exception:
+        pass
+
+
+def _read_versions(keys: tuple[str, ...]) -> tuple[str, ...] | None:
+    try:
+        values = get_redis().mget(keys)
+    except Exception:
+        return None
+    return tuple(v or "0" for v in values)
+
+
+def _compute_etag(body: bytes) -> str:
+    return '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+
+
+def _etag_matches(if_none_match: str | None, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    # If-None-Match usa comparação fraca: ignora o prefixo W/
+    candidates = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    return etag in candidates
+
+
+def _get(key: tuple) -> tuple[str, bytes] | None:
+    with _lock:
+        entry = _entries.get(key)
+        if entry is None:
+            return None
+        stored_at, etag, body = entry
+        if time.monotonic() - stored_at > _ENTRY_TTL_SECONDS:
+            del _entries[key]
+            return None
+        _entries.move_to_end(key)
+        return etag, body
+
+
+def _put(key: tuple, etag: str, body: bytes) -> None:
+    with _lock:
+        _entries[key] = (time.monotonic(), etag, body)
+        _entries.move_to_end(key)
+        while len(_entries) > _MAX_ENTRIES:
+            _entries.popitem(last=False)
+
+
+def clear() -> None:
+    with _lock:
+        _entries.clear()
+
+
+def cached_json_response(
+    request: Request,
+    *,
+    scope: tuple,
+    version_keys: tuple[str, ...],
+    build: Callable[[], Any],
+) -> Response:
+    """
+    Devolve o JSON de `build()` usando o cache local indexado por (scope, versões).
+    Responde 304 sem corpo quando o If-None-Match do cliente bate com o ETag.
+    """
+    versions = _read_versions(version_keys)
+    key = (*scope, *versions) if versions is not None else None
+
+    cached = _get(key) if key is not None else None
+    if cached is None:
+        body = orjson.dumps(build())
+        etag = _compute_etag(body)
+        if key is not None:
+            _put(key, etag, body)
+    else:
+        etag, body = cached
+
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if _etag_matches(request.headers.get("If-None-Match"), etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
@@ -1,21 +1,162 @@
-"""Serviço de gerenciamento de sessões (RefreshToken)."""
+"""
+Serviço de gerenciamento de sessões (RefreshToken).
+
+Com SESSION_STORE=redis as operações quentes (criação, rotação, logout, listagem e
+revogação) são atendidas pelo session_store no Redis e o banco é atualizado por
+write-behind; com SESSION_STORE=database (padrão) tudo vai direto ao Postgres.
+A listagem administrativa (list_active_sessions) sempre consulta o banco.
+"""
+import base64
 from datetime import datetime, timezone
 
-from sqlalchemy import func, select
+from sqlalchemy import false, func, select, tuple_, update
 from sqlalchemy.orm import Session
 
+from app.core.config import settings
+from app.core.security import generate_refresh_token, refresh_token_expires_at
+from app.db.session import estimate_count
+from app.db.types import ip_in_network
 from app.models import RefreshToken, User
+from app.services import session_store
+from app.services.dimension_service import user_agent_ids_containing, user_agents
+from app.services.user_agent_service import device_fields
+
+
+def create_session(
+    db: Session,
+    user_id: int,
+    *,
+    ip_address: str | None = None,
+    user_agent: str | None = None,
+) -> str:
+    """
+    Cria uma sessão e devolve o refresh token. No modo database a linha é apenas
+    adicionada à sessão do SQLAlchemy: o commit fica a cargo do chamador.
+    """
+    token_id = generate_refresh_token()
+    session = {
+        "token_id": token_id,
+        "user_id": user_id,
+        "created_at": datetime.now(timezone.utc),
+        "expires_at": refresh_token_expires_at(),
+        "ip_address": ip_address,
+        "user_agent": user_agent,
+        **device_fields(user_agent),
+    }
+    if session_store.is_enabled():
+        session_store.add_session(db, session)
+    else:
+        user_agent_id = user_agents.id_for(db, user_agent)
+        db.add(RefreshToken(revoked=False, user_agent_id=user_agent_id, **session))
+    return token_id
+
+
+def enforce_session_cap(db: Session, user_id: int) -> list[str]:
+    """
+    Abre espaço para uma nova sessão: revoga as mais antigas do usuário além de
+    settings.max_sessions_per_user - 1. Retorna os token_ids revogados.
+
+    No modo database é um UPDATE só, cujo subselect percorre o índice parcial
+    (user_id, created_at DESC) e pula as sessões mantidas, sem ler o resto da tabela.
+    O commit fica a cargo do chamador (mesma transação do login).
+    """
+    cap = settings.max_sessions_per_user
+    if cap <= 0:
+        return []
+    if session_store.is_enabled():
+        return session_store.evict_oldest(db, user_id, keep=cap - 1)
+
+    oldest = (
+        select(RefreshToken.id)
+        .where(RefreshToken.user_id == user_id, RefreshToken.revoked == false())
+        .order_by(RefreshToken.created_at.desc())
+        .offset(cap - 1)
+        .scalar_subquery()
+    )
+    return list(
+        db.execute(
+            update(RefreshToken)
+            .where(RefreshToken.id.in_(oldest))
+            .values(revoked=True)
+            .returning(RefreshToken.token_id)
+            .execution_options(synchronize_session=False)
+        ).scalars()
+    )
+
+
+def count_user_sessions(db: Session, user_id: int) -> int:
+    """Número de sessões ativas do usuário (ZCARD no Redis; contagem via índice parcial no banco)."""
+    if session_store.is_enabled():
+        return session_store.count_user_sessions(db, user_id)
+    return db.scalar(
+        select(func.count())
+        .select_from(RefreshToken)
+        .where(
+            RefreshToken.user_id == user_id,
+            RefreshToken.revoked == false(),
+            RefreshToken.expires_at > datetime.now(timezone.utc),
+        )
+    ) or 0
+
+
+def end_session(db: Session, token_id: str) -> int | None:
+    """
+    Revoga a sessão (logout) sem checar o dono. Retorna o user_id da sessão
+    ou None se ela não existir. No modo database o commit fica a cargo do chamador.
+    """
+    if session_store.is_enabled():
+        session = session_store.revoke_session(db, token_id)
+        return session["user_id"] if session else None
+
+    rt: RefreshToken | None = db.scalar(
+        select(RefreshToken).where(RefreshToken.token_id == token_id)
+    )
+    if not rt:
+        return None
+    rt.revoked = True
+    return rt.user_id
+
+
+def revoke_all_user_sessions(db: Session, user_id: int) -> None:
+    """Revoga todas as sessões do usuário. No modo database o commit fica a cargo do chamador."""
+    if session_store.is_enabled():
+        session_store.revoke_user_sessions(db, user_id)
+        return
+    db.execute(
+        update(RefreshToken)
+        .where(RefreshToken.user_id == user_id, RefreshToken.revoked == false())
+        .values(revoked=True)
+        .execution_options(synchronize_session=False)
+    )
 
 
 def get_user_sessions(db: Session, user_id: int) -> list[RefreshToken]:
     """Retorna todas as sessões ativas (não revogadas e não expiradas) do usuário."""
+    if session_store.is_enabled():
+        sessions = session_store.list_user_sessions(db, user_id)
+        if not sessions:
+            return []
+        # last_seen_at só existe no banco (sessões ainda no write-behind ficam sem)
+        last_seen = dict(
+            db.execute(
+                select(RefreshToken.token_id, RefreshToken.last_seen_at).where(
+                    RefreshToken.token_id.in_([s["token_id"] for s in sessions])
+                )
+            ).all()
+        )
+        # Objetos transientes: nunca são adicionados à sessão do banco
+        return [
+            RefreshToken(revoked=False, last_seen_at=last_seen.get(s["token_id"]), **s)
+            for s in sessions
+        ]
+
     now = datetime.now(timezone.utc)
     return list(
         db.scalars(
             select(RefreshToken)
             .where(
                 RefreshToken.user_id == user_id,
-                RefreshToken.revoked.is_(False),
+                RefreshToken.revoked == false(),
                 RefreshToken.expires_at > now,
             )
             .order_by(RefreshToken.created_at.desc())
@@ -23,22 +164,123 @@ def get_user_sessions(db: Session, user_id: int) -> list[RefreshToken]:
     )
 
 
-def get_all_sessions(
-    db: Session, skip: int = 0, limit: int = 50
-) -> tuple[list[RefreshToken], int]:
-    """Retorna sessões ativas do sistema com paginação."""
+def encode_cursor(created_at: datetime, row_id: int) -> str:
+    raw = f"{created_at.isoformat()}|{row_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, int]:
+    """Decodifica o cursor opaco de paginação. Levanta ValueError se for inválido."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        created_at, row_id = raw.rsplit("|", 1)
+        return datetime.fromisoformat(created_at), int(row_id)
+    except Exception as exc:
+        raise ValueError("Cursor inválido") from exc
+
+
+def list_active_sessions(
+    db: Session,
+    *,
+    limit: int = 50,
+    cursor: str | None = None,
+    user_id: int | None = None,
+    cidr: str | None = None,
+    user_agent: str | None = None,
+    device_class: str | None = None,
+) -> tuple[list[dict], str | None, int, bool]:
+    """
+    Lista sessões ativas do sistema (com o email do dono) numa única consulta,
+    paginada por cursor em (created_at, id), das mais recentes para as mais antigas.
+
+    Retorna (itens, próximo cursor ou None, total, total_is_estimate).
+    """
     now = datetime.now(timezone.utc)
-    base = select(RefreshToken).where(
-        RefreshToken.revoked.is_(False),
-        RefreshToken.expires_at > now,
-    )
-    total = db.scalar(select(func.count()).select_from(base.subquery())) or 0
-    rows = list(
-        db.scalars(
-            base.order_by(RefreshToken.created_at.desc()).offset(skip).limit(limit)
-        ).all()
+    stmt = (
+        select(
+            RefreshToken.id,
+            RefreshToken.token_id,
+            RefreshToken.user_id,
+            User.email.label("user_email"),
+            RefreshToken.ip_address,
+            RefreshToken.user_agent,
+            RefreshToken.device_name,
+            RefreshToken.device_class,
+            RefreshToken.created_at,
+            RefreshToken.expires_at,
+            RefreshToken.last_seen_at,
+        )
+        .join(User, User.id == RefreshToken.user_id)
+        .where(RefreshToken.revoked == false(), RefreshToken.expires_at > now)
     )
-    return rows, total
+    if user_id is not None:
+        stmt = stmt.where(RefreshToken.user_id == user_id)
+    if cidr:
+        stmt = stmt.where(ip_in_network(db, RefreshToken.ip_address, cidr))
+    if user_agent:
+        stmt = stmt.where(RefreshToken.user_agent_id.in_(user_agent_ids_containing(user_agent)))
+    if device_class:
+        stmt = stmt.where(RefreshToken.device_class == device_class)
+
+    total, is_estimate = estimate_count(db, stmt)
+
+    if cursor:
+        created_at, row_id = decode_cursor(cursor)
+        stmt = stmt.where(tuple_(RefreshToken.created_at, RefreshToken.id) < (created_at, row_id))
+    rows = db.execute(
+        stmt.order_by(RefreshToken.created_at.desc(), RefreshToken.id.desc()).limit(limit + 1)
+    ).all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1].created_at, rows[-1].id)
+    items = [
+        {**{k: v for k, v in row._mapping.items() if k != "id"}, "is_current": False}
+        for row in rows
+    ]
+    return items, next_cursor, total, is_estimate
+
+
+def revoke_sessions_bulk(
+    db: Session,
+    *,
+    user_ids: list[int] | None = None,
+    cidr: str | None = None,
+    user_agent: str | None = None,
+) -> list[tuple[str, int]]:
+    """
+    Revoga num único UPDATE ... RETURNING todas as sessões ativas que atendem aos
+    critérios (combinados com AND). Retorna [(token_id, user_id)] das sessões revogadas.
+    O commit fica a cargo do chamador.
+    """
+    if session_store.is_enabled():
+        # O banco precisa estar em dia com o store antes do UPDATE por critério
+        session_store.drain_write_behind(db)
+
+    conditions = [
+        RefreshToken.revoked == false(),
+        RefreshToken.expires_at > datetime.now(timezone.utc),
+    ]
+    if user_ids:
+        conditions.append(RefreshToken.user_id.in_(user_ids))
+    if cidr:
+        conditions.append(ip_in_network(db, RefreshToken.ip_address, cidr))
+    if user_agent:
+        conditions.append(RefreshToken.user_agent_id.in_(user_agent_ids_containing(user_agent)))
+
+    rows = db.execute(
+        update(RefreshToken)
+        .where(*conditions)
+        .values(revoked=True)
+        .returning(RefreshToken.token_id, RefreshToken.user_id)
+        .execution_options(synchronize_session=False)
+    ).all()
+    revoked = [(row.token_id, row.user_id) for row in rows]
+
+    if revoked and session_store.is_enabled():
+        session_store.discard_sessions(revoked)
+    return revoked
 
 
 def revoke_session(
@@ -54,6 +296,14 @@ def revoke_session(
     Caso contrário, só revoga se a sessão pertencer ao user.
     Retorna True se revogou, False se não encontrou ou sem permissão.
     """
+    if session_store.is_enabled():
+        session = session_store.get_session(db, token_id)
+        if not session:
+            return False
+        if not admin_override and session["user_id"] != user.id:
+            return False
+        return session_store.revoke_session(db, token_id) is not None
+
     rt: RefreshToken | None = db.scalar(
         select(RefreshToken).where(RefreshToken.token_id == token_id)
     )
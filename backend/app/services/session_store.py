@@ -0,0 +1,386 @@
+"""
+Store opcional de sessões ativas (refresh tokens) residente no Redis, com write-behind
+para o Postgres. Ativado com SESSION_STORE=redis.
+
+Chaves:
+  session:{token_id}       hash com user_id, created_at, expires_at, ip_address, user_agent,
+                           device_name, device_class; expira sozinho (EXPIREAT) junto com o token
+  session:user:{user_id}   sorted set token_id -> created_at (epoch) das sessões do usuário
+  session:writebehind      fila (list) de operações JSON pendentes de gravação no banco
+  session:used:{token_id}  marca de token já consumido (rotação/logout), até a expiração
+  session:ready            marcador de que o store foi carregado a partir do banco
+
+O Redis é a fonte de verdade para refresh, logout, listagem e revogação; o banco recebe
+as mesmas operações de forma assíncrona (flush_write_behind) e serve de registro durável.
+Num cold start (marcador ausente) o store é reconstruído a partir do banco.
+"""
+import json
+import logging
+import time
+from datetime import datetime, timezone
+
+from sqlalchemy import false, insert, select, update
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.redis import get_redis
+from app.db.types import normalize_ip
+from app.models import RefreshToken
+from app.services.dimension_service import user_agents
+
+logger = logging.getLogger(__name__)
+
+SESSION_PREFIX = "session:"
+USER_PREFIX = "session:user:"
+WRITE_BEHIND_KEY = "session:writebehind"
+READY_KEY = "session:ready"
+REBUILD_LOCK_KEY = "session:rebuild:lock"
+USED_PREFIX = "session:used:"
+
+_REBUILD_LOCK_SECONDS = 300
+_REBUILD_WAIT_SECONDS = 30
+_REBUILD_CHUNK = 1000
+
+_FIELDS = (
+    "user_id", "created_at", "expires_at", "ip_address", "user_agent", "device_name", "device_class",
+)
+
+
+class SessionStoreUnavailable(RuntimeError):
+    """O store não ficou pronto (reconstrução em andamento por tempo demais)."""
+
+
+def is_enabled() -> bool:
+    return settings.session_store == "redis"
+
+
+def _session_key(token_id: str) -> str:
+    return f"{SESSION_PREFIX}{token_id}"
+
+
+def _user_key(user_id: int) -> str:
+    return f"{USER_PREFIX}{user_id}"
+
+
+def _ts(value: datetime) -> float:
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.timestamp()
+
+
+def _encode(session: dict) -> dict:
+    return {
+        "user_id": session["user_id"],
+        "created_at": _ts(session["created_at"]),
+        "expires_at": _ts(session["expires_at"]),
+        "ip_address": normalize_ip(session.get("ip_address")) or "",
+        "user_agent": session.get("user_agent") or "",
+        "device_name": session.get("device_name") or "",
+        "device_class": session.get("device_class") or "",
+    }
+
+
+def _decode(token_id: str, raw: dict) -> dict | None:
+    if not raw:
+        return None
+    return {
+        "token_id": token_id,
+        "user_id": int(raw["user_id"]),
+        "created_at": datetime.fromtimestamp(float(raw["created_at"]), tz=timezone.utc),
+        "expires_at": datetime.fromtimestamp(float(raw["expires_at"]), tz=timezone.utc),
+        "ip_address": raw.get("ip_address") or None,
+        "user_agent": raw.get("user_agent") or None,
+        "device_name": raw.get("device_name") or None,
+        "device_class": raw.get("device_class") or None,
+    }
+
+
+def _enqueue(pipe, op: dict) -> None:
+    pipe.rpush(WRITE_BEHIND_KEY, json.dumps(op, default=str))
+
+
+def _write_session(pipe, session: dict) -> None:
+    key = _session_key(session["token_id"])
+    encoded = _encode(session)
+    pipe.hset(key, mapping=encoded)
+    pipe.expireat(key, int(encoded["expires_at"]) + 1)
+    user_key = _user_key(session["user_id"])
+    pipe.zadd(user_key, {session["token_id"]: encoded["created_at"]})
+    pipe.expire(user_key, settings.refresh_token_expire_days * 86400)
+
+
+def _ensure_ready(db: Session) -> None:
+    if not get_redis().exists(READY_KEY):
+        rebuild_from_database(db)
+
+
+def add_session(db: Session, session: dict) -> None:
+    """Registra uma nova sessão (dict com token_id, user_id, created_at, expires_at, ip/ua)."""
+    _ensure_ready(db)
+    pipe = get_redis().pipeline(transaction=True)
+    _write_session(pipe, session)
+    _enqueue(pipe, {"op": "insert", **{k: session.get(k) for k in ("token_id", *_FIELDS)}})
+    pipe.execute()
+
+
+def get_session(db: Session, token_id: str) -> dict | None:
+    _ensure_ready(db)
+    return _decode(token_id, get_redis().hgetall(_session_key(token_id)))
+
+
+def consume_session(db: Session, token_id: str) -> dict | None:
+    """
+    Remove a sessão atomicamente e a devolve; só um chamador concorrente a recebe.
+    Retorna None se não existir (revogada, expirada ou já consumida).
+    """
+    _ensure_ready(db)
+    r = get_redis()
+    pipe = r.pipeline(transaction=True)
+    pipe.hgetall(_session_key(token_id))
+    pipe.delete(_session_key(token_id))
+    raw, deleted = pipe.execute()
+    session = _decode(token_id, raw) if deleted else None
+    if session is None:
+        return None
+    r.zrem(_user_key(session["user_id"]), token_id)
+    if session["expires_at"] <= datetime.now(timezone.utc):
+        return None
+    # Marca o token como usado até a expiração, para distinguir reuso de token inválido
+    r.set(f"{USED_PREFIX}{token_id}", "1", exat=int(_ts(session["expires_at"])) + 1)
+    return session
+
+
+def was_consumed(token_id: str) -> bool:
+    return bool(get_redis().exists(f"{USED_PREFIX}{token_id}"))
+
+
+def restore_session(session: dict) -> None:
+    """Devolve ao store uma sessão consumida cuja rotação foi abortada."""
+    pipe = get_redis().pipeline(transaction=True)
+    _write_session(pipe, session)
+    pipe.delete(f"{USED_PREFIX}{session['token_id']}")
+    pipe.execute()
+
+
+def revoke_session(db: Session, token_id: str) -> dict | None:
+    """Revoga (remove) a sessão e agenda a revogação no banco. Retorna a sessão removida."""
+    session = consume_session(db, token_id)
+    if session is not None:
+        enqueue_revoke(token_id)
+    return session
+
+
+def enqueue_revoke(token_id: str) -> None:
+    """Agenda a revogação do token no banco (sessão já removida do Redis)."""
+    get_redis().rpush(WRITE_BEHIND_KEY, json.dumps({"op": "revoke", "token_id": token_id}))
+
+
+def evict_oldest(db: Session, user_id: int, keep: int) -> list[str]:
+    """Revoga as sessões mais antigas do usuário, mantendo as `keep` mais recentes."""
+    _ensure_ready(db)
+    r = get_redis()
+    user_key = _user_key(user_id)
+    # zrange 0..-(keep+1): tudo exceto as `keep` maiores pontuações (mais recentes)
+    token_ids = r.zrange(user_key, 0, -(keep + 1))
+    if not token_ids:
+        return []
+    pipe = r.pipeline(transaction=True)
+    for token_id in token_ids:
+        pipe.delete(_session_key(token_id))
+        _enqueue(pipe, {"op": "revoke", "token_id": token_id})
+    pipe.zrem(user_key, *token_ids)
+    pipe.execute()
+    return token_ids
+
+
+def count_user_sessions(db: Session, user_id: int) -> int:
+    _ensure_ready(db)
+    return get_redis().zcard(_user_key(user_id))
+
+
+def discard_sessions(sessions: list[tuple[str, int]]) -> None:
+    """
+    Remove do store sessões (token_id, user_id) já revogadas direto no banco,
+    sem agendar write-behind.
+    """
+    r = get_redis()
+    for start in range(0, len(sessions), _REBUILD_CHUNK):
+        pipe = r.pipeline(transaction=False)
+        for token_id, user_id in sessions[start:start + _REBUILD_CHUNK]:
+            pipe.delete(_session_key(token_id))
+            pipe.zrem(_user_key(user_id), token_id)
+        pipe.execute()
+
+
+def drain_write_behind(db: Session) -> int:
+    """Aplica toda a fila de write-behind. Retorna o número de operações aplicadas."""
+    total = 0
+    while applied := flush_write_behind(db):
+        total += applied
+    return total
+
+
+def revoke_user_sessions(db: Session, user_id: int) -> int:
+    """Revoga todas as sessões do usuário. Retorna quantas estavam ativas no store."""
+    _ensure_ready(db)
+    r = get_redis()
+    user_key = _user_key(user_id)
+    token_ids = r.zrange(user_key, 0, -1)
+    pipe = r.pipeline(transaction=True)
+    for token_id in token_ids:
+        pipe.delete(_session_key(token_id))
+    pipe.delete(user_key)
+    _enqueue(
+        pipe,
+        {"op": "revoke_user", "user_id": user_id, "before": datetime.now(timezone.utc).isoformat()},
+    )
+    pipe.execute()
+    return len(token_ids)
+
+
+def list_user_sessions(db: Session, user_id: int) -> list[dict]:
+    """Sessões ativas do usuário, mais recentes primeiro; remove do índice as já expiradas."""
+    _ensure_ready(db)
+    r = get_redis()
+    user_key = _user_key(user_id)
+    token_ids = r.zrevrange(user_key, 0, -1)
+    if not token_ids:
+        return []
+    pipe = r.pipeline(transaction=False)
+    for token_id in token_ids:
+        pipe.hgetall(_session_key(token_id))
+    sessions, stale = [], []
+    for token_id, raw in zip(token_ids, pipe.execute()):
+        session = _decode(token_id, raw)
+        if session is None:
+            stale.append(token_id)
+        else:
+            sessions.append(session)
+    if stale:
+        r.zrem(user_key, *stale)
+    return sessions
+
+
+def flush_write_behind(db: Session, batch_size: int | None = None) -> int:
+    """
+    Grava no banco um lote de operações pendentes. Retorna quantas foram aplicadas.
+
+    As operações são idempotentes (insert ignora token existente; revogações são UPDATEs),
+    e revoke_user só atinge sessões criadas até o instante da revogação, então a ordem
+    de aplicação dentro do lote não altera o resultado. Em caso de erro o lote volta
+    para o início da fila.
+    """
+    r = get_redis()
+    items = r.lpop(WRITE_BEHIND_KEY, batch_size or settings.session_write_behind_batch_size)
+    if not items:
+        return 0
+    ops = [json.loads(item) for item in items]
+    try:
+        _apply_ops(db, ops)
+        db.commit()
+    except Exception:
+        db.rollback()
+        r.lpush(WRITE_BEHIND_KEY, *reversed(items))
+        raise
+    return len(ops)
+
+
+def _apply_ops(db: Session, ops: list[dict]) -> None:
+    inserts = [op for op in ops if op["op"] == "insert"]
+    if inserts:
+        known = set(
+            db.execute(
+                select(RefreshToken.token_id).where(
+                    RefreshToken.token_id.in_([op["token_id"] for op in inserts])
+                )
+            ).scalars()
+        )
+        rows = [
+            {
+                "token_id": op["token_id"],
+                "user_id": op["user_id"],
+                "created_at": datetime.fromisoformat(op["created_at"]),
+                "expires_at": datetime.fromisoformat(op["expires_at"]),
+                "revoked": False,
+                "ip_address": op.get("ip_address"),
+                "user_agent_id": user_agents.id_for(db, op.get("user_agent")),
+                "device_name": op.get("device_name"),
+                "device_class": op.get("device_class"),
+            }
+            for op in inserts
+            if op["token_id"] not in known
+        ]
+        if rows:
+            db.execute(insert(RefreshToken), rows)
+
+    revoked = [op["token_id"] for op in ops if op["op"] == "revoke"]
+    if revoked:
+        db.execute(
+            update(RefreshToken)
+            .where(RefreshToken.token_id.in_(revoked))
+            .values(revoked=True)
+            .execution_options(synchronize_session=False)
+        )
+
+    for op in ops:
+        if op["op"] == "revoke_user":
+            db.execute(
+                update(RefreshToken)
+                .where(
+                    RefreshToken.user_id == op["user_id"],
+                    RefreshToken.revoked == false(),
+                    RefreshToken.created_at <= datetime.fromisoformat(op["before"]),
+                )
+                .values(revoked=True)
+                .execution_options(synchronize_session=False)
+            )
+
+
+def rebuild_from_database(db: Session) -> int:
+    """
+    Carrega as sessões ativas do banco para o Redis (cold start) e marca o store como pronto.
+    Só um processo reconstrói por vez; os demais aguardam o marcador.
+    Retorna o número de sessões carregadas (0 se outro processo fez o trabalho).
+    """
+    r = get_redis()
+    if r.exists(READY_KEY):
+        return 0
+    if not r.set(REBUILD_LOCK_KEY, "1", nx=True, ex=_REBUILD_LOCK_SECONDS):
+        deadline = time.monotonic() + _REBUILD_WAIT_SECONDS
+        while time.monotonic() < deadline:
+            if r.exists(READY_KEY):
+                return 0
+            time.sleep(0.1)
+        raise SessionStoreUnavailable("Reconstrução do store de sessões em andamento")
+
+    try:
+        now = datetime.now(timezone.utc)
+        loaded = 0
+        stmt = (
+            select(RefreshToken)
+            .where(RefreshToken.revoked == false(), RefreshToken.expires_at > now)
+            .execution_options(yield_per=_REBUILD_CHUNK)
+        )
+        for chunk in db.execute(stmt).scalars().partitions():
+            pipe = r.pipeline(transaction=False)
+            for rt in chunk:
+                _write_session(
+                    pipe,
+                    {
+                        "token_id": rt.token_id,
+                        "user_id": rt.user_id,
+                        "created_at": rt.created_at,
+                        "expires_at": rt.expires_at,
+                        "ip_address": rt.ip_address,
+                        "user_agent": rt.user_agent,
+                        "device_name": rt.device_name,
+                        "device_class": rt.device_class,
+                    },
+                )
+            pipe.execute()
+            loaded += len(chunk)
+        r.set(READY_KEY, "1")
+        logger.info("session_store: %s sessões carregadas do banco", loaded)
+        return loaded
+    finally:
+        r.delete(REBUILD_LOCK_KEY)
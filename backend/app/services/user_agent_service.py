@@ -0,0 +1,86 @@
+"""
+Classificação de User-Agent (classe de dispositivo, navegador e sistema) para sessões.
+
+O parsing usa expressões regulares simples e fica atrás de um LRU limitado indexado
+pela string do User-Agent: poucas strings cobrem quase todo o tráfego, então no caminho
+quente (login/refresh) o custo é uma consulta a dicionário.
+"""
+import re
+from functools import lru_cache
+from typing import NamedTuple
+
+DEVICE_CLASSES = ("desktop", "mobile", "tablet", "bot", "other")
+
+
+class DeviceInfo(NamedTuple):
+    device_class: str
+    browser: str | None
+    os: str | None
+
+    @property
+    def device_name(self) -> str | None:
+        """Texto curto para a UI, ex.: 'Chrome em Windows'."""
+        if self.browser and self.os:
+            return f"{self.browser} em {self.os}"
+        return self.browser or self.os
+
+
+_BOT = re.compile(r"bot|crawl|spider|slurp|curl|wget|python-requests|httpx|okhttp|postman", re.I)
+_TABLET = re.compile(r"ipad|tablet|kindle|silk|playbook|(android(?!.*mobile))", re.I)
+_MOBILE = re.compile(r"mobi|iphone|ipod|android|windows phone|blackberry|opera mini", re.I)
+
+# Ordem importa: Edge e Opera se identificam também como Chrome; Chrome também como Safari
+_BROWSERS = (
+    ("Edge", re.compile(r"Edg(?:e|A|iOS)?/", re.I)),
+    ("Opera", re.compile(r"OPR/|Opera", re.I)),
+    ("Samsung Internet", re.compile(r"SamsungBrowser/", re.I)),
+    ("Firefox", re.compile(r"Firefox/|FxiOS/", re.I)),
+    ("Chrome", re.compile(r"Chrome/|CriOS/", re.I)),
+    ("Safari", re.compile(r"Version/[\d.]+.*Safari/", re.I)),
+    ("curl", re.compile(r"^curl/", re.I)),
+)
+
+_SYSTEMS = (
+    ("iOS", re.compile(r"iPhone|iPad|iPod", re.I)),
+    ("Android", re.compile(r"Android", re.I)),
+    ("Windows", re.compile(r"Windows", re.I)),
+    ("macOS", re.compile(r"Mac OS X|Macintosh", re.I)),
+    ("ChromeOS", re.compile(r"CrOS", re.I)),
+    ("Linux", re.compile(r"Linux", re.I)),
+)
+
+_UNKNOWN = DeviceInfo("other", None, None)
+
+
+def _first_match(patterns, ua: str) -> str | None:
+    for name, pattern in patterns:
+        if pattern.search(ua):
+            return name
+    return None
+
+
+@lru_cache(maxsize=2048)
+def parse_user_agent(user_agent: str | None) -> DeviceInfo:
+    """Classifica o User-Agent. Nunca levanta exceção; UA vazio resulta em 'other'."""
+    if not user_agent:
+        return _UNKNOWN
+    if _BOT.search(user_agent):
+        device_class = "bot"
+    elif _TABLET.search(user_agent):
+        device_class = "tablet"
+    elif _MOBILE.search(user_agent):
+        device_class = "mobile"
+    else:
+        device_class = "desktop"
+
+    browser = _first_match(_BROWSERS, user_agent)
+    system = _first_match(_SYSTEMS, user_agent)
+    if device_class == "desktop" and not browser and not system:
+        device_class = "other"
+    return DeviceInfo(device_class, browser, system)
+
+
+def device_fields(user_agent: str | None) -> dict:
+    """Colunas device_name/device_class de uma nova sessão."""
+    info = parse_user_agent(user_agent)
+    return {"device_name": info.device_name, "device_class": info.device_class}
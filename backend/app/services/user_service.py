@@ -1,12 +1,19 @@
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone
 from typing import TYPE_CHECKING, Any, Optional
 
 from fastapi import HTTPException, status
-from sqlalchemy import select
-from sqlalchemy.orm import Session, selectinload
+from pydantic import ValidationError
+from sqlalchemy import insert, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session, lazyload, selectinload
 
+from app.core.config import settings
 from app.core.security import hash_password
-from app.models import Role, User
+from app.db.session import unit_of_work
+from app.models import Role, User, user_roles
+from app.schemas.user import UserCreate
+from app.services import change_feed_service, effective_permission_service, response_cache_service
 
 if TYPE_CHECKING:
     from app.models import User as UserType
@@ -15,7 +22,7 @@ def get_user_or_404(db: Session, user_id: int) -> User:
     user = db.execute(
         select(User)
         .where(User.id == user_id, User.deleted_at.is_(None))
-        .options(selectinload(User.roles).selectinload(Role.permissions))
+        .options(selectinload(User.roles).lazyload(Role.permissions))
     ).scalar_one_or_none()
     if not user:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Usuário não encontrado")
@@ -26,7 +33,7 @@ def get_by_email(db: Session, email: str) -> User | None:
     return db.execute(
         select(User)
         .where(User.email == email, User.deleted_at.is_(None))
-        .options(selectinload(User.roles).selectinload(Role.permissions))
+        .options(selectinload(User.roles).lazyload(Role.permissions))
     ).scalar_one_or_none()
 
 
@@ -34,7 +41,7 @@ def list_users(db: Session) -> list[User]:
     return db.execute(
         select(User)
         .where(User.deleted_at.is_(None))
-        .options(selectinload(User.roles).selectinload(Role.permissions))
+        .options(selectinload(User.roles).lazyload(Role.permissions))
         .order_by(User.id)
     ).scalars().all()
 
@@ -49,37 +56,44 @@ def create_user(
     current_user: Optional["UserType"] = None,
     request: Any = None,
 ) -> User:
-    if db.execute(select(User).where(User.email == email, User.deleted_at.is_(None))).scalar_one_or_none():
-        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Email já cadastrado")
-
+    """
+    Cria o usuário e o evento de auditoria numa única transação.
+    O usuário retornado já tem roles carregados; as permissões efetivas são gravadas no flush.
+    """
     roles: list[Role] = []
     if role_ids:
-        roles = db.execute(select(Role).where(Role.id.in_(role_ids))).scalars().all()
-
-    user = User(
-        email=email,
-        full_name=full_name,
-        hashed_password=hash_password(password),
-        is_active=is_active,
-        roles=roles,
-        created_by=current_user.id if current_user else None,
-    )
-    db.add(user)
-    db.commit()
-    db.refresh(user)
-
-    if current_user and request:
-        from app.services import audit_service
-        audit_service.log_event(
-            db, action="user.create", result="success",
-            user_id=current_user.id, user_email=current_user.email,
-            resource_type="user", resource_id=user.id,
-            changes={"after": {"email": user.email, "full_name": user.full_name}},
-            request=request,
-        )
-        db.commit()
+        roles = db.execute(
+            select(Role).where(Role.id.in_(role_ids)).options(lazyload(Role.permissions))
+        ).scalars().all()
+
+    try:
+        with unit_of_work(db):
+            user = User(
+                email=email,
+                full_name=full_name,
+                hashed_password=hash_password(password),
+                is_active=is_active,
+                roles=roles,
+                created_by=current_user.id if current_user else None,
+            )
+            db.add(user)
+            # INSERT ... RETURNING id: o id sai no próprio flush
+            db.flush()
+
+            if current_user and request:
+                from app.services import audit_service
+                audit_service.log_event(
+                    db, action="user.create", result="success",
+                    user_id=current_user.id, user_email=current_user.email,
+                    resource_type="user", resource_id=user.id,
+                    changes={"after": {"email": user.email, "full_name": user.full_name}},
+                    request=request,
+                )
+    except IntegrityError:
+        # Unicidade de email também cobre usuários removidos (soft delete)
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Email já cadastrado")
 
-    return get_user_or_404(db, user.id)
+    return user
 
 
 def update_user(
@@ -92,36 +106,38 @@ def update_user(
     current_user: Optional["UserType"] = None,
     request: Any = None,
 ) -> User:
-    before = {"full_name": user.full_name, "is_active": user.is_active}
-    if full_name is not None:
-        user.full_name = full_name
-    if is_active is not None:
-        user.is_active = is_active
-    if password is not None:
-        user.hashed_password = hash_password(password)
-    if role_ids is not None:
-        user.roles = (
-            db.execute(select(Role).where(Role.id.in_(role_ids))).scalars().all()
-            if role_ids
-            else []
-        )
-    user.updated_by = current_user.id if current_user else None
-    db.commit()
-    db.refresh(user)
-    after = {"full_name": user.full_name, "is_active": user.is_active}
-
-    if current_user and request:
-        from app.services import audit_service
-        audit_service.log_event(
-            db, action="user.update", result="success",
-            user_id=current_user.id, user_email=current_user.email,
-            resource_type="user", resource_id=user.id,
-            changes={"before": before, "after": after},
-            request=request,
-        )
-        db.commit()
+    """Aplica a alteração e a auditoria numa única transação e devolve o próprio objeto da sessão."""
+    with unit_of_work(db):
+        before = {"full_name": user.full_name, "is_active": user.is_active}
+        if full_name is not None:
+            user.full_name = full_name
+        if is_active is not None:
+            user.is_active = is_active
+        if password is not None:
+            user.hashed_password = hash_password(password)
+        if role_ids is not None:
+            user.roles = (
+                db.execute(
+                    select(Role).where(Role.id.in_(role_ids)).options(lazyload(Role.permissions))
+                ).scalars().all()
+                if role_ids
+                else []
+            )
+        user.updated_by = current_user.id if current_user else None
+        after = {"full_name": user.full_name, "is_active": user.is_active}
 
-    return get_user_or_404(db, user.id)
+        if current_user and request:
+            from app.services import audit_service
+            audit_service.log_event(
+                db, action="user.update", result="success",
+                user_id=current_user.id, user_email=current_user.email,
+                resource_type="user", resource_id=user.id,
+                changes={"before": before, "after": after},
+                request=request,
+            )
+
+    response_cache_service.bump_user_version(user.id)
+    return user
 
 
 def delete_user(
@@ -131,16 +147,172 @@ def delete_user(
     request: Any = None,
 ) -> None:
     """Soft delete: marca deleted_at em vez de remover do banco."""
-    user.deleted_at = datetime.now(timezone.utc)
-    user.is_active = False
-    db.commit()
-
-    if current_user and request:
-        from app.services import audit_service
-        audit_service.log_event(
-            db, action="user.delete", result="success",
-            user_id=current_user.id, user_email=current_user.email,
-            resource_type="user", resource_id=user.id,
-            request=request,
+    with unit_of_work(db):
+        user.deleted_at = datetime.now(timezone.utc)
+        user.is_active = False
+
+        if current_user and request:
+            from app.services import audit_service
+            audit_service.log_event(
+                db, action="user.delete", result="success",
+                user_id=current_user.id, user_email=current_user.email,
+                resource_type="user", resource_id=user.id,
+                request=request,
+            )
+
+    response_cache_service.bump_user_version(user.id)
+
+
+_hash_pool: ThreadPoolExecutor | None = None
+
+
+def _get_hash_pool() -> ThreadPoolExecutor:
+    """Pool compartilhado para bcrypt (a lib libera o GIL durante o hash)."""
+    global _hash_pool
+    if _hash_pool is None:
+        _hash_pool = ThreadPoolExecutor(
+            max_workers=settings.bulk_import_hash_workers,
+            thread_name_prefix="bulk-hash",
+        )
+    return _hash_pool
+
+
+def _validation_messages(exc: ValidationError) -> list[str]:
+    messages = []
+    for err in exc.errors():
+        field = ".".join(str(loc) for loc in err["loc"])
+        msg = err["msg"].removeprefix("Value error, ")
+        messages.append(f"{field}: {msg}" if field else msg)
+    return messages
+
+
+def bulk_create_users(
+    db: Session,
+    rows: list[tuple[int, dict | None]],
+    *,
+    seen_emails: set[str],
+    dry_run: bool = False,
+    current_user: Optional["UserType"] = None,
+    request: Any = None,
+) -> list[dict]:
+    """
+    Valida e insere um lote de usuários (linha, dados brutos) com as regras de UserCreate.
+
+    Senhas são hasheadas em paralelo, usuários e vínculos com roles entram em INSERTs
+    em lote, e um único evento de auditoria resume o lote. `seen_emails` acumula os
+    e-mails já vistos no arquivo para detectar duplicidade entre lotes.
+    Retorna o resultado por linha (status created | valid | error).
+    """
+    from app.services import audit_service
+
+    results: list[dict] = []
+    valid: list[tuple[dict, UserCreate]] = []
+
+    for row_number, raw in rows:
+        result = {"row": row_number, "email": None, "status": "error", "id": None, "errors": []}
+        results.append(result)
+        if not isinstance(raw, dict):
+            result["errors"] = ["Linha inválida: esperado um objeto JSON"]
+            continue
+        result["email"] = raw.get("email") or None
+        try:
+            data = UserCreate.model_validate(raw)
+        except ValidationError as exc:
+            result["errors"] = _validation_messages(exc)
+            continue
+        result["email"] = data.email
+        if data.email.lower() in seen_emails:
+            result["errors"] = ["Email duplicado no arquivo"]
+            continue
+        seen_emails.add(data.email.lower())
+        valid.append((result, data))
+
+    if valid:
+        emails = [data.email for _, data in valid]
+        # Unicidade de email vale também para usuários removidos (soft delete)
+        existing = set(db.execute(select(User.email).where(User.email.in_(emails))).scalars().all())
+        role_ids = {rid for _, data in valid for rid in data.role_ids or []}
+        known_roles = (
+            set(db.execute(select(Role.id).where(Role.id.in_(role_ids))).scalars().all())
+            if role_ids
+            else set()
         )
-        db.commit()
+
+        accepted = []
+        for result, data in valid:
+            if data.email in existing:
+                result["errors"] = ["Email já cadastrado"]
+                continue
+            missing = sorted(set(data.role_ids or []) - known_roles)
+            if missing:
+                result["errors"] = [f"Role inexistente: {', '.join(map(str, missing))}"]
+                continue
+            accepted.append((result, data))
+        valid = accepted
+
+    if dry_run or not valid:
+        for result, _ in valid:
+            result["status"] = "valid"
+        return results
+
+    hashes = list(_get_hash_pool().map(hash_password, [data.password for _, data in valid]))
+    created_by = current_user.id if current_user else None
+    try:
+        with unit_of_work(db):
+            inserted = _insert_bulk_users(db, valid, hashes, created_by)
+            if current_user and request:
+                audit_service.log_event(
+                    db, action="user.bulk_create", result="success",
+                    user_id=current_user.id, user_email=current_user.email,
+                    resource_type="user",
+                    changes={"after": {"created": len(inserted), "user_ids": inserted}},
+                    detail=f"rows {rows[0][0]}-{rows[-1][0]}: {len(inserted)} criados, {len(rows) - len(inserted)} com erro",
+                    request=request,
+                )
+    except IntegrityError:
+        # Corrida com outra escrita (ex.: mesmo e-mail criado em paralelo): descarta o lote
+        for result, _ in valid:
+            result["errors"] = ["Conflito ao inserir o lote; reenvie a linha"]
+        return results
+
+    for user_id, (result, _) in zip(inserted, valid):
+        result["status"] = "created"
+        result["id"] = user_id
+    return results
+
+
+def _insert_bulk_users(
+    db: Session,
+    valid: list[tuple[dict, UserCreate]],
+    hashes: list[str],
+    created_by: int | None,
+) -> list[int]:
+    inserted = db.execute(
+        insert(User).returning(User.id, sort_by_parameter_order=True),
+        [
+            {
+                "email": data.email,
+                "full_name": data.full_name,
+                "hashed_password": hashed,
+                "is_active": data.is_active,
+                "created_by": created_by,
+            }
+            for (_, data), hashed in zip(valid, hashes)
+        ],
+    ).scalars().all()
+
+    links = [
+        {"user_id": user_id, "role_id": role_id}
+        for user_id, (_, data) in zip(inserted, valid)
+        for role_id in dict.fromkeys(data.role_ids or [])
+    ]
+    if links:
+        db.execute(insert(user_roles), links)
+    # Inserts em Core não passam pelo after_flush (feed de mudanças, permissões efetivas)
+    changes = {("user", str(user_id)): False for user_id in inserted}
+    changes.update({("user_role", f"{l['user_id']}:{l['role_id']}"): False for l in links})
+    if changes:
+        change_feed_service.record(db, changes)
+    if links:
+        effective_permission_service.refresh_users(db, inserted)
+    return list(inserted)
@@ -0,0 +1,156 @@
+"""
+Benchmark de audit_logs com action/result/resource_type em texto vs. códigos SMALLINT.
+
+Monta duas cópias da tabela num SQLite temporário (layout antigo, com VARCHAR repetido
+em toda linha, e layout novo, com códigos que referenciam tabelas de lookup), com os
+mesmos dados e índices, e compara bytes por linha e o tempo das consultas de
+list_audit_logs (contagem + primeira página).
+
+Uso (a partir de backend/):
+    python scripts/bench_audit_codes.py [--rows 200000] [--repeat 5]
+"""
+import argparse
+import os
+import random
+import sqlite3
+import tempfile
+import time
+
+ACTIONS = [
+    "login.success", "login.failure", "logout", "logout.all", "token.refresh",
+    "user.create", "user.update", "user.delete", "user.bulk_create", "role.create",
+    "role.update", "role.delete", "permission.create", "session.revoke",
+    "session.revoke.bulk", "account.locked", "account.unlocked", "password.change",
+]
+RESULTS = ["success", "failure"]
+RESOURCE_TYPES = [None, "user", "role", "permission", "session"]
+
+LEGACY_SCHEMA = """
+CREATE TABLE audit_logs (
+    id INTEGER PRIMARY KEY, user_id INTEGER, action VARCHAR(50) NOT NULL,
+    resource_type VARCHAR(50), result VARCHAR(20) NOT NULL, created_at TEXT NOT NULL
+);
+CREATE INDEX ix_action ON audit_logs (action);
+CREATE INDEX ix_result_created ON audit_logs (result, created_at DESC);
+CREATE INDEX ix_resource_type_created ON audit_logs (resource_type, created_at DESC);
+CREATE INDEX ix_created ON audit_logs (created_at);
+"""
+
+CODED_SCHEMA = """
+CREATE TABLE audit_actions (id INTEGER PRIMARY KEY, name VARCHAR(50) UNIQUE NOT NULL);
+CREATE TABLE audit_results (id INTEGER PRIMARY KEY, name VARCHAR(20) UNIQUE NOT NULL);
+CREATE TABLE audit_resource_types (id INTEGER PRIMARY KEY, name VARCHAR(50) UNIQUE NOT NULL);
+CREATE TABLE audit_logs (
+    id INTEGER PRIMARY KEY, user_id INTEGER, action_id SMALLINT NOT NULL,
+    resource_type_id SMALLINT, result_id SMALLINT NOT NULL, created_at TEXT NOT NULL
+);
+CREATE INDEX ix_action_created ON audit_logs (action_id, created_at DESC);
+CREATE INDEX ix_result_created ON audit_logs (result_id, created_at DESC);
+CREATE INDEX ix_resource_type_created ON audit_logs (resource_type_id, created_at DESC);
+CREATE INDEX ix_created ON audit_logs (created_at);
+"""
+
+
+def _rows(count: int):
+    rng = random.Random(42)
+    for i in range(count):
+        yield (
+            i + 1,
+            rng.randint(1, 500),
+            rng.choice(ACTIONS),
+            rng.choice(RESOURCE_TYPES),
+            rng.choice(RESULTS),
+            f"2026-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}T{i % 86400:05d}",
+        )
+
+
+def _table_bytes(conn: sqlite3.Connection) -> int:
+    conn.execute("VACUUM")
+    page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+    return conn.execute("PRAGMA page_count").fetchone()[0] * page_size
+
+
+def build_legacy(path: str, count: int) -> sqlite3.Connection:
+    conn = sqlite3.connect(path)
+    conn.executescript(LEGACY_SCHEMA)
+    conn.executemany("INSERT INTO audit_logs VALUES (?, ?, ?, ?, ?, ?)", _rows(count))
+    conn.commit()
+    return conn
+
+
+def build_coded(path: str, count: int) -> sqlite3.Connection:
+    conn = sqlite3.connect(path)
+    conn.executescript(CODED_SCHEMA)
+    codes = {}
+    for table, values in (
+        ("audit_actions", ACTIONS),
+        ("audit_results", RESULTS),
+        ("audit_resource_types", [v for v in RESOURCE_TYPES if v]),
+    ):
+        conn.executemany(f"INSERT INTO {table} (name) VALUES (?)", [(v,) for v in values])
+        codes[table] = dict(conn.execute(f"SELECT name, id FROM {table}").fetchall())
+    conn.executemany(
+        "INSERT INTO audit_logs VALUES (?, ?, ?, ?, ?, ?)",
+        (
+            (
+                row_id,
+                user_id,
+                codes["audit_actions"][action],
+                codes["audit_resource_types"].get(resource_type),
+                codes["audit_results"][result],
+                created_at,
+            )
+            for row_id, user_id, action, resource_type, result, created_at in _rows(count)
+        ),
+    )
+    conn.commit()
+    return conn
+
+
+def _time_ms(conn: sqlite3.Connection, where: str, params: tuple, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        conn.execute(f"SELECT count(*) FROM audit_logs WHERE {where}", params).fetchone()
+        conn.execute(
+            f"SELECT * FROM audit_logs WHERE {where} ORDER BY created_at DESC LIMIT 50", params
+        ).fetchall()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        legacy = build_legacy(os.path.join(tmp, "legacy.db"), args.rows)
+        coded = build_coded(os.path.join(tmp, "coded.db"), args.rows)
+
+        legacy_bytes = _table_bytes(legacy) / args.rows
+        coded_bytes = _table_bytes(coded) / args.rows
+        print(f"linhas: {args.rows}")
+        print(f"bytes/linha (tabela + índices): texto {legacy_bytes:7.1f} | códigos {coded_bytes:7.1f}")
+
+        # O filtro por trecho de action é resolvido para um conjunto de códigos antes da consulta
+        login_ids = tuple(
+            row[0] for row in coded.execute("SELECT id FROM audit_actions WHERE name LIKE '%login%'")
+        )
+        placeholders = ", ".join("?" * len(login_ids))
+        failure_id = coded.execute("SELECT id FROM audit_results WHERE name = 'failure'").fetchone()[0]
+        cases = [
+            ("action contém 'login'", ("action LIKE ?", ("%login%",)), (f"action_id IN ({placeholders})", login_ids)),
+            ("result = 'failure'", ("result = ?", ("failure",)), ("result_id = ?", (failure_id,))),
+        ]
+        for label, (old_where, old_params), (new_where, new_params) in cases:
+            old_ms = _time_ms(legacy, old_where, old_params, args.repeat)
+            new_ms = _time_ms(coded, new_where, new_params, args.repeat)
+            print(f"{label:24s}: texto {old_ms:8.2f} ms | códigos {new_ms:8.2f} ms")
+        legacy.close()
+        coded.close()
+
+
+if __name__ == "__main__":
+    main()
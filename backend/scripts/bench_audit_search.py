@@ -0,0 +1,110 @@
+"""
+Benchmark do filtro por email de audit_logs: ILIKE com curinga inicial vs. busca indexada.
+
+Monta num SQLite temporário uma tabela audit_logs com --rows linhas (padrão 10M) e os
+mesmos índices da aplicação (lower(user_email) e a tabela FTS5 trigram), e mede a
+contagem + primeira página de list_audit_logs em cada modo (exact, prefix, contains)
+contra a forma antiga `lower(user_email) LIKE '%...%'`, que varre a tabela inteira.
+No Postgres os modos prefix/contains usam o índice GIN pg_trgm da migração a7d3e9f1c5b2.
+
+Uso (a partir de backend/):
+    python scripts/bench_audit_search.py [--rows 10000000] [--repeat 3]
+"""
+import argparse
+import os
+import random
+import sqlite3
+import tempfile
+import time
+
+DOMAINS = ["empresa.com", "gmail.com", "outlook.com", "parceiro.com.br", "gov.br"]
+NAMES = ["ana", "bruno", "carla", "diego", "elisa", "fabio", "gabriela", "heitor", "iara", "joao"]
+
+SCHEMA = """
+CREATE TABLE audit_logs (
+    id INTEGER PRIMARY KEY, user_email VARCHAR(255), action_id SMALLINT NOT NULL,
+    created_at TEXT NOT NULL
+);
+CREATE INDEX ix_audit_logs_created_at ON audit_logs (created_at);
+"""
+INDEXES = """
+CREATE INDEX ix_audit_logs_user_email_lower ON audit_logs (lower(user_email));
+CREATE VIRTUAL TABLE audit_logs_email_fts USING fts5(
+    user_email, content='audit_logs', content_rowid='id', tokenize='trigram'
+);
+INSERT INTO audit_logs_email_fts(audit_logs_email_fts) VALUES ('rebuild');
+"""
+
+
+def _emails(users: int) -> list[str]:
+    rng = random.Random(7)
+    return [
+        f"{rng.choice(NAMES)}.{rng.choice(NAMES)}{i}@{rng.choice(DOMAINS)}" for i in range(users)
+    ]
+
+
+def _rows(count: int, emails: list[str]):
+    rng = random.Random(42)
+    for i in range(count):
+        yield (i + 1, rng.choice(emails), rng.randint(1, 18), f"2026-01-01T{i:010d}")
+
+
+def build(path: str, rows: int, users: int) -> tuple[sqlite3.Connection, list[str]]:
+    conn = sqlite3.connect(path)
+    conn.executescript(SCHEMA)
+    emails = _emails(users)
+    started = time.perf_counter()
+    conn.executemany("INSERT INTO audit_logs VALUES (?, ?, ?, ?)", _rows(rows, emails))
+    conn.commit()
+    print(f"carga: {rows} linhas em {time.perf_counter() - started:.1f}s")
+    started = time.perf_counter()
+    conn.executescript(INDEXES)
+    print(f"índices (lower + FTS5 trigram): {time.perf_counter() - started:.1f}s")
+    return conn, emails
+
+
+def _time_ms(conn: sqlite3.Connection, where: str, params: tuple, repeat: int) -> tuple[float, int]:
+    best, total = float("inf"), 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        total = conn.execute(f"SELECT count(*) FROM audit_logs WHERE {where}", params).fetchone()[0]
+        conn.execute(
+            f"SELECT * FROM audit_logs WHERE {where} ORDER BY created_at DESC LIMIT 50", params
+        ).fetchall()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000, total
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=10_000_000)
+    parser.add_argument("--users", type=int, default=50_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        conn, emails = build(os.path.join(tmp, "audit.db"), args.rows, args.users)
+        target = emails[len(emails) // 2]
+        local_part = target.split("@")[0]
+        fragment = local_part[-6:]
+        fts = "id IN (SELECT rowid FROM audit_logs_email_fts WHERE user_email MATCH ?)"
+        cases = [
+            ("exact", target, "lower(user_email) = ?", (target,)),
+            ("prefix", local_part, "lower(user_email) >= ? AND lower(user_email) < ?",
+             (local_part, local_part + "\U0010ffff")),
+            ("contains", fragment, fts, (f'"{fragment}"',)),
+        ]
+        for mode, value, where, params in cases:
+            scan_ms, scan_total = _time_ms(
+                conn, "lower(user_email) LIKE ?", (f"%{value}%",), args.repeat
+            )
+            indexed_ms, indexed_total = _time_ms(conn, where, params, args.repeat)
+            print(
+                f"{mode:8s} {value!r:32s}: ILIKE '%...%' {scan_ms:10.2f} ms ({scan_total} linhas)"
+                f" | indexado {indexed_ms:9.2f} ms ({indexed_total} linhas)"
+            )
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+"""
+Benchmark de serialização das listagens (bytes/s).
+
+Compara o caminho padrão do FastAPI (modelo Pydantic -> validação do response_model
+-> jsonable_encoder -> json.dumps) com o caminho rápido (dict direto -> orjson).
+
+Uso (a partir de backend/):
+    python scripts/bench_json_responses.py [--rows 200] [--iterations 200]
+"""
+import argparse
+import json
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from types import SimpleNamespace
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import orjson  # noqa: E402
+from fastapi.encoders import jsonable_encoder  # noqa: E402
+from pydantic import TypeAdapter  # noqa: E402
+
+from app.schemas.audit import AuditLogListResponse, AuditLogOut, audit_log_payload  # noqa: E402
+from app.schemas.user import UserOut, user_payload  # noqa: E402
+
+
+def _fake_audit_logs(n: int) -> list[SimpleNamespace]:
+    now = datetime.now(timezone.utc)
+    return [
+        SimpleNamespace(
+            id=i,
+            user_id=i % 50,
+            user_email=f"user{i % 50}@empresa.com",
+            action="login.failure" if i % 3 else "user.update",
+            resource_type="user",
+            resource_id=str(i),
+            result="failure" if i % 3 else "success",
+            ip_address="203.0.113.10",
+            user_agent="Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 Chrome/126.0",
+            changes={"before": {"is_active": True}, "after": {"is_active": False}},
+            detail="invalid_password",
+            created_at=now - timedelta(seconds=i),
+            occurrence_count=1,
+            last_occurred_at=None,
+        )
+        for i in range(n)
+    ]
+
+
+def _fake_users(n: int) -> list[SimpleNamespace]:
+    perms = [SimpleNamespace(name=f"perm{i}:read") for i in range(15)]
+    roles = [SimpleNamespace(name=f"role{i}", permissions=perms[i::3]) for i in range(3)]
+    return [
+        SimpleNamespace(
+            id=i,
+            email=f"user{i}@empresa.com",
+            full_name=f"Usuário {i}",
+            is_active=True,
+            roles=roles,
+        )
+        for i in range(n)
+    ]
+
+
+def _default_audit(logs) -> bytes:
+    model = AuditLogListResponse(
+        items=[AuditLogOut.model_validate(x, from_attributes=True) for x in logs],
+        total=len(logs),
+        skip=0,
+        limit=len(logs),
+    )
+    validated = TypeAdapter(AuditLogListResponse).validate_python(model, from_attributes=True)
+    return json.dumps(jsonable_encoder(validated), ensure_ascii=False, separators=(",", ":")).encode()
+
+
+def _fast_audit(logs) -> bytes:
+    return orjson.dumps(
+        {"items": [audit_log_payload(x) for x in logs], "total": len(logs), "skip": 0, "limit": len(logs)}
+    )
+
+
+def _default_users(users) -> bytes:
+    items = [
+        UserOut(
+            id=u.id,
+            email=u.email,
+            full_name=u.full_name,
+            is_active=u.is_active,
+            roles=sorted({r.name for r in u.roles}),
+            permissions=sorted({p.name for r in u.roles for p in r.permissions}),
+        )
+        for u in users
+    ]
+    validated = TypeAdapter(list[UserOut]).validate_python(items, from_attributes=True)
+    return json.dumps(jsonable_encoder(validated), ensure_ascii=False, separators=(",", ":")).encode()
+
+
+def _permissions_by_user(users) -> dict[int, list[str]]:
+    """Equivalente ao resultado de effective_permission_service.permissions_by_user (uma consulta na API)."""
+    return {u.id: sorted({p.name for r in u.roles for p in r.permissions}) for u in users}
+
+
+def _fast_users(users, permissions: dict[int, list[str]]) -> bytes:
+    return orjson.dumps([user_payload(u, permissions[u.id]) for u in users])
+
+
+def _measure(fn, data, iterations: int) -> tuple[float, int]:
+    fn(data)  # aquecimento
+    total_bytes = 0
+    start = time.perf_counter()
+    for _ in range(iterations):
+        total_bytes += len(fn(data))
+    elapsed = time.perf_counter() - start
+    return total_bytes / elapsed, total_bytes // iterations
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=200)
+    parser.add_argument("--iterations", type=int, default=200)
+    args = parser.parse_args()
+
+    users = _fake_users(args.rows)
+    permissions = _permissions_by_user(users)
+    cases = [
+        ("audit-logs", _fake_audit_logs(args.rows), _default_audit, _fast_audit),
+        ("users", users, _default_users, lambda data: _fast_users(data, permissions)),
+    ]
+    print(f"{'endpoint':<12} {'caminho':<8} {'bytes/resp':>11} {'MB/s':>9}")
+    for name, data, default_fn, fast_fn in cases:
+        before, size = _measure(default_fn, data, args.iterations)
+        after, _ = _measure(fast_fn, data, args.iterations)
+        print(f"{name:<12} {'antes':<8} {size:>11} {before / 1e6:>9.1f}")
+        print(f"{name:<12} {'depois':<8} {size:>11} {after / 1e6:>9.1f}  ({after / before:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
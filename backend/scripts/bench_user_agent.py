@@ -0,0 +1,61 @@
+"""
+Microbenchmark da classificação de User-Agent usada no login/refresh.
+
+Mede o custo por chamada sem cache (parsing com regex), com cache (LRU quente) e
+compara com o custo de verify_password (bcrypt), que domina o tempo do login.
+
+Uso (a partir de backend/):
+    python scripts/bench_user_agent.py [--iterations 20000]
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import bcrypt  # noqa: E402
+
+from app.services.user_agent_service import parse_user_agent  # noqa: E402
+
+USER_AGENTS = [
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/126.0.0.0 Safari/537.36",
+    "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/17.5 Safari/605.1.15",
+    "Mozilla/5.0 (iPhone; CPU iPhone OS 17_5 like Mac OS X) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/17.5 Mobile/15E148 Safari/604.1",
+    "Mozilla/5.0 (Linux; Android 14; SM-S918B) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/126.0.0.0 Mobile Safari/537.36",
+    "Mozilla/5.0 (X11; Linux x86_64; rv:127.0) Gecko/20100101 Firefox/127.0",
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/126.0.0.0 Safari/537.36 Edg/126.0.0.0",
+    "curl/8.5.0",
+]
+
+
+def _per_call_us(fn, iterations: int) -> float:
+    start = time.perf_counter()
+    for i in range(iterations):
+        fn(USER_AGENTS[i % len(USER_AGENTS)])
+    return (time.perf_counter() - start) / iterations * 1e6
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--iterations", type=int, default=20000)
+    args = parser.parse_args()
+
+    uncached = _per_call_us(parse_user_agent.__wrapped__, args.iterations)
+    parse_user_agent.cache_clear()
+    cached = _per_call_us(parse_user_agent, args.iterations)
+
+    hashed = bcrypt.hashpw(b"Senha@2025!", bcrypt.gensalt())
+    start = time.perf_counter()
+    bcrypt.checkpw(b"Senha@2025!", hashed)
+    login_us = (time.perf_counter() - start) * 1e6
+
+    print(f"parse sem cache : {uncached:9.2f} µs/chamada")
+    print(f"parse com cache : {cached:9.2f} µs/chamada")
+    print(f"verify_password : {login_us:9.0f} µs (referência do login)")
+    print(f"overhead no login com cache: {cached / login_us * 100:.4f}%")
+    print(parse_user_agent.cache_info())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,37 @@
+"""
+Verifica user_effective_permissions contra user_roles × role_permissions.
+
+Mostra quantos pares (usuário, permissão) faltam ou sobram na tabela materializada; com
+--repair reconstrói a tabela quando há divergência. Sai com código 1 se encontrou
+divergência sem --repair (uso em monitoramento).
+
+Uso (a partir de backend/):
+    python scripts/check_effective_permissions.py [--repair]
+"""
+import argparse
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.db.session import SessionLocal  # noqa: E402
+from app.services import effective_permission_service  # noqa: E402
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--repair", action="store_true")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        missing, extra = effective_permission_service.check_consistency(db, repair=args.repair)
+    finally:
+        db.close()
+    print(f"effective_permissions: {missing} faltando, {extra} sobrando")
+    if (missing or extra) and not args.repair:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+"""
+Relay da outbox como processo dedicado (alternativa ao job dentro da API).
+
+Entrega os eventos pendentes de outbox_events ao sink de OUTBOX_SINK (webhook, file ou
+redis) em laço; com --once processa o acumulado e sai.
+
+Uso (a partir de backend/):
+    OUTBOX_SINK=webhook OUTBOX_WEBHOOK_URL=https://siem.exemplo/hook python scripts/outbox_relay.py [--once]
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.core.config import settings  # noqa: E402
+from app.db.session import SessionLocal  # noqa: E402
+from app.services import outbox_service  # noqa: E402
+from app.services.outbox_sinks import get_sink  # noqa: E402
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--once", action="store_true")
+    args = parser.parse_args()
+
+    sink = get_sink()
+    if sink is None:
+        sys.exit("OUTBOX_SINK não configurado")
+
+    db = SessionLocal()
+    try:
+        while True:
+            delivered = outbox_service.relay(db, sink)
+            if delivered:
+                print(f"outbox: {delivered} eventos entregues")
+                continue
+            if args.once:
+                break
+            time.sleep(settings.outbox_relay_interval_seconds)
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,40 @@
+"""
+Recalcula os rollups de audit_logs (GET /audit-logs/stats).
+
+Sem --since apaga e reagrega tudo até a marca d'água do job; com --since só os dias a
+partir da data (UTC). Com --catch-up roda antes o job incremental até alcançar os
+eventos atuais (backfill inicial sem esperar o agendador).
+
+Uso (a partir de backend/):
+    python scripts/rebuild_audit_rollups.py [--since 2026-10-01] [--catch-up]
+"""
+import argparse
+import sys
+from datetime import date
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.db.session import SessionLocal  # noqa: E402
+from app.services import audit_rollup_service  # noqa: E402
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--since", type=date.fromisoformat, default=None)
+    parser.add_argument("--catch-up", action="store_true")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        if args.catch_up:
+            added = audit_rollup_service.refresh_rollups(db)
+            print(f"incremental: {added} eventos agregados")
+        rebuilt = audit_rollup_service.rebuild_rollups(db, since=args.since)
+        print(f"rebuild: {rebuilt} eventos reagregados")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
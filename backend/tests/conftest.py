@@ -10,35 +10,58 @@ os.environ.setdefault("ADMIN_EMAIL", "admin@test.com")
 os.environ.setdefault("ADMIN_PASSWORD", "Admin@2025!")
 os.environ.setdefault("CORS_ORIGINS", "http://test")
 
-from app.core.config import get_settings
+from app.core.config import get_settings, settings
 
 get_settings.cache_clear()
 
-import pytest
+from contextlib import ExitStack  # noqa: E402
+
+import fakeredis  # noqa: E402
+import pytest  # noqa: E402
 import app.main  # noqa: E402
 from app.db.base import Base  # noqa: E402
 from app.db.session import get_db  # noqa: E402
 from app.core.security import hash_password  # noqa: E402
 from app.models import Permission, Role, User  # noqa: E402
+from app.services import (  # noqa: E402
+    audit_aggregation_service,
+    dimension_service,
+    last_seen_service,
+    response_cache_service,
+)
 from fastapi.testclient import TestClient  # noqa: E402
 from sqlalchemy import create_engine, select  # noqa: E402
+from sqlalchemy.dialects import postgresql  # noqa: E402
 from sqlalchemy.orm import sessionmaker  # noqa: E402
 from sqlalchemy.pool import StaticPool  # noqa: E402
-from unittest.mock import MagicMock, patch, AsyncMock  # noqa: E402
-
-# Mock Redis para testes (evita conexao real)
-_redis_mock = MagicMock()
-_redis_mock.ping.return_value = True
-_redis_mock.setex = MagicMock()
-_redis_mock.exists.return_value = 0
+from types import SimpleNamespace  # noqa: E402
+from unittest.mock import patch  # noqa: E402
+
+# Redis em memoria para testes (evita conexao real); limpo a cada teste
+_redis_mock = fakeredis.FakeRedis(decode_responses=True)
+
+# Modulos que importam get_redis diretamente
+_REDIS_CONSUMERS = (
+    "app.core.redis.get_redis",
+    "app.services.audit_stream_service.get_redis",
+    "app.services.outbox_sinks.get_redis",
+    "app.services.jwt_blacklist_service.get_redis",
+    "app.services.response_cache_service.get_redis",
+    "app.services.session_store.get_redis",
+)
 
 
 @pytest.fixture(autouse=True)
 def mock_redis():
     """Mock Redis em todos os testes."""
-    with patch("app.core.redis.get_redis", return_value=_redis_mock), patch(
-        "app.services.jwt_blacklist_service.get_redis", return_value=_redis_mock
-    ):
+    _redis_mock.flushall()
+    response_cache_service.clear()
+    last_seen_service.clear()
+    dimension_service.clear_caches()
+    audit_aggregation_service.clear()
+    with ExitStack() as stack:
+        for target in _REDIS_CONSUMERS:
+            stack.enter_context(patch(target, return_value=_redis_mock))
         yield _redis_mock
 
 
@@ -125,6 +148,19 @@ def client(db):
     app.main.app.dependency_overrides.clear()
 
 
+@pytest.fixture
+def postgres_db():
+    """Sessão falsa com dialeto Postgres, para compilar os ramos específicos (JSONB, timezone)."""
+    bind = SimpleNamespace(dialect=postgresql.dialect())
+    return SimpleNamespace(get_bind=lambda: bind)
+
+
+@pytest.fixture
+def outbox_enabled(monkeypatch):
+    """Outbox ligada: sem OUTBOX_SINK, record() não grava nada."""
+    monkeypatch.setattr(settings, "outbox_sink", "file")
+
+
 @pytest.fixture
 def admin_token(client):
     """Obtem access_token do admin via login."""
@@ -0,0 +1,62 @@
+"""Testes para a agregação de actions ruidosas em audit_logs."""
+from sqlalchemy import delete, select
+
+from app.core.config import settings
+from app.models import AuditLog
+from app.services import audit_aggregation_service, audit_service
+
+
+def _failures(db):
+    return db.scalars(select(AuditLog).order_by(AuditLog.id)).all()
+
+
+def _failure(db, detail="invalid_password", ip="203.0.113.7"):
+    entry = audit_service.log_event(
+        db, action="login.failure", result="failure", user_email="ana@empresa.com", detail=detail, ip_address=ip
+    )
+    db.commit()
+    return entry
+
+
+def test_repeats_collapse_into_first_row(db, monkeypatch):
+    db.execute(delete(AuditLog))
+    first = _failure(db)
+    assert first is not None
+    for _ in range(4):
+        assert _failure(db) is None
+    # Outra chave (detalhe relevante, outro IP) é gravada na hora
+    assert _failure(db, detail="invalid_password — account_locked") is not None
+    assert _failure(db, ip="198.51.100.1") is not None
+    assert len(_failures(db)) == 3
+
+    assert audit_aggregation_service.flush(db) == 0  # janela ainda aberta
+    monkeypatch.setattr(settings, "audit_aggregate_window_seconds", 0)
+    assert audit_aggregation_service.flush(db) == 1
+    db.refresh(first)
+    assert first.occurrence_count == 5
+    assert first.last_occurred_at is not None
+
+    # Janela fechada: a próxima ocorrência volta a gerar linha
+    assert _failure(db) is not None
+
+
+def test_rollback_does_not_open_window(db):
+    audit_service.log_event(db, action="login.failure", result="failure", user_email="x@y.com")
+    db.rollback()
+    assert _failure(db) is not None
+
+
+def test_other_actions_are_not_aggregated(db, monkeypatch):
+    monkeypatch.setattr(settings, "audit_aggregate_actions", "")
+    assert _failure(db) is not None
+    assert _failure(db) is not None
+
+
+def test_login_attack_writes_one_row(client, db):
+    db.execute(delete(AuditLog))
+    db.commit()
+    for _ in range(5):
+        resp = client.post("/api/v1/auth/login", json={"email": "ninguem@empresa.com", "password": "x" * 8})
+        assert resp.status_code == 401
+    rows = _failures(db)
+    assert [(r.action, r.detail) for r in rows] == [("login.failure", "user_not_found")]
@@ -0,0 +1,115 @@
+"""Testes para a camada fria de audit_logs (arquivos diários + consulta através da purga)."""
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import delete, func, select
+
+from app.core.config import settings
+from app.models import AuditLog
+from app.services import audit_archive_service, audit_service
+
+NOW = datetime.now(timezone.utc)
+NOON = NOW.replace(hour=12, minute=0, second=0, microsecond=0)
+
+
+@pytest.fixture
+def archive_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "audit_archive_dir", str(tmp_path))
+    return tmp_path
+
+
+def _event(db, days_ago, action="login.success", user_id=None, ip="10.0.0.1", minute=0):
+    entry = audit_service.log_event(db, action=action, user_id=user_id, ip_address=ip, user_agent="pytest")
+    entry.created_at = NOON - timedelta(days=days_ago) + timedelta(minutes=minute)
+    db.flush()
+
+
+def _seed(db):
+    db.execute(delete(AuditLog))  # evento do login do admin fora das contagens
+    _event(db, 1, user_id=1)
+    _event(db, 100, user_id=1)
+    _event(db, 100, action="login.failure", ip="192.168.0.9", minute=5)
+    _event(db, 200, action="user.update", user_id=2)
+    db.commit()
+
+
+def test_purge_archives_before_deleting(db, archive_dir):
+    _seed(db)
+    assert audit_service.purge_old_audit_logs(db) == 3
+    assert db.scalar(select(func.count()).select_from(AuditLog)) == 1
+
+    files = sorted(archive_dir.glob("*/*/audit-*.ndjson.gz"))
+    assert len(files) == 2
+    footer, _ = audit_archive_service.read_footer(files[-1])
+    assert footer["count"] == 2
+    assert footer["actions"] == ["login.failure", "login.success"]
+    assert footer["user_ids"] == [1]
+
+    # Reescrever um dia já arquivado junta com o que já estava no arquivo
+    _event(db, 100, action="user.delete", minute=10)
+    db.commit()
+    audit_service.purge_old_audit_logs(db)
+    footer, _ = audit_archive_service.read_footer(files[-1])
+    assert footer["count"] == 3
+
+    # Arquivos vencidos saem junto
+    later = NOW + timedelta(days=settings.audit_archive_retention_days - 150)
+    assert audit_archive_service.prune_archive(now=later) == 1
+
+
+def test_list_and_export_query_through_archive(client, auth_headers, db, archive_dir):
+    _seed(db)
+    audit_service.purge_old_audit_logs(db)
+    url = "/api/v1/audit-logs/"
+    since = (NOW - timedelta(days=365)).isoformat()
+
+    def listing(**params):
+        resp = client.get(url, params={"date_from": since, **params}, headers=auth_headers)
+        assert resp.status_code == 200, resp.text
+        return resp.json()
+
+    everything = listing()
+    assert everything["total"] == 4  # 3 arquivados + 1 quente
+    assert {i["action"] for i in everything["items"]} == {"login.success", "login.failure", "user.update"}
+
+    page = listing(skip=1, limit=2)
+    assert [i["id"] for i in page["items"]] == [i["id"] for i in everything["items"][1:3]]
+    assert listing(user_id=2)["total"] == 1
+    assert listing(action="login", action_match="prefix", cidr="192.168.0.0/16")["total"] == 1
+
+    # Sem date_from antes da janela quente a camada fria não é lida
+    assert client.get(url, headers=auth_headers).json()["total"] == 1
+
+    csv_text = client.get(
+        "/api/v1/audit-logs/export", params={"date_from": since, "action": "user.update"}, headers=auth_headers
+    ).text
+    assert "user.update" in csv_text and len(csv_text.strip().splitlines()) == 2
+
+
+def test_query_through_decompresses_only_page_days(db, archive_dir, monkeypatch):
+    _seed(db)
+    audit_service.purge_old_audit_logs(db)
+    opened = []
+    original = audit_archive_service._iter_records
+
+    def tracking(path, body_size):
+        opened.append(path.name)
+        return original(path, body_size)
+
+    monkeypatch.setattr(audit_archive_service, "_iter_records", tracking)
+    since = NOW - timedelta(days=365)
+
+    # Sem filtro por linha o total vem dos rodapés: só o dia da página é lido
+    items, total = audit_archive_service.query_archive(date_from=since, limit=1)
+    assert total == 3 and len(items) == 1
+    assert opened == [f"audit-{(NOON - timedelta(days=100)).date()}.ndjson.gz"]
+
+    # Com filtro a contagem por dia fica em cache: a segunda página não reconta tudo
+    opened.clear()
+    first, total = audit_archive_service.query_archive(date_from=since, limit=1, cidr="10.0.0.0/8")
+    calls = len(opened)
+    opened.clear()
+    second, again = audit_archive_service.query_archive(date_from=since, skip=1, limit=1, cidr="10.0.0.0/8")
+    assert total == again == 2
+    assert [first[0].action, second[0].action] == ["login.success", "user.update"]
+    assert len(opened) < calls
@@ -0,0 +1,130 @@
+"""Testes para os jobs de export de audit_logs (POST/GET /audit-logs/exports)."""
+import csv
+import gzip
+import io
+import time
+
+import pytest
+from sqlalchemy import update
+
+from app.core.config import settings
+from app.models import AuditExportJob
+from app.services import audit_export_service, audit_service
+
+URL = "/api/v1/audit-logs/exports"
+
+
+@pytest.fixture(autouse=True)
+def export_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "audit_export_dir", str(tmp_path))
+    monkeypatch.setattr(settings, "audit_export_chunk_size", 2)
+
+
+def _seed(db, n=5):
+    for i in range(n):
+        audit_service.log_event(db, action="user.update", resource_type="user", resource_id=i)
+    db.commit()
+
+
+def test_export_job_lifecycle(client, auth_headers, db):
+    _seed(db)
+    resp = client.post(URL, json={"action": "user.update", "action_match": "exact"}, headers=auth_headers)
+    assert resp.status_code == 202
+    job = resp.json()
+    assert job["status"] == "queued" and job["download_url"] is None
+
+    # Pedido idêntico enquanto o job está na fila devolve o mesmo job
+    again = client.post(URL, json={"action_match": "exact", "action": "user.update"}, headers=auth_headers)
+    assert again.status_code == 200 and again.json()["id"] == job["id"]
+
+    assert audit_export_service.run_next(db) == job["id"]
+    status = client.get(f"{URL}/{job['id']}", headers=auth_headers).json()
+    assert status["status"] == "done"
+    assert status["rows_written"] == status["rows_estimated"] == 5
+
+    download = client.get(status["download_url"], headers=auth_headers)
+    assert download.status_code == 200
+    rows = list(csv.reader(io.StringIO(gzip.decompress(download.content).decode())))
+    assert rows[0] == audit_export_service.CSV_HEADER
+    assert [r[6] for r in rows[1:]] == ["0", "1", "2", "3", "4"]
+
+    # Concluído, o mesmo pedido gera um job novo
+    assert client.post(URL, json={"action": "user.update", "action_match": "exact"}, headers=auth_headers).status_code == 202
+
+
+def test_concurrency_limit_and_stale_jobs(db, monkeypatch):
+    monkeypatch.setattr(settings, "audit_export_max_concurrent", 1)
+    first, _ = audit_export_service.request_export(db, {"action": "a"}, user_id=None)
+    second, _ = audit_export_service.request_export(db, {"action": "b"}, user_id=None)
+    first.status = "running"
+    first.heartbeat_at = audit_export_service._now()
+    db.commit()
+
+    assert audit_export_service.run_next(db) is None
+    assert db.get(AuditExportJob, second.id).status == "queued"
+
+    # Worker que parou de dar heartbeat libera a vaga e o job volta para a fila
+    monkeypatch.setattr(settings, "audit_export_stale_seconds", -1)
+    assert audit_export_service.run_next(db) == first.id
+
+
+def test_invalid_filters_and_unknown_job(client, auth_headers):
+    assert client.post(URL, json={"cidr": "x"}, headers=auth_headers).status_code == 422
+    assert client.post(URL, json={"changes_contains": "after"}, headers=auth_headers).status_code == 400
+    assert client.get(f"{URL}/nao-existe", headers=auth_headers).status_code == 404
+
+
+def test_lost_claim_stops_without_writing(db, tmp_path, monkeypatch):
+    _seed(db)
+    job, _ = audit_export_service.request_export(db, {"action": "user.update"}, user_id=None)
+    original = audit_export_service._hot_rows
+
+    def requeued_midway(session, conditions):
+        for i, row in enumerate(original(session, conditions)):
+            if i == 2:
+                # Requeue por falta de heartbeat e novo claim por outro worker
+                session.execute(update(AuditExportJob).values(attempt="outra-tentativa"))
+                session.commit()
+            yield row
+
+    monkeypatch.setattr(audit_export_service, "_hot_rows", requeued_midway)
+    assert audit_export_service.run_next(db) == job.id
+    db.expire_all()
+    job = db.get(AuditExportJob, job.id)
+    assert (job.status, job.attempt, job.file_size) == ("running", "outra-tentativa", None)
+    assert job.rows_written == 2  # só o primeiro lote, antes de perder o job
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_failed_job_removes_temp_file(db, tmp_path, monkeypatch):
+    _seed(db)
+    job, _ = audit_export_service.request_export(db, {"action": "user.update"}, user_id=None)
+
+    def broken(session, conditions):
+        yield ["parcial"]
+        raise RuntimeError("banco indisponível")
+
+    monkeypatch.setattr(audit_export_service, "_hot_rows", broken)
+    audit_export_service.run_next(db)
+    db.expire_all()
+    assert db.get(AuditExportJob, job.id).status == "failed"
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_heartbeat_is_time_based_and_detects_lost_claim(db, monkeypatch):
+    monkeypatch.setattr(settings, "audit_export_heartbeat_seconds", 0.02)
+    job, _ = audit_export_service.request_export(db, {"action": "x"}, user_id=None)
+    job = audit_export_service._claim(db)
+    started = job.heartbeat_at
+
+    owner = audit_export_service._Heartbeat(db.get_bind(), job.id, job.attempt)
+    owner.start()
+    time.sleep(0.1)
+    db.expire_all()
+    assert db.get(AuditExportJob, job.id).heartbeat_at > started
+    assert not owner.lost.is_set()
+
+    db.execute(update(AuditExportJob).values(attempt="outra-tentativa"))
+    db.commit()
+    assert owner.lost.wait(1)
+    owner.stop()
@@ -0,0 +1,107 @@
+"""Testes para os rollups de audit_logs e GET /audit-logs/stats."""
+from datetime import date, datetime, timezone
+
+from sqlalchemy import delete, func, select
+
+from app.core.config import settings
+from app.models import AuditHourlyCount, AuditLog
+from app.services import audit_rollup_service, audit_service
+
+T0 = datetime(2026, 10, 18, 9, 15, tzinfo=timezone.utc)
+
+
+def _event(db, when, action="login.success", result="success", user_id=None):
+    entry = audit_service.log_event(db, action=action, result=result, user_id=user_id, user_agent="pytest")
+    entry.created_at = when
+    db.flush()
+
+
+def _seed(db):
+    _event(db, T0, user_id=1)
+    _event(db, T0.replace(minute=40), user_id=1)
+    _event(db, T0.replace(minute=50), action="login.failure", result="failure")
+    _event(db, T0.replace(hour=14), user_id=2)
+    _event(db, T0.replace(day=19, hour=8), action="user.update", user_id=1)
+    db.commit()
+
+
+def _hourly(db):
+    return db.scalar(select(func.sum(AuditHourlyCount.count)))
+
+
+def test_refresh_is_incremental_and_idempotent(db):
+    _seed(db)
+    assert audit_rollup_service.refresh_rollups(db, batch_size=2) == 5
+    assert audit_rollup_service.refresh_rollups(db) == 0
+    assert _hourly(db) == 5
+
+    _event(db, T0.replace(day=19, hour=9), user_id=2)
+    db.commit()
+    assert audit_rollup_service.refresh_rollups(db) == 1
+    assert _hourly(db) == 6
+
+    # Rebuild a partir de um dia reproduz as mesmas contagens
+    before = db.execute(select(AuditHourlyCount.bucket, AuditHourlyCount.count).order_by(AuditHourlyCount.bucket)).all()
+    assert audit_rollup_service.rebuild_rollups(db, since=date(2026, 10, 19)) == 2
+    assert audit_rollup_service.rebuild_rollups(db) == 6
+    after = db.execute(select(AuditHourlyCount.bucket, AuditHourlyCount.count).order_by(AuditHourlyCount.bucket)).all()
+    assert after == before
+
+
+def test_recent_events_wait_for_lag(db, monkeypatch):
+    monkeypatch.setattr(settings, "audit_rollup_lag_seconds", 3600)
+    _event(db, datetime.now(timezone.utc))
+    db.commit()
+    assert audit_rollup_service.refresh_rollups(db) == 0
+    monkeypatch.setattr(settings, "audit_rollup_lag_seconds", 0)
+    monkeypatch.setattr(settings, "audit_aggregate_window_seconds", 0)
+    monkeypatch.setattr(settings, "audit_aggregate_flush_seconds", 0)
+    assert audit_rollup_service.refresh_rollups(db) == 1
+
+
+def test_stats_endpoint(client, auth_headers, db):
+    db.execute(delete(AuditLog))  # evento do login do admin (hoje) fora das contagens
+    _seed(db)
+    audit_rollup_service.refresh_rollups(db)
+    url = "/api/v1/audit-logs/stats"
+    window = {"date_from": "2026-10-18T00:00:00Z", "date_to": "2026-10-19T23:59:59Z"}
+
+    hourly = client.get(url, params={**window, "action": "login"}, headers=auth_headers).json()
+    assert [(p["bucket"], p["action"], p["count"]) for p in hourly["points"]] == [
+        ("2026-10-18T09:00:00+00:00", "login.failure", 1),
+        ("2026-10-18T09:00:00+00:00", "login.success", 2),
+        ("2026-10-18T14:00:00+00:00", "login.success", 1),
+    ]
+    assert hourly["rolled_up_to"] is not None
+
+    daily = client.get(
+        url, params={**window, "interval": "day", "result": "success"}, headers=auth_headers
+    ).json()
+    assert [(p["bucket"], p["action"], p["count"]) for p in daily["points"]] == [
+        ("2026-10-18", "login.success", 3),
+        ("2026-10-19", "user.update", 1),
+    ]
+    # interval=day lê o rollup diário, não as horas
+    db.execute(delete(AuditHourlyCount))
+    db.commit()
+    assert client.get(
+        url, params={**window, "interval": "day", "result": "success"}, headers=auth_headers
+    ).json()["points"] == daily["points"]
+
+    users = client.get(url, params={**window, "by": "user", "interval": "day"}, headers=auth_headers).json()
+    assert [(p["bucket"], p["user_id"], p["count"]) for p in users["points"]] == [
+        ("2026-10-18", 1, 2),
+        ("2026-10-18", 2, 1),
+        ("2026-10-19", 1, 1),
+    ]
+
+    assert client.get(url, params={"by": "user"}, headers=auth_headers).status_code == 400
+    too_long = {"date_from": "2026-01-01T00:00:00Z", "date_to": "2026-10-19T00:00:00Z"}
+    assert client.get(url, params=too_long, headers=auth_headers).status_code == 400
+
+
+def test_hour_bucket_truncates_in_utc_on_postgres(postgres_db):
+    bucket = audit_rollup_service._hour_bucket(postgres_db)
+    sql = str(bucket.compile(dialect=postgres_db.get_bind().dialect))
+    assert sql.startswith("timezone(%(timezone_1)s, date_trunc(%(date_trunc_1)s, timezone(")
+    assert sql.endswith(", audit_logs.created_at)))")
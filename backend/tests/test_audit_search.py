@@ -0,0 +1,135 @@
+"""Testes para os filtros indexados de audit_logs: email/action (exact, prefix, contains) e changes_contains."""
+from sqlalchemy import delete, func, select
+
+from app.models import AuditChangeValue, AuditLog
+from app.services import audit_service
+from tests.test_query_indexes import capture_selects, query_plans
+
+EMAILS = ("Ana.Souza@empresa.com", "ana@outra.com", "bruno@empresa.com", "carla_ana@empresa.com", None)
+
+
+def _seed(db):
+    for email in EMAILS:
+        audit_service.log_event(db, action="login.success", user_email=email, user_agent="pytest")
+    audit_service.log_event(db, action="user.login_reset", user_email="x@y.com", user_agent="pytest")
+    db.commit()
+
+
+def _emails(db, value, mode):
+    items, _ = audit_service.list_audit_logs(db, user_email=value, email_match=mode, limit=100)
+    return sorted(i.user_email for i in items)
+
+
+def test_email_match_modes(db):
+    _seed(db)
+    assert _emails(db, "ANA@OUTRA.COM", "exact") == ["ana@outra.com"]
+    assert _emails(db, "ana", "prefix") == ["Ana.Souza@empresa.com", "ana@outra.com"]
+    assert _emails(db, "ana", "contains") == [
+        "Ana.Souza@empresa.com",
+        "ana@outra.com",
+        "carla_ana@empresa.com",
+    ]
+    assert _emails(db, "a_a", "contains") == ["carla_ana@empresa.com"]
+    assert _emails(db, "@", "contains") == [
+        "Ana.Souza@empresa.com",
+        "ana@outra.com",
+        "bruno@empresa.com",
+        "carla_ana@empresa.com",
+        "x@y.com",
+    ]
+
+    # O índice FTS5 acompanha exclusões (triggers)
+    db.execute(delete(AuditLog).where(AuditLog.user_email == "bruno@empresa.com"))
+    db.commit()
+    assert _emails(db, "empresa", "contains") == ["Ana.Souza@empresa.com", "carla_ana@empresa.com"]
+
+
+def test_email_modes_use_indexes(db):
+    _seed(db)
+    cases = {
+        "exact": ("ana@outra.com", "ix_audit_logs_user_email_lower"),
+        "prefix": ("ana", "ix_audit_logs_user_email_lower"),
+        "contains": ("empresa", "VIRTUAL TABLE"),
+    }
+    for mode, (value, expected) in cases.items():
+        with capture_selects(db) as statements:
+            audit_service.list_audit_logs(db, user_email=value, email_match=mode)
+        plans = query_plans(db, statements)
+        assert all(expected in plan for plan in plans), (mode, plans)
+
+
+def test_action_match_modes(client, auth_headers, db):
+    _seed(db)
+    url = "/api/v1/audit-logs/"
+
+    def actions(**params):
+        resp = client.get(url, params=params, headers=auth_headers)
+        assert resp.status_code == 200
+        return {i["action"] for i in resp.json()["items"]}
+
+    assert actions(action="login", action_match="prefix") == {"login.success"}
+    assert actions(action="login", action_match="contains") == {"login.success", "user.login_reset"}
+    assert actions(action="LOGIN.SUCCESS", action_match="exact") == {"login.success"}
+    assert client.get(url, params={"email_match": "fuzzy"}, headers=auth_headers).status_code == 422
+
+
+def test_changes_contains_filter(client, auth_headers, db):
+    """changes_contains: predicado caminho=valor sobre changes (side table no SQLite)."""
+    audit_service.log_event(
+        db, action="user.update", resource_type="user", resource_id=1,
+        changes={"before": {"is_active": True}, "after": {"is_active": False, "full_name": "Ana"}},
+    )
+    audit_service.log_event(
+        db, action="user.update", resource_type="user", resource_id=2,
+        changes={"before": {"is_active": False}, "after": {"is_active": True}},
+    )
+    audit_service.log_event(
+        db, action="user.bulk_create", changes={"after": {"created": 2, "user_ids": [3, 4]}}
+    )
+    db.commit()
+
+    def ids(predicate):
+        resp = client.get(
+            "/api/v1/audit-logs/", params={"changes_contains": predicate}, headers=auth_headers
+        )
+        assert resp.status_code == 200, resp.text
+        return {i["resource_id"] for i in resp.json()["items"]}
+
+    assert ids("after.is_active=false") == {"1"}
+    assert ids("before.is_active=false") == {"2"}
+    assert ids("after.full_name=Ana") == {"1"}
+    assert ids('after.full_name="Ana"') == {"1"}
+    assert ids("after.created=2") == {None}
+    assert ids("after.created=2.0") == {None}
+    assert ids("after.is_active=0") == set()
+
+    for bad in ("after.is_active", ".x=1", "after.user_ids=[3]"):
+        resp = client.get("/api/v1/audit-logs/", params={"changes_contains": bad}, headers=auth_headers)
+        assert resp.status_code == 400
+
+
+def test_changes_contains_postgres_uses_jsonb_containment(postgres_db):
+    condition = audit_service._changes_condition(postgres_db, "after.is_active=false")
+    dialect = postgres_db.get_bind().dialect
+    sql = str(condition.compile(dialect=dialect, compile_kwargs={"literal_binds": True}))
+    assert sql == 'audit_logs.changes @> CAST(\'{"after": {"is_active": false}}\' AS JSONB)'
+
+
+def test_change_leaves_stop_at_limit(db, monkeypatch):
+    walked = []
+    leaves = audit_service._change_leaves
+
+    def tracking(changes, prefix=""):
+        for leaf in leaves(changes, prefix):
+            if not prefix:  # a recursão também passa por aqui
+                walked.append(leaf)
+            yield leaf
+
+    monkeypatch.setattr(audit_service, "_change_leaves", tracking)
+    changes = {"after": {f"k{i}": i for i in range(audit_service._MAX_CHANGE_LEAVES * 3)}}
+    entry = audit_service.log_event(db, action="user.update", changes=changes)
+    db.commit()
+    stored = db.scalar(
+        select(func.count()).select_from(AuditChangeValue).where(AuditChangeValue.audit_log_id == entry.id)
+    )
+    assert stored == len(walked) == audit_service._MAX_CHANGE_LEAVES
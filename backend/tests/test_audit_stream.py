@@ -0,0 +1,126 @@
+"""Testes para o tail ao vivo de audit_logs (Redis Stream + fan-out SSE)."""
+import asyncio
+
+import orjson
+import pytest
+
+from app.core.config import settings
+from app.services import audit_service, audit_stream_service
+from app.services.audit_stream_service import AuditStreamHub, build_event_filter
+
+
+def _stream(redis):
+    return redis.xrange(settings.audit_stream_key)
+
+
+def test_publishes_only_after_commit(db, mock_redis):
+    audit_service.log_event(db, action="user.update", user_email="ana@empresa.com", ip_address="10.0.0.1")
+    assert _stream(mock_redis) == []
+    db.commit()
+    assert len(_stream(mock_redis)) == 1
+
+    audit_service.log_event(db, action="user.delete")
+    db.rollback()
+    audit_service.log_event(db, action="user.create")
+    db.commit()
+    actions = [orjson.loads(f["data"])["action"] for _, f in _stream(mock_redis)]
+    assert actions == ["user.update", "user.create"]
+
+
+def test_dispatch_filters_and_bounds_buffer(db, mock_redis, monkeypatch):
+    monkeypatch.setattr(settings, "audit_stream_client_buffer", 2)
+    for i in range(4):
+        audit_service.log_event(db, action="login.failure", result="failure", ip_address=f"10.0.0.{i}")
+    audit_service.log_event(db, action="login.success", ip_address="192.168.0.1")
+    db.commit()
+
+    loop = asyncio.new_event_loop()
+    try:
+        hub = AuditStreamHub()
+        internal = audit_stream_service.Subscription(build_event_filter(cidr="10.0.0.0/8"), loop, 2)
+        everything = audit_stream_service.Subscription(build_event_filter(), loop, 10)
+        hub._subscriptions.update({internal, everything})  # sem iniciar a thread de leitura
+        hub.dispatch(_stream(mock_redis))
+        loop.run_until_complete(asyncio.sleep(0))
+
+        assert internal.ready.is_set()
+        items, dropped = internal.drain()
+        assert [p["ip_address"] for _, p in items] == ["10.0.0.2", "10.0.0.3"]
+        assert dropped == 2
+        assert not internal.ready.is_set()
+        assert len(everything.drain()[0]) == 5
+    finally:
+        loop.close()
+
+
+def test_replay_since_last_event_id(db, mock_redis):
+    for action in ("user.create", "user.update", "user.delete"):
+        audit_service.log_event(db, action=action, resource_type="user")
+    db.commit()
+    first_id = _stream(mock_redis)[0][0]
+    replay = audit_stream_service.replay_since(first_id, build_event_filter(action="update"))
+    assert [p["action"] for _, p in replay.events] == ["user.update"]
+    assert replay.dropped == 0
+    assert audit_stream_service.replay_since("não-é-id", build_event_filter()).events == []
+
+
+def test_replay_pages_through_backlog(db, mock_redis, monkeypatch):
+    monkeypatch.setattr(settings, "audit_stream_client_buffer", 2)
+    audit_service.log_event(db, action="user.create")
+    db.commit()
+    for i in range(5):
+        audit_service.log_event(db, action="user.update", ip_address=f"10.0.0.{i}")
+        audit_service.log_event(db, action="login.success", ip_address="192.168.0.1")
+    db.commit()
+    stream = _stream(mock_redis)
+
+    # 10 entradas depois do id, lidas em páginas de 2: ficam as 2 mais novas do filtro
+    replay = audit_stream_service.replay_since(stream[0][0], build_event_filter(cidr="10.0.0.0/8"))
+    assert [p["ip_address"] for _, p in replay.events] == ["10.0.0.3", "10.0.0.4"]
+    assert replay.dropped == 3
+    assert replay.last_id == stream[-1][0]
+    # Eventos ao vivo até o último id lido já saíram no replay
+    assert replay.covers(stream[-1][0]) and replay.covers(stream[1][0])
+    ms, seq = stream[-1][0].split("-")
+    assert not replay.covers(f"{ms}-{int(seq) + 1}")
+    assert not replay.covers(f"{int(ms) + 1}-0")
+
+
+def test_event_filter_semantics():
+    event = {
+        "user_id": 1, "user_email": "Ana@Empresa.com", "action": "user.update", "resource_type": "user",
+        "result": "success", "ip_address": "2001:db8::1", "changes": {"after": {"is_active": False, "count": 2}},
+    }
+    assert build_event_filter(user_email="ana@", email_match="prefix")(event)
+    assert not build_event_filter(action="update", action_match="exact")(event)
+    assert build_event_filter(cidr="2001:db8::/32", changes_contains="after.is_active=false")(event)
+    assert not build_event_filter(cidr="10.0.0.0/8")(event)
+    assert not build_event_filter(changes_contains="after.is_active=0")(event)
+    assert build_event_filter(changes_contains="after.count=2.0")(event)
+    assert not build_event_filter(changes_contains="after.count=true")(event)
+    with pytest.raises(ValueError):
+        build_event_filter(cidr="10.0.0.0/33")
+
+
+def test_stream_endpoint_validates_filters(client, auth_headers):
+    resp = client.get("/api/v1/audit-logs/stream", params={"cidr": "x"}, headers=auth_headers)
+    assert resp.status_code == 400
+    assert client.get("/api/v1/audit-logs/stream").status_code == 401
+
+
+def test_stream_replay_runs_off_event_loop(client, auth_headers, monkeypatch):
+    calls = []
+
+    def replay_since(last_event_id, event_filter):
+        try:
+            asyncio.get_running_loop()
+            calls.append("event loop")
+        except RuntimeError:
+            calls.append("thread pool")
+        raise ConnectionError("redis indisponível")
+
+    monkeypatch.setattr(audit_stream_service, "replay_since", replay_since)
+    with pytest.raises(ConnectionError):
+        client.get("/api/v1/audit-logs/stream", headers={**auth_headers, "Last-Event-ID": "1-0"})
+    assert calls == ["thread pool"]
+    assert audit_stream_service.hub.subscriber_count == 0
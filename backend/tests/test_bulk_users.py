@@ -0,0 +1,87 @@
+"""Testes para a importação em massa de usuários (POST /users/bulk)."""
+import json
+
+from sqlalchemy import select
+
+from app.models import AuditLog, Permission, Role, User
+
+
+def _grant_create(db):
+    admin = db.execute(select(Role).where(Role.name == "admin")).scalar_one()
+    admin.permissions.append(Permission(name="users:create"))
+    db.commit()
+    return admin
+
+
+def test_bulk_import_csv_creates_users_with_roles(client, auth_headers, db):
+    """CSV válido cria usuários, vínculos de role e um evento de auditoria por lote."""
+    admin_role = _grant_create(db)
+    body = (
+        "email,full_name,password,is_active,role_ids\n"
+        f"ana@test.com,Ana,Senha@2025!,true,{admin_role.id}\n"
+        "bia@test.com,Bia,Senha@2025!,,\n"
+    )
+    resp = client.post(
+        "/api/v1/users/bulk",
+        content=body,
+        headers={**auth_headers, "Content-Type": "text/csv"},
+    )
+    assert resp.status_code == 200
+    data = resp.json()
+    assert (data["total"], data["created"], data["failed"]) == (2, 2, 0)
+    assert [item["row"] for item in data["items"]] == [2, 3]
+
+    db.expire_all()
+    ana = db.execute(select(User).where(User.email == "ana@test.com")).scalar_one()
+    assert [r.name for r in ana.roles] == ["admin"]
+    audits = db.execute(select(AuditLog).where(AuditLog.action == "user.bulk_create")).scalars().all()
+    assert len(audits) == 1
+    assert audits[0].changes["after"]["created"] == 2
+
+
+def test_bulk_import_ndjson_reports_row_errors(client, auth_headers, db):
+    """Linhas inválidas, duplicadas ou com e-mail existente retornam erro sem barrar as demais."""
+    _grant_create(db)
+    lines = [
+        {"email": "caio@test.com", "full_name": "Caio", "password": "Senha@2025!"},
+        {"email": "caio@test.com", "full_name": "Caio 2", "password": "Senha@2025!"},
+        {"email": "admin@test.com", "full_name": "Admin", "password": "Senha@2025!"},
+        {"email": "fraca@test.com", "full_name": "Fraca", "password": "123"},
+    ]
+    body = "\n".join(json.dumps(line) for line in lines) + "\n{quebrado\n"
+    resp = client.post(
+        "/api/v1/users/bulk",
+        content=body,
+        headers={**auth_headers, "Content-Type": "application/x-ndjson"},
+    )
+    assert resp.status_code == 200
+    data = resp.json()
+    assert (data["created"], data["failed"]) == (1, 4)
+    statuses = [(item["row"], item["status"]) for item in data["items"]]
+    assert statuses == [(1, "created"), (2, "error"), (3, "error"), (4, "error"), (5, "error")]
+    assert data["items"][2]["errors"] == ["Email já cadastrado"]
+    assert data["items"][3]["errors"][0].startswith("password:")
+
+
+def test_bulk_import_dry_run_does_not_write(client, auth_headers, db):
+    """dry_run valida as linhas sem inserir usuários."""
+    _grant_create(db)
+    body = json.dumps({"email": "duda@test.com", "full_name": "Duda", "password": "Senha@2025!"})
+    resp = client.post(
+        "/api/v1/users/bulk?dry_run=true",
+        content=body,
+        headers={**auth_headers, "Content-Type": "application/x-ndjson"},
+    )
+    assert resp.status_code == 200
+    assert resp.json()["items"][0]["status"] == "valid"
+    assert db.execute(select(User).where(User.email == "duda@test.com")).scalar_one_or_none() is None
+
+
+def test_bulk_import_rejects_unknown_content_type(client, auth_headers, db):
+    _grant_create(db)
+    resp = client.post(
+        "/api/v1/users/bulk",
+        content="{}",
+        headers={**auth_headers, "Content-Type": "application/xml"},
+    )
+    assert resp.status_code == 415
@@ -0,0 +1,90 @@
+"""Testes para as dimensões (User-Agents e códigos de audit_logs: strings internadas, leitura transparente)."""
+from sqlalchemy import event, func, select
+
+from app.models import AuditLog, RefreshToken, UserAgent
+from app.services.dimension_service import user_agents
+
+UA = "Mozilla/5.0 (X11; Linux x86_64; rv:127.0) Gecko/20100101 Firefox/127.0"
+
+
+def _login(client):
+    resp = client.post(
+        "/api/v1/auth/login",
+        json={"email": "admin@test.com", "password": "Admin@2025!"},
+        headers={"User-Agent": UA},
+    )
+    assert resp.status_code == 200
+    return resp.json()
+
+
+def test_user_agent_is_stored_once_and_read_back(client, db):
+    for _ in range(3):
+        _login(client)
+
+    assert db.scalar(select(func.count()).select_from(UserAgent).where(UserAgent.user_agent == UA)) == 1
+    sessions = db.execute(select(RefreshToken)).scalars().all()
+    assert {s.user_agent for s in sessions} == {UA}
+    logs = db.execute(select(AuditLog).where(AuditLog.action == "login.success")).scalars().all()
+    assert {log.user_agent for log in logs} == {UA}
+
+    data = _login(client)
+    items = client.get(
+        "/api/v1/audit-logs/", headers={"Authorization": f"Bearer {data['access_token']}"}
+    ).json()["items"]
+    assert items[0]["user_agent"] == UA
+
+
+def test_cached_lookup_costs_no_query(db):
+    user_agents.id_for(db, UA)
+    db.commit()
+
+    statements = []
+    engine = db.get_bind()
+    listener = lambda *args: statements.append(args[2])  # noqa: E731
+    event.listen(engine, "before_cursor_execute", listener)
+    try:
+        ua_id = user_agents.id_for(db, UA)
+    finally:
+        event.remove(engine, "before_cursor_execute", listener)
+    assert ua_id is not None
+    assert statements == []
+
+
+def test_rolled_back_insert_is_not_cached(db):
+    first = user_agents.id_for(db, UA)
+    db.rollback()
+    assert db.scalar(select(func.count()).select_from(UserAgent)) == 0
+
+    second = user_agents.id_for(db, UA)
+    db.commit()
+    assert db.get(UserAgent, second).user_agent == UA
+    assert first is not None
+
+
+def test_audit_codes_and_filters(db):
+    from app.services import audit_service
+
+    for action in ("login.success", "login.failure", "user.create"):
+        audit_service.log_event(db, action=action, result="success", resource_type="user")
+    db.commit()
+    db.expire_all()
+
+    row = db.execute(select(AuditLog.action_id, AuditLog.result_id, AuditLog.action)).first()
+    assert isinstance(row.action_id, int) and isinstance(row.result_id, int)
+    assert row.action == "login.success"
+
+    items, total = audit_service.list_audit_logs(db, action="LOGIN")
+    assert total == 2
+    assert {i.action for i in items} == {"login.success", "login.failure"}
+
+    # Valor ausente da dimensão: resposta vazia sem consultar audit_logs (nem criar código)
+    statements = []
+    engine = db.get_bind()
+    listener = lambda *args: statements.append(args[2])  # noqa: E731
+    event.listen(engine, "before_cursor_execute", listener)
+    try:
+        assert audit_service.list_audit_logs(db, result="timeout") == ([], 0)
+    finally:
+        event.remove(engine, "before_cursor_execute", listener)
+    assert not any("audit_logs" in sql for sql in statements)
+    assert not any(sql.lstrip().upper().startswith("INSERT") for sql in statements)
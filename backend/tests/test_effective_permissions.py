@@ -0,0 +1,78 @@
+"""Testes para as permissões efetivas materializadas (user_effective_permissions)."""
+from types import SimpleNamespace
+
+from sqlalchemy import delete, insert, select
+from sqlalchemy.dialects import postgresql
+
+from app.models import Permission, Role, User, UserEffectivePermission
+from app.services import effective_permission_service as eps
+from app.services import user_service
+
+
+def _names(db, user):
+    return set(eps.permission_names(db, user.id))
+
+
+def test_maintained_on_role_and_permission_changes(client, db):
+    admin = db.execute(select(User).where(User.email == "admin@test.com")).scalar_one()
+    admin_role = admin.roles[0]
+    assert _names(db, admin) == {"audit:read", "users:read", "sessions:read", "sessions:revoke"}
+
+    viewer = Role(name="viewer", permissions=[Permission(name="reports:read")])
+    db.add(viewer)
+    db.commit()
+    user = user_service.create_user(
+        db, email="leitor@test.com", full_name="Leitor", password="Senha@2025!", role_ids=[viewer.id]
+    )
+    assert _names(db, user) == {"reports:read"}
+
+    # Permissão nova no papel chega a todos os usuários do papel
+    users_read = db.execute(select(Permission).where(Permission.name == "users:read")).scalar_one()
+    viewer.permissions.append(users_read)
+    db.commit()
+    assert _names(db, user) == {"reports:read", "users:read"}
+
+    user_service.update_user(db, user, role_ids=[admin_role.id, viewer.id])
+    assert "sessions:revoke" in _names(db, user)
+
+    db.delete(viewer)
+    db.commit()
+    assert _names(db, user) == _names(db, admin)
+
+    db.delete(db.execute(select(Permission).where(Permission.name == "sessions:revoke")).scalar_one())
+    db.commit()
+    assert "sessions:revoke" not in _names(db, admin)
+    assert eps.check_consistency(db) == (0, 0)
+
+
+def test_permission_check_reads_materialized_table(client, auth_headers, db):
+    assert client.get("/api/v1/users/", headers=auth_headers).status_code == 200
+    users_read = db.execute(select(Permission.id).where(Permission.name == "users:read")).scalar_one()
+    db.execute(delete(UserEffectivePermission).where(UserEffectivePermission.permission_id == users_read))
+    db.commit()
+    assert client.get("/api/v1/users/", headers=auth_headers).status_code == 403
+
+    # O verificador encontra a divergência e reconstrói a tabela
+    stray = db.execute(select(Permission.id).where(Permission.name == "audit:read")).scalar_one()
+    db.execute(insert(UserEffectivePermission).values(user_id=999, permission_id=stray))
+    assert eps.check_consistency(db) == (1, 1)
+    assert eps.check_consistency(db, repair=True) == (1, 1)
+    assert eps.check_consistency(db) == (0, 0)
+    resp = client.get("/api/v1/users/", headers=auth_headers)
+    assert resp.status_code == 200
+    assert "users:read" in resp.json()[0]["permissions"]
+
+
+def test_refresh_takes_lock_before_recomputing():
+    """No Postgres o recálculo só lê as associações depois do advisory lock (ver docstring do serviço)."""
+    statements = []
+
+    class _Conn:
+        dialect = SimpleNamespace(name="postgresql")
+
+        def execute(self, stmt):
+            statements.append(str(stmt.compile(dialect=postgresql.dialect())))
+
+    eps._refresh(_Conn(), user_ids={1}, role_ids={2}, new_user_ids=set())
+    assert [sql.split()[0] for sql in statements] == ["SELECT", "DELETE", "INSERT"]
+    assert "pg_advisory_xact_lock" in statements[0]
@@ -0,0 +1,48 @@
+"""Testes do armazenamento binário de IPs e do filtro por CIDR."""
+from app.models import AuditLog
+from app.services import audit_service
+from tests.test_query_indexes import capture_selects, query_plans
+
+
+def _log(db, ip):
+    return audit_service.log_event(db, action="login.success", ip_address=ip, user_agent="pytest")
+
+
+def test_ip_round_trip_and_invalid_values(db):
+    entries = [_log(db, ip) for ip in ("203.0.113.7", "2001:db8::1", "testclient", None)]
+    db.commit()
+    db.expire_all()
+
+    assert [db.get(AuditLog, e.id).ip_address for e in entries] == [
+        "203.0.113.7",
+        "2001:db8::1",
+        None,
+        None,
+    ]
+    raw = db.connection().exec_driver_sql(
+        "SELECT ip_address FROM audit_logs WHERE id = ?", (entries[0].id,)
+    ).scalar()
+    assert len(raw) == 16
+
+
+def test_audit_logs_cidr_filter_uses_index(db):
+    for ip in ("203.0.113.1", "203.0.113.254", "203.0.114.1", "198.51.100.7", "2001:db8::5"):
+        _log(db, ip)
+    db.commit()
+
+    items, total = audit_service.list_audit_logs(db, cidr="203.0.113.0/24")
+    assert total == 2
+    assert {i.ip_address for i in items} == {"203.0.113.1", "203.0.113.254"}
+    _, total = audit_service.list_audit_logs(db, cidr="2001:db8::/32")
+    assert total == 1
+
+    with capture_selects(db) as statements:
+        audit_service.list_audit_logs(db, cidr="198.51.100.0/24")
+    assert "ix_audit_logs_ip_address" in query_plans(db, statements)[-1]
+
+
+def test_audit_logs_endpoint_rejects_invalid_cidr(client, auth_headers):
+    resp = client.get("/api/v1/audit-logs/", params={"cidr": "not-a-net"}, headers=auth_headers)
+    assert resp.status_code == 400
+    resp = client.get("/api/v1/audit-logs/", params={"cidr": "127.0.0.0/8"}, headers=auth_headers)
+    assert resp.status_code == 200
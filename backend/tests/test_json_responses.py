@@ -0,0 +1,35 @@
+"""Testes para o caminho rápido de serialização (orjson) das listagens."""
+
+
+def test_list_users_returns_sorted_roles_and_permissions(client, auth_headers):
+    """GET /users/ serializa roles e permissões ordenadas, no formato de UserOut."""
+    resp = client.get("/api/v1/users/", headers=auth_headers)
+    assert resp.status_code == 200
+    assert resp.headers["content-type"] == "application/json"
+    users = resp.json()
+    assert len(users) == 1
+    admin = users[0]
+    assert set(admin) == {"id", "email", "full_name", "is_active", "roles", "permissions"}
+    assert admin["roles"] == ["admin"]
+    assert admin["permissions"] == sorted(admin["permissions"])
+
+
+def test_list_audit_logs_items_match_schema(client, auth_headers):
+    """GET /audit-logs/ devolve itens com todos os campos de AuditLogOut."""
+    resp = client.get("/api/v1/audit-logs/", headers=auth_headers)
+    assert resp.status_code == 200
+    data = resp.json()
+    assert data["total"] >= 1
+    item = data["items"][0]
+    assert item["action"] == "login.success"
+    assert {"id", "created_at", "changes", "detail", "user_agent"} <= set(item)
+
+
+def test_list_all_sessions_includes_user_email(client, auth_headers):
+    """GET /sessions/all resolve o e-mail do dono de cada sessão."""
+    resp = client.get("/api/v1/sessions/all", headers=auth_headers)
+    assert resp.status_code == 200
+    data = resp.json()
+    assert data["total"] == 1
+    assert data["items"][0]["user_email"] == "admin@test.com"
+    assert data["items"][0]["is_current"] is False
@@ -0,0 +1,52 @@
+"""Testes para o registro coalescido de last_seen_at das sessões."""
+from sqlalchemy import select
+
+from app.core.config import settings
+from app.models import RefreshToken
+from app.services import last_seen_service
+
+
+def _login(client):
+    resp = client.post(
+        "/api/v1/auth/login",
+        json={"email": "admin@test.com", "password": "Admin@2025!"},
+    )
+    assert resp.status_code == 200
+    return resp.json()
+
+
+def test_requests_are_coalesced_and_flushed_in_batch(client, db):
+    """Vários requests da mesma sessão geram uma só marcação dentro da granularidade."""
+    first, second = _login(client), _login(client)
+    for data in (first, first, first, second):
+        headers = {"Authorization": f"Bearer {data['access_token']}"}
+        assert client.get("/api/v1/sessions/", headers=headers).status_code == 200
+
+    assert last_seen_service.flush(db) == 2
+    assert last_seen_service.flush(db) == 0
+
+    db.expire_all()
+    seen = {
+        t.token_id: t.last_seen_at
+        for t in db.execute(select(RefreshToken)).scalars()
+    }
+    assert seen[first["refresh_token"]] is not None
+    assert seen[second["refresh_token"]] is not None
+
+    items = client.get(
+        "/api/v1/sessions/", headers={"Authorization": f"Bearer {first['access_token']}"}
+    ).json()["items"]
+    assert all(i["last_seen_at"] for i in items)
+
+
+def test_touch_respects_granularity(monkeypatch):
+    monkeypatch.setattr(settings, "session_last_seen_granularity_seconds", 0)
+    last_seen_service.touch("abc")
+    last_seen_service.touch("abc")
+    last_seen_service.touch(None)
+    assert list(last_seen_service._pending) == ["abc"]
+
+    monkeypatch.setattr(settings, "session_last_seen_granularity_seconds", 300)
+    last_seen_service._pending.clear()
+    last_seen_service.touch("abc")
+    assert not last_seen_service._pending
@@ -0,0 +1,181 @@
+"""Testes para a outbox transacional e o relay (webhook local como consumidor)."""
+import hashlib
+import hmac
+import json
+import threading
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+import pytest
+from sqlalchemy import delete, func, select
+
+from app.core.config import settings
+from app.models import OutboxEvent, Permission, Role
+from app.services import audit_aggregation_service, audit_service, outbox_service
+from app.services.outbox_sinks import WebhookSink, get_sink
+
+pytestmark = pytest.mark.usefixtures("outbox_enabled")
+
+
+class _Webhook(BaseHTTPRequestHandler):
+    """Consumidor local: guarda os lotes recebidos; responde 500 enquanto `failures` > 0."""
+
+    received: list = []
+    failures = 0
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers["Content-Length"]))
+        if type(self).failures:
+            type(self).failures -= 1
+            self.send_response(500)
+        else:
+            type(self).received.append((body, self.headers.get("X-Outbox-Signature")))
+            self.send_response(204)
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def webhook():
+    _Webhook.received, _Webhook.failures = [], 0
+    server = HTTPServer(("127.0.0.1", 0), _Webhook)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield _Webhook, WebhookSink(f"http://127.0.0.1:{server.server_port}/hook", secret="s3cr3t")
+    server.shutdown()
+    server.server_close()
+
+
+def _pending(db):
+    return db.scalars(select(OutboxEvent).where(OutboxEvent.status == "pending").order_by(OutboxEvent.id)).all()
+
+
+def test_outbox_written_in_mutation_transaction(client, auth_headers, db):
+    role = db.execute(select(Role).where(Role.name == "admin")).scalar_one()
+    role.permissions.append(Permission(name="roles:update"))
+    db.execute(delete(OutboxEvent))
+    db.commit()
+    resp = client.put(f"/api/v1/roles/{role.id}", json={"description": "Nova"}, headers=auth_headers)
+    assert resp.status_code == 200
+    events = _pending(db)
+    assert [(e.event_type, e.aggregate_type, e.aggregate_id) for e in events] == [
+        ("role.update", "role", str(role.id))
+    ]
+
+    # Rollback leva junto o evento; actions fora de OUTBOX_ACTIONS não entram
+    audit_service.log_event(db, action="user.update", resource_type="user", resource_id=1)
+    db.rollback()
+    audit_service.log_event(db, action="report.view")
+    db.commit()
+    assert len(_pending(db)) == 1
+
+
+def test_relay_delivers_in_order_with_retries(db, webhook):
+    handler, sink = webhook
+    db.execute(delete(OutboxEvent))
+    for action in ("user.create", "user.update", "user.delete"):
+        audit_service.log_event(db, action=action, resource_type="user", resource_id=7)
+    audit_service.log_event(db, action="role.update", resource_type="role", resource_id=3)
+    db.commit()
+
+    handler.failures = 1
+    assert outbox_service.relay(db, sink, batch_size=2) == 0
+    first = _pending(db)[0]
+    assert first.attempts == 1 and first.next_attempt_at is not None
+
+    # user 7 espera a nova tentativa do primeiro evento; role 3 segue
+    assert outbox_service.relay(db, sink, batch_size=2) == 1
+    body, signature = handler.received[-1]
+    assert [e["type"] for e in json.loads(body)["events"]] == ["role.update"]
+    assert signature == "sha256=" + hmac.new(b"s3cr3t", body, hashlib.sha256).hexdigest()
+
+    for event in _pending(db):
+        event.next_attempt_at = None
+    db.commit()
+    assert outbox_service.relay(db, sink, batch_size=10) == 3
+    delivered = [e["type"] for body, _ in handler.received[1:] for e in json.loads(body)["events"]]
+    assert delivered == ["user.create", "user.update", "user.delete"]
+    assert _pending(db) == []
+
+
+def test_held_aggregate_does_not_starve_batch(db, webhook):
+    handler, sink = webhook
+    db.execute(delete(OutboxEvent))
+    for _ in range(12):
+        audit_service.log_event(db, action="user.update", resource_type="user", resource_id=7)
+    audit_service.log_event(db, action="role.update", resource_type="role", resource_id=3)
+    db.commit()
+
+    handler.failures = 1
+    assert outbox_service.relay(db, sink, batch_size=1) == 0
+    # Os 11 eventos seguintes de user 7 ficam fora da janela do lote: role 3 é entregue
+    assert outbox_service.relay(db, sink, batch_size=1) == 1
+    assert [e["type"] for e in json.loads(handler.received[-1][0])["events"]] == ["role.update"]
+    assert len(_pending(db)) == 12
+
+
+def test_dead_after_max_attempts_and_sink_config(db, monkeypatch):
+    class Broken:
+        def deliver(self, events):
+            raise RuntimeError("indisponível")
+
+    monkeypatch.setattr(settings, "outbox_max_attempts", 1)
+    audit_service.log_event(db, action="permission.create", resource_type="permission", resource_id=9)
+    db.commit()
+    outbox_service.relay(db, Broken())
+    event = db.scalars(select(OutboxEvent).where(OutboxEvent.event_type == "permission.create")).one()
+    assert (event.status, event.last_error) == ("dead", "indisponível")
+
+    monkeypatch.setattr(settings, "outbox_sink", "webhook")
+    with pytest.raises(ValueError):
+        get_sink()
+
+
+def test_nothing_recorded_without_sink(db, monkeypatch):
+    monkeypatch.setattr(settings, "outbox_sink", "")
+    db.execute(delete(OutboxEvent))
+    audit_service.log_event(db, action="login.failure", result="failure", user_email="x@y.com")
+    db.commit()
+    assert db.scalar(select(func.count()).select_from(OutboxEvent)) == 0
+
+
+def test_purge_removes_finished_and_expired_pending(db):
+    db.execute(delete(OutboxEvent))
+    now = datetime.now(timezone.utc)
+    old = now - timedelta(hours=settings.outbox_pending_retention_hours + 1)
+    for status, created_at, delivered_at in (
+        ("delivered", old, old),
+        ("delivered", now, now),
+        ("dead", old, None),
+        ("dead", now, None),
+        ("pending", old, None),
+        ("pending", now, None),
+    ):
+        db.add(
+            OutboxEvent(
+                aggregate_type="user", aggregate_id="1", event_type="login.failure", payload={},
+                status=status, attempts=0, created_at=created_at, delivered_at=delivered_at,
+            )
+        )
+    db.commit()
+    assert outbox_service.purge_outbox(db) == 3
+    assert sorted(db.scalars(select(OutboxEvent.status))) == ["dead", "delivered", "pending"]
+
+
+def test_aggregated_repeats_are_published(db, monkeypatch):
+    db.execute(delete(OutboxEvent))
+    for _ in range(4):
+        audit_service.log_event(
+            db, action="login.failure", result="failure", user_email="ana@empresa.com", ip_address="203.0.113.7"
+        )
+        db.commit()
+    monkeypatch.setattr(settings, "audit_aggregate_window_seconds", 0)
+    assert audit_aggregation_service.flush(db) == 1
+
+    events = _pending(db)
+    assert [e.payload.get("repeats") for e in events] == [None, 3]
+    assert events[1].payload["occurrence_count"] == 4
+    assert events[1].payload["id"] == events[0].payload["id"]
+    assert events[1].payload["last_occurred_at"] is not None
@@ -0,0 +1,68 @@
+"""Testes (EXPLAIN) para os índices das consultas de sessões ativas e audit logs."""
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+from sqlalchemy import event
+
+from app.services import audit_service, session_service
+
+
+@contextmanager
+def capture_selects(db):
+    """Captura os SELECTs executados no bloco como (sql, parâmetros)."""
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT"):
+            statements.append((statement, parameters))
+
+    engine = db.get_bind()
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
+
+
+def query_plans(db, statements) -> list[str]:
+    conn = db.connection()
+    return [
+        " | ".join(row[-1] for row in conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {sql}", params))
+        for sql, params in statements
+    ]
+
+
+def test_user_sessions_use_partial_index(db):
+    with capture_selects(db) as statements:
+        session_service.get_user_sessions(db, user_id=1)
+    plans = query_plans(db, statements)
+    assert "ix_refresh_tokens_active_user_created" in plans[0]
+    assert "TEMP B-TREE" not in plans[0]
+
+
+def test_active_sessions_page_uses_partial_index(db):
+    cursor = session_service.encode_cursor(datetime.now(timezone.utc), 10)
+    with capture_selects(db) as statements:
+        session_service.list_active_sessions(db, limit=50, cursor=cursor)
+    plans = query_plans(db, statements)
+    assert "ix_refresh_tokens_active_" in plans[0]
+    assert "ix_refresh_tokens_active_created" in plans[-1]
+    assert "TEMP B-TREE" not in plans[-1]
+
+
+def test_audit_filters_use_composite_indexes(db):
+    cases = {
+        "ix_audit_logs_user_created": {"user_id": 1},
+        "ix_audit_logs_result_created": {"result": "failure"},
+        "ix_audit_logs_resource_type_created": {"resource_type": "session"},
+        "ix_audit_logs_action_created": {"action": "login"},
+    }
+    # Os filtros só consultam audit_logs se o valor existe na dimensão
+    audit_service.log_event(db, action="login.failure", result="failure", resource_type="session")
+    db.commit()
+    for index, filters in cases.items():
+        with capture_selects(db) as statements:
+            audit_service.list_audit_logs(db, **filters)
+        plans = query_plans(db, statements)[-2:]  # contagem e página
+        assert all(index in plan for plan in plans), (index, plans)
+        assert "TEMP B-TREE" not in plans[-1]
@@ -0,0 +1,101 @@
+"""Testes para a rotação atômica de refresh token."""
+import threading
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import Session
+
+from app.core.security import hash_password
+from app.db.base import Base
+from app.models import RefreshToken, User
+from app.services import auth_service
+
+
+def _login(client):
+    resp = client.post(
+        "/api/v1/auth/login",
+        json={"email": "admin@test.com", "password": "Admin@2025!"},
+    )
+    assert resp.status_code == 200
+    return resp.json()["refresh_token"]
+
+
+def test_refresh_rotates_token(client, db):
+    """Refresh revoga o token usado e devolve um novo par."""
+    old = _login(client)
+    resp = client.post("/api/v1/auth/refresh", json={"refresh_token": old})
+    assert resp.status_code == 200
+    new = resp.json()["refresh_token"]
+    assert new != old
+
+    tokens = {t.token_id: t.revoked for t in db.execute(select(RefreshToken)).scalars()}
+    assert tokens[old] is True
+    assert tokens[new] is False
+
+
+def test_refresh_reused_token_is_rejected(client):
+    """Reusar um token já rotacionado devolve 401 com motivo explícito."""
+    old = _login(client)
+    assert client.post("/api/v1/auth/refresh", json={"refresh_token": old}).status_code == 200
+
+    resp = client.post("/api/v1/auth/refresh", json={"refresh_token": old})
+    assert resp.status_code == 401
+    assert resp.json()["detail"] == auth_service.REUSED_REFRESH_TOKEN
+
+
+def test_refresh_expired_token_is_rejected(client, db):
+    old = _login(client)
+    rt = db.execute(select(RefreshToken).where(RefreshToken.token_id == old)).scalar_one()
+    rt.expires_at = datetime.now(timezone.utc) - timedelta(minutes=1)
+    db.commit()
+
+    resp = client.post("/api/v1/auth/refresh", json={"refresh_token": old})
+    assert resp.status_code == 401
+    assert resp.json()["detail"] == auth_service.EXPIRED_REFRESH_TOKEN
+
+
+def test_concurrent_refresh_has_exactly_one_winner(tmp_path):
+    """Vários refreshes simultâneos do mesmo token: um vence, os demais recebem erro limpo."""
+    engine = create_engine(f"sqlite:///{tmp_path / 'race.db'}", connect_args={"timeout": 30})
+    Base.metadata.create_all(engine)
+    with Session(engine) as setup:
+        user = User(email="race@test.com", full_name="Race", hashed_password=hash_password("x"))
+        setup.add(user)
+        setup.flush()
+        setup.add(
+            RefreshToken(
+                token_id="race-token",
+                user_id=user.id,
+                expires_at=datetime.now(timezone.utc) + timedelta(days=1),
+            )
+        )
+        setup.commit()
+
+    workers = 8
+    barrier = threading.Barrier(workers)
+    outcomes: list[str] = []
+    lock = threading.Lock()
+
+    def attempt():
+        with Session(engine) as session:
+            barrier.wait()
+            try:
+                auth_service.rotate_refresh_token(session, "race-token")
+                outcome = "ok"
+            except ValueError as exc:
+                outcome = str(exc)
+        with lock:
+            outcomes.append(outcome)
+
+    threads = [threading.Thread(target=attempt) for _ in range(workers)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert outcomes.count("ok") == 1
+    assert outcomes.count(auth_service.REUSED_REFRESH_TOKEN) == workers - 1
+    with Session(engine) as check:
+        active = check.execute(select(RefreshToken).where(RefreshToken.revoked.is_(False))).scalars().all()
+        assert len(active) == 1
+    engine.dispose()
@@ -0,0 +1,68 @@
+"""Testes para o cache de respostas com ETag (/users/me, /roles/, /permissions/)."""
+from sqlalchemy import select
+
+from app.models import Permission, Role
+
+
+def _grant(db, *names):
+    admin = db.execute(select(Role).where(Role.name == "admin")).scalar_one()
+    for name in names:
+        admin.permissions.append(Permission(name=name))
+    db.commit()
+
+
+def test_me_returns_304_when_etag_matches(client, auth_headers):
+    """If-None-Match com o ETag atual devolve 304 sem corpo."""
+    first = client.get("/api/v1/users/me", headers=auth_headers)
+    assert first.status_code == 200
+    etag = first.headers["etag"]
+    assert first.json()["email"] == "admin@test.com"
+
+    second = client.get("/api/v1/users/me", headers={**auth_headers, "If-None-Match": etag})
+    assert second.status_code == 304
+    assert second.content == b""
+    assert second.headers["etag"] == etag
+
+
+def test_me_etag_changes_after_profile_update(client, auth_headers):
+    """Atualizar o próprio perfil invalida o payload cacheado."""
+    etag = client.get("/api/v1/users/me", headers=auth_headers).headers["etag"]
+
+    resp = client.put("/api/v1/users/me", json={"full_name": "Outro Nome"}, headers=auth_headers)
+    assert resp.status_code == 200
+
+    after = client.get("/api/v1/users/me", headers={**auth_headers, "If-None-Match": etag})
+    assert after.status_code == 200
+    assert after.json()["full_name"] == "Outro Nome"
+    assert after.headers["etag"] != etag
+
+
+def test_roles_list_etag_follows_rbac_version(client, auth_headers, db):
+    """Escrita em role incrementa a versão RBAC e muda o ETag de GET /roles/."""
+    _grant(db, "roles:read", "roles:update")
+    first = client.get("/api/v1/roles/", headers=auth_headers)
+    assert first.status_code == 200
+    etag = first.headers["etag"]
+    role_id = first.json()[0]["id"]
+
+    cached = client.get("/api/v1/roles/", headers={**auth_headers, "If-None-Match": etag})
+    assert cached.status_code == 304
+
+    resp = client.put(f"/api/v1/roles/{role_id}", json={"description": "Nova"}, headers=auth_headers)
+    assert resp.status_code == 200
+
+    fresh = client.get("/api/v1/roles/", headers={**auth_headers, "If-None-Match": etag})
+    assert fresh.status_code == 200
+    assert fresh.json()[0]["description"] == "Nova"
+
+
+def test_permissions_list_supports_conditional_get(client, auth_headers, db):
+    """GET /permissions/ também responde 304 para ETag inalterado."""
+    _grant(db, "permissions:read")
+    first = client.get("/api/v1/permissions/", headers=auth_headers)
+    assert first.status_code == 200
+    resp = client.get(
+        "/api/v1/permissions/",
+        headers={**auth_headers, "If-None-Match": f'W/{first.headers["etag"]}'},
+    )
+    assert resp.status_code == 304
@@ -0,0 +1,110 @@
+"""Testes para o store de sessões no Redis (SESSION_STORE=redis) com write-behind."""
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import select
+
+from app.core.config import settings
+from app.models import RefreshToken, User
+from app.services import session_store
+
+
+@pytest.fixture
+def redis_store(monkeypatch):
+    monkeypatch.setattr(settings, "session_store", "redis")
+
+
+def _login(client):
+    resp = client.post(
+        "/api/v1/auth/login",
+        json={"email": "admin@test.com", "password": "Admin@2025!"},
+    )
+    assert resp.status_code == 200
+    return resp.json()
+
+
+def _db_tokens(db):
+    db.expire_all()
+    return {t.token_id: t.revoked for t in db.execute(select(RefreshToken)).scalars()}
+
+
+def test_login_and_refresh_are_served_from_redis(redis_store, client, db, mock_redis):
+    """Login e refresh gravam no Redis; o banco só recebe as linhas no flush."""
+    old = _login(client)["refresh_token"]
+    assert mock_redis.exists(f"session:{old}")
+    assert _db_tokens(db) == {}
+
+    resp = client.post("/api/v1/auth/refresh", json={"refresh_token": old})
+    assert resp.status_code == 200
+    new = resp.json()["refresh_token"]
+    assert not mock_redis.exists(f"session:{old}")
+
+    reused = client.post("/api/v1/auth/refresh", json={"refresh_token": old})
+    assert reused.status_code == 401
+    assert reused.json()["detail"] == "Refresh token already used"
+
+    assert session_store.flush_write_behind(db) == 3
+    assert _db_tokens(db) == {old: True, new: False}
+
+
+def test_list_and_revoke_sessions_from_redis(redis_store, client, db):
+    """Listagem e revogação do próprio usuário usam o sorted set por usuário."""
+    first = _login(client)["refresh_token"]
+    data = _login(client)
+    headers = {"Authorization": f"Bearer {data['access_token']}"}
+
+    items = client.get("/api/v1/sessions/", headers=headers).json()["items"]
+    assert [i["token_id"] for i in items] == [data["refresh_token"], first]
+
+    assert client.delete(f"/api/v1/sessions/{first}", headers=headers).status_code == 200
+    assert client.delete(f"/api/v1/sessions/{first}", headers=headers).status_code == 404
+
+    assert client.post("/api/v1/auth/logout-all", headers=headers).status_code == 200
+    assert client.get("/api/v1/sessions/", headers=headers).status_code == 401
+
+    session_store.flush_write_behind(db)
+    assert set(_db_tokens(db).values()) == {True}
+
+
+def test_logout_all_does_not_revoke_later_sessions(redis_store, client, db):
+    """revoke_user só atinge sessões anteriores, mesmo se o flush vier depois do novo login."""
+    data = _login(client)
+    headers = {"Authorization": f"Bearer {data['access_token']}"}
+    assert client.post("/api/v1/auth/logout-all", headers=headers).status_code == 200
+    later = _login(client)["refresh_token"]
+
+    session_store.flush_write_behind(db)
+    assert _db_tokens(db) == {data["refresh_token"]: True, later: False}
+
+
+def test_rebuild_from_database_on_cold_start(redis_store, client, db, mock_redis):
+    """Sem o marcador de pronto, o store é recarregado do banco com as sessões ativas."""
+    user = db.execute(select(User).where(User.email == "admin@test.com")).scalar_one()
+    now = datetime.now(timezone.utc)
+    db.add_all([
+        RefreshToken(token_id="active", user_id=user.id, expires_at=now + timedelta(days=1)),
+        RefreshToken(token_id="revoked", user_id=user.id, expires_at=now + timedelta(days=1), revoked=True),
+        RefreshToken(token_id="expired", user_id=user.id, expires_at=now - timedelta(days=1)),
+    ])
+    db.commit()
+
+    mock_redis.flushall()
+    resp = client.post("/api/v1/auth/refresh", json={"refresh_token": "active"})
+    assert resp.status_code == 200
+    assert mock_redis.exists("session:ready")
+    assert not mock_redis.exists("session:revoked")
+    assert not mock_redis.exists("session:expired")
+    assert session_store.rebuild_from_database(db) == 0
+
+
+def test_session_cap_evicts_oldest_from_store(redis_store, client, db, monkeypatch, mock_redis):
+    """No modo Redis o limite usa o sorted set do usuário e agenda as revogações."""
+    monkeypatch.setattr(settings, "max_sessions_per_user", 2)
+    tokens = [_login(client)["refresh_token"] for _ in range(3)]
+
+    assert not mock_redis.exists(f"session:{tokens[0]}")
+    user = db.execute(select(User).where(User.email == "admin@test.com")).scalar_one()
+    assert mock_redis.zcard(f"session:user:{user.id}") == 2
+
+    session_store.drain_write_behind(db)
+    assert _db_tokens(db) == {tokens[0]: True, tokens[1]: False, tokens[2]: False}
@@ -43,3 +43,124 @@ def test_logout_all_revokes_tokens(client, auth_headers, db):
     ).scalar_one_or_none()
     assert rt is not None
     assert rt.revoked is True
+
+
+def _seed_sessions(db, count):
+    from datetime import datetime, timedelta, timezone
+
+    from app.models import User
+    from app.services.dimension_service import user_agents
+
+    user = db.execute(select(User).where(User.email == "admin@test.com")).scalar_one()
+    base = datetime.now(timezone.utc) - timedelta(hours=1)
+    db.add_all([
+        RefreshToken(
+            token_id=f"seed-{i}",
+            user_id=user.id,
+            created_at=base + timedelta(seconds=i // 2),  # empates de created_at
+            expires_at=base + timedelta(days=1),
+            ip_address=f"10.0.{i % 2}.{i}",
+            user_agent_id=user_agents.id_for(db, "Mozilla/5.0 Firefox" if i % 3 == 0 else "curl/8.0"),
+        )
+        for i in range(count)
+    ])
+    db.commit()
+
+
+def test_list_all_sessions_keyset_pagination(client, auth_headers, db):
+    """Páginas por cursor cobrem todas as sessões, sem repetição, com o email do dono."""
+    _seed_sessions(db, 7)
+    seen, cursor = [], None
+    while True:
+        params = {"limit": 3, "cidr": "10.0.0.0/16"}
+        if cursor:
+            params["cursor"] = cursor
+        data = client.get("/api/v1/sessions/all", params=params, headers=auth_headers).json()
+        assert data["total"] == 7
+        assert all(i["user_email"] == "admin@test.com" for i in data["items"])
+        seen += [i["token_id"] for i in data["items"]]
+        cursor = data["next_cursor"]
+        if not cursor:
+            break
+    assert sorted(seen) == sorted(f"seed-{i}" for i in range(7))
+    assert len(seen) == len(set(seen))
+
+
+def test_list_all_sessions_filters(client, auth_headers, db):
+    """Filtros por rede (CIDR) e trecho do User-Agent."""
+    _seed_sessions(db, 7)
+    resp = client.get(
+        "/api/v1/sessions/all",
+        params={"cidr": "10.0.1.0/24", "user_agent": "firefox"},
+        headers=auth_headers,
+    )
+    assert {i["token_id"] for i in resp.json()["items"]} == {"seed-3"}
+
+    bad = client.get("/api/v1/sessions/all", params={"cursor": "xx"}, headers=auth_headers)
+    assert bad.status_code == 400
+    bad = client.get("/api/v1/sessions/all", params={"cidr": "10.0.1.0/99"}, headers=auth_headers)
+    assert bad.status_code == 400
+
+
+def _login_from(client, ip, ua="pytest"):
+    resp = client.post(
+        "/api/v1/auth/login",
+        json={"email": "admin@test.com", "password": "Admin@2025!"},
+        headers={"X-Forwarded-For": ip, "User-Agent": ua},
+    )
+    assert resp.status_code == 200
+    return resp.json()
+
+
+def test_revoke_bulk_by_cidr(client, db):
+    """Revogação em massa: um UPDATE, um evento de auditoria e access tokens invalidados."""
+    from app.models import AuditLog
+
+    hit = _login_from(client, "203.0.113.7")
+    other = _login_from(client, "198.51.100.9")
+    headers = {"Authorization": f"Bearer {other['access_token']}"}
+
+    resp = client.post(
+        "/api/v1/sessions/revoke-bulk", json={"cidr": "203.0.113.0/24"}, headers=headers
+    )
+    assert resp.status_code == 200
+    body = resp.json()
+    assert body["revoked"] == 1
+    assert body["users_affected"] == 1
+    assert body["access_tokens_invalidated"] == 1
+    assert set(body["timings_ms"]) == {"update", "audit_commit", "redis", "total"}
+
+    revoked = {t.token_id for t in db.execute(select(RefreshToken).where(RefreshToken.revoked.is_(True))).scalars()}
+    assert revoked == {hit["refresh_token"]}
+    assert db.execute(
+        select(AuditLog).where(AuditLog.action == "session.revoke.bulk")
+    ).scalars().one().changes["revoked"] == 1
+
+    # Access token da sessão revogada deixa de valer; o da outra sessão continua
+    assert client.get("/api/v1/sessions/", headers={"Authorization": f"Bearer {hit['access_token']}"}).status_code == 401
+    assert client.get("/api/v1/sessions/", headers=headers).status_code == 200
+
+
+def test_revoke_bulk_requires_criteria(client, auth_headers):
+    resp = client.post("/api/v1/sessions/revoke-bulk", json={}, headers=auth_headers)
+    assert resp.status_code == 422
+
+
+def test_login_evicts_oldest_sessions_beyond_cap(client, db, monkeypatch):
+    """Com limite 3, o quarto login revoga a sessão mais antiga do usuário."""
+    from app.core.config import settings
+
+    monkeypatch.setattr(settings, "max_sessions_per_user", 3)
+    logins = [_login_from(client, f"192.0.2.{i}") for i in range(4)]
+    headers = {"Authorization": f"Bearer {logins[-1]['access_token']}"}
+
+    active = {
+        t.token_id
+        for t in db.execute(select(RefreshToken).where(RefreshToken.revoked.is_(False))).scalars()
+    }
+    assert active == {lg["refresh_token"] for lg in logins[1:]}
+    assert client.get("/api/v1/sessions/count", headers=headers).json() == {"active": 3, "limit": 3}
+
+    # O access token da sessão removida deixa de valer
+    old_headers = {"Authorization": f"Bearer {logins[0]['access_token']}"}
+    assert client.get("/api/v1/sessions/count", headers=old_headers).status_code == 401
@@ -0,0 +1,92 @@
+"""Testes para o feed incremental de usuários e RBAC (GET /sync/changes)."""
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import select, update
+
+from app.models import Permission, RbacChange, Role, User
+from app.services import change_feed_service, user_service
+
+
+def _grant_sync(db):
+    role = db.execute(select(Role).where(Role.name == "admin")).scalar_one()
+    role.permissions.append(Permission(name="sync:read"))
+    db.commit()
+
+
+def _pull(client, headers, since, limit=1000):
+    resp = client.get("/api/v1/sync/changes", params={"since": since, "limit": limit}, headers=headers)
+    assert resp.status_code == 200, resp.text
+    return resp.json()
+
+
+class _BulkRow:
+    """Linha validada da importação em massa (UserCreate)."""
+
+    def __init__(self, email, role_ids):
+        self.email, self.full_name, self.is_active, self.role_ids = email, "Lote", True, role_ids
+
+
+def test_full_load_pages_through_feed(client, auth_headers, db):
+    _grant_sync(db)
+    changes, cursor, pages = [], 0, 0
+    while True:
+        page = _pull(client, auth_headers, cursor, limit=4)
+        changes += page["changes"]
+        cursor, pages = page["cursor"], pages + 1
+        if not page["has_more"]:
+            break
+
+    versions = [c["version"] for c in changes]
+    assert versions == sorted(versions) and pages > 1
+    by_entity = {}
+    for change in changes:
+        by_entity.setdefault(change["entity"], []).append(change)
+    assert [c["data"]["email"] for c in by_entity["user"]] == ["admin@test.com"]
+    assert len(by_entity["permission"]) == len(by_entity["role_permission"]) == 5
+    assert by_entity["user_role"][0]["data"] == {"user_id": 1, "role_id": 1}
+    # Login (lockout, sessões) não muda o feed
+    assert _pull(client, auth_headers, cursor)["changes"] == []
+
+
+def test_incremental_changes_and_tombstones(client, auth_headers, db):
+    _grant_sync(db)
+    cursor = _pull(client, auth_headers, 0)["cursor"]
+
+    admin = db.execute(select(User).where(User.email == "admin@test.com")).scalar_one()
+    user = user_service.create_user(db, email="espelho@test.com", full_name="Espelho", password="Senha@2025!")
+    role = db.execute(select(Role).where(Role.name == "admin")).scalar_one()
+    audit = db.execute(select(Permission).where(Permission.name == "audit:read")).scalar_one()
+    role.permissions.remove(audit)
+    admin.failed_login_attempts = 3
+    db.commit()
+    user_service.delete_user(db, user)
+
+    page = _pull(client, auth_headers, cursor)
+    changes = {(c["entity"], c["id"]): c for c in page["changes"]}
+    assert set(changes) == {("user", str(user.id)), ("role_permission", f"{role.id}:{audit.id}")}
+    assert changes[("user", str(user.id))]["deleted"] is True
+    assert changes[("role_permission", f"{role.id}:{audit.id}")]["data"] is None
+    assert page["cursor"] > cursor and not page["has_more"]
+
+    # Importação em massa (Core) também entra no feed
+    user_service._insert_bulk_users(db, [({}, _BulkRow("lote@test.com", [role.id]))], ["x"], None)
+    db.commit()
+    later = _pull(client, auth_headers, page["cursor"])["changes"]
+    assert [c["entity"] for c in later] == ["user", "user_role"]
+
+
+def test_purged_tombstones_expire_old_cursors(client, auth_headers, db):
+    _grant_sync(db)
+    perm = Permission(name="temporaria")
+    db.add(perm)
+    db.commit()
+    cursor = _pull(client, auth_headers, 0)["cursor"]
+    db.delete(perm)
+    db.commit()
+    db.execute(update(RbacChange).values(changed_at=datetime.now(timezone.utc) - timedelta(days=90)))
+    db.commit()
+
+    assert change_feed_service.purge_tombstones(db) == 1
+    resp = client.get("/api/v1/sync/changes", params={"since": cursor}, headers=auth_headers)
+    assert resp.status_code == 410
+    assert _pull(client, auth_headers, 0)["changes"]
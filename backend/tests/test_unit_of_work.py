@@ -0,0 +1,122 @@
+"""Testes para o caminho de escrita em transação única (mutação + auditoria)."""
+from contextlib import contextmanager
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import event, select
+
+from app.models import AuditLog, Permission, Role, User
+from app.services import effective_permission_service, user_service
+from app.services.dimension_service import (
+    audit_actions,
+    audit_resource_types,
+    audit_results,
+    user_agents,
+)
+
+pytestmark = pytest.mark.usefixtures("outbox_enabled")
+
+_request = SimpleNamespace(headers={"User-Agent": "pytest"}, client=SimpleNamespace(host="127.0.0.1"))
+
+
+@contextmanager
+def count_statements(db):
+    """Conta statements SQL e commits emitidos no engine da sessão."""
+    engine = db.get_bind()
+    counts = {"statements": [], "commits": 0}
+
+    def on_execute(conn, cursor, statement, parameters, context, executemany):
+        counts["statements"].append(statement.split()[0].upper())
+
+    def on_commit(conn):
+        counts["commits"] += 1
+
+    event.listen(engine, "before_cursor_execute", on_execute)
+    event.listen(engine, "commit", on_commit)
+    try:
+        yield counts
+    finally:
+        event.remove(engine, "before_cursor_execute", on_execute)
+        event.remove(engine, "commit", on_commit)
+
+
+def _admin(db):
+    # Aquece o cache das dimensões: só a primeira ocorrência de um valor custa idas ao banco
+    user_agents.id_for(db, _request.headers["User-Agent"])
+    for action in ("user.create", "user.update"):
+        audit_actions.id_for(db, action)
+    audit_results.id_for(db, "success")
+    audit_resource_types.id_for(db, "user")
+    db.commit()
+    return db.execute(select(User).where(User.email == "admin@test.com")).scalar_one()
+
+
+def test_create_user_single_transaction(client, db):
+    """create_user: INSERT do usuário, vínculos e auditoria num único commit, sem recarga."""
+    admin = _admin(db)
+    role_id = db.execute(select(Role.id).where(Role.name == "admin")).scalar_one()
+    db.expunge_all()
+    admin = SimpleNamespace(id=admin.id, email=admin.email)
+
+    with count_statements(db) as counts:
+        user = user_service.create_user(
+            db, email="nova@test.com", full_name="Nova", password="Senha@2025!",
+            role_ids=[role_id], current_user=admin, request=_request,
+        )
+        roles = sorted(r.name for r in user.roles)
+
+    assert counts["commits"] == 1
+    # SELECT roles + INSERT users + INSERT user_roles
+    # + INSERT user_effective_permissions e UPDATE do contador + INSERT rbac_changes (no flush)
+    # + INSERT audit_logs + INSERT audit_change_values (fallback de changes_contains no SQLite)
+    # + INSERT outbox_events (mesma transação)
+    assert counts["statements"] == [
+        "SELECT", "INSERT", "INSERT", "INSERT", "UPDATE", "INSERT", "INSERT", "INSERT", "INSERT",
+    ]
+    perms = effective_permission_service.permission_names(db, user.id)
+    assert roles == ["admin"]
+    assert "audit:read" in perms
+    assert db.execute(select(AuditLog).where(AuditLog.action == "user.create")).scalar_one()
+
+
+def test_update_user_single_transaction(client, db):
+    """update_user: UPDATE, feed de mudanças, auditoria (audit_change_values no SQLite) e outbox num único commit."""
+    admin = _admin(db)
+    with count_statements(db) as counts:
+        user = user_service.update_user(
+            db, admin, full_name="Admin Renomeado", current_user=admin, request=_request,
+        )
+        assert user.full_name == "Admin Renomeado"
+        assert [r.name for r in user.roles] == ["admin"]
+
+    assert counts["commits"] == 1
+    assert sorted(counts["statements"]) == ["INSERT", "INSERT", "INSERT", "INSERT", "UPDATE", "UPDATE"]
+
+
+def test_create_user_duplicate_email_rolls_back(client, db):
+    """E-mail duplicado vira 400 e nada da transação é gravado."""
+    admin = _admin(db)
+    try:
+        user_service.create_user(
+            db, email="admin@test.com", full_name="Dup", password="Senha@2025!",
+            current_user=admin, request=_request,
+        )
+    except Exception as exc:
+        assert getattr(exc, "status_code", None) == 400
+    else:
+        raise AssertionError("esperava HTTPException 400")
+    assert db.execute(select(AuditLog).where(AuditLog.action == "user.create")).first() is None
+
+
+def test_update_role_endpoint_commits_once(client, auth_headers, db):
+    """PUT /roles/{id} grava alteração e auditoria num único commit."""
+    role = db.execute(select(Role).where(Role.name == "admin")).scalar_one()
+    role.permissions.append(Permission(name="roles:update"))
+    db.commit()
+
+    with count_statements(db) as counts:
+        resp = client.put(f"/api/v1/roles/{role.id}", json={"description": "Nova"}, headers=auth_headers)
+
+    assert resp.status_code == 200
+    assert resp.json()["description"] == "Nova"
+    assert counts["commits"] == 1
@@ -0,0 +1,44 @@
+"""Testes para a classificação de User-Agent das sessões."""
+import pytest
+from sqlalchemy import select
+
+from app.models import RefreshToken
+from app.services.user_agent_service import parse_user_agent
+
+CHROME_WIN = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/126.0.0.0 Safari/537.36"
+
+
+@pytest.mark.parametrize(
+    "ua, expected",
+    [
+        (CHROME_WIN, ("desktop", "Chrome", "Windows")),
+        (CHROME_WIN + " Edg/126.0.0.0", ("desktop", "Edge", "Windows")),
+        (
+            "Mozilla/5.0 (iPhone; CPU iPhone OS 17_5 like Mac OS X) AppleWebKit/605.1.15 "
+            "(KHTML, like Gecko) Version/17.5 Mobile/15E148 Safari/604.1",
+            ("mobile", "Safari", "iOS"),
+        ),
+        (
+            "Mozilla/5.0 (Linux; Android 14; SM-X710) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/126.0 Safari/537.36",
+            ("tablet", "Chrome", "Android"),
+        ),
+        ("curl/8.5.0", ("bot", "curl", None)),
+        ("", ("other", None, None)),
+        (None, ("other", None, None)),
+    ],
+)
+def test_parse_user_agent(ua, expected):
+    assert tuple(parse_user_agent(ua)) == expected
+
+
+def test_login_fills_device_fields(client, db):
+    resp = client.post(
+        "/api/v1/auth/login",
+        json={"email": "admin@test.com", "password": "Admin@2025!"},
+        headers={"User-Agent": CHROME_WIN},
+    )
+    assert resp.status_code == 200
+    rt = db.execute(
+        select(RefreshToken).where(RefreshToken.token_id == resp.json()["refresh_token"])
+    ).scalar_one()
+    assert (rt.device_name, rt.device_class) == ("Chrome em Windows", "desktop")
@@ -1,5 +1,10 @@
 import { api } from './axios'
-import type { AuditLogListResponse, AuditLogFilters } from '@/types'
+import type {
+  AuditExportJob,
+  AuditLogListResponse,
+  AuditLogFilters,
+  AuditStatsResponse,
+} from '@/types'
 
 export const auditApi = {
   list: async (
@@ -15,6 +20,10 @@ export const auditApi = {
     if (filters.result) params.result = filters.result
     if (filters.date_from) params.date_from = filters.date_from
     if (filters.date_to) params.date_to = filters.date_to
+    if (filters.cidr) params.cidr = filters.cidr
+    if (filters.changes_contains) params.changes_contains = filters.changes_contains
+    if (filters.email_match) params.email_match = filters.email_match
+    if (filters.action_match) params.action_match = filters.action_match
 
     const res = await api.get<AuditLogListResponse>('/audit-logs/', { params })
     return res.data
@@ -28,6 +37,10 @@ export const auditApi = {
     if (filters.result) params.result = filters.result
     if (filters.date_from) params.date_from = filters.date_from
     if (filters.date_to) params.date_to = filters.date_to
+    if (filters.cidr) params.cidr = filters.cidr
+    if (filters.changes_contains) params.changes_contains = filters.changes_contains
+    if (filters.email_match) params.email_match = filters.email_match
+    if (filters.action_match) params.action_match = filters.action_match
 
     const res = await api.get<Blob>('/audit-logs/export', {
       params,
@@ -35,4 +48,34 @@ export const auditApi = {
     })
     return res.data
   },
+
+  stats: async (params: {
+    by?: 'action' | 'user'
+    interval?: 'hour' | 'day'
+    date_from?: string
+    date_to?: string
+    action?: string
+    result?: string
+    user_id?: number
+  } = {}): Promise<AuditStatsResponse> => {
+    const res = await api.get<AuditStatsResponse>('/audit-logs/stats', { params })
+    return res.data
+  },
+
+  createExport: async (filters: AuditLogFilters = {}): Promise<AuditExportJob> => {
+    // Filtros vazios do formulário ficam de fora (também evita jobs "diferentes" só por isso)
+    const body = Object.fromEntries(Object.entries(filters).filter(([, value]) => value))
+    const res = await api.post<AuditExportJob>('/audit-logs/exports', body)
+    return res.data
+  },
+
+  getExport: async (id: string): Promise<AuditExportJob> => {
+    const res = await api.get<AuditExportJob>(`/audit-logs/exports/${id}`)
+    return res.data
+  },
+
+  downloadExport: async (id: string): Promise<Blob> => {
+    const res = await api.get<Blob>(`/audit-logs/exports/${id}/download`, { responseType: 'blob' })
+    return res.data
+  },
 }
@@ -1,5 +1,5 @@
 import { api } from './axios'
-import type { SessionListResponse } from '@/types'
+import type { RevokeBulkResponse, SessionListResponse } from '@/types'
 
 export const sessionsApi = {
   listMy: async (): Promise<SessionListResponse> => {
@@ -8,7 +8,14 @@ export const sessionsApi = {
   },
 
   listAll: async (
-    params: { skip?: number; limit?: number } = {}
+    params: {
+      limit?: number
+      cursor?: string
+      user_id?: number
+      cidr?: string
+      user_agent?: string
+      device_class?: string
+    } = {}
   ): Promise<SessionListResponse> => {
     const { data } = await api.get<SessionListResponse>('/sessions/all', {
       params,
@@ -24,6 +31,15 @@ export const sessionsApi = {
     await api.delete(`/sessions/admin/${tokenId}`)
   },
 
+  revokeBulk: async (criteria: {
+    user_ids?: number[]
+    cidr?: string
+    user_agent?: string
+  }): Promise<RevokeBulkResponse> => {
+    const { data } = await api.post<RevokeBulkResponse>('/sessions/revoke-bulk', criteria)
+    return data
+  },
+
   logoutAll: async (): Promise<void> => {
     await api.post('/auth/logout-all')
   },
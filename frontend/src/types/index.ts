@@ -105,6 +105,9 @@ export interface AuditLog {
   } | null
   detail: string | null
   created_at: string
+  // Actions agregadas: repetições na janela; created_at é a primeira ocorrência
+  occurrence_count: number
+  last_occurred_at: string | null
 }
 
 export interface AuditLogListResponse {
@@ -114,6 +117,36 @@ export interface AuditLogListResponse {
   limit: number
 }
 
+export interface AuditStatsPoint {
+  bucket: string
+  action?: string | null
+  result?: string | null
+  user_id?: number | null
+  count: number
+}
+
+export interface AuditStatsResponse {
+  by: 'action' | 'user'
+  interval: 'hour' | 'day'
+  date_from: string
+  date_to: string
+  rolled_up_to: string | null
+  points: AuditStatsPoint[]
+}
+
+export interface AuditExportJob {
+  id: string
+  status: 'queued' | 'running' | 'done' | 'failed'
+  rows_written: number
+  rows_estimated: number | null
+  file_size: number | null
+  error: string | null
+  created_at: string
+  started_at: string | null
+  finished_at: string | null
+  download_url: string | null
+}
+
 export interface AuditLogFilters {
   user_email?: string
   action?: string
@@ -121,8 +154,14 @@ export interface AuditLogFilters {
   result?: 'success' | 'failure' | ''
   date_from?: string
   date_to?: string
+  cidr?: string
+  changes_contains?: string
+  email_match?: MatchMode
+  action_match?: MatchMode
 }
 
+export type MatchMode = 'exact' | 'prefix' | 'contains'
+
 // ── Session ──────────────────────────────────────────────────────────────────
 export interface Session {
   token_id: string
@@ -131,12 +170,23 @@ export interface Session {
   ip_address?: string | null
   user_agent?: string | null
   device_name?: string | null
+  device_class?: 'desktop' | 'mobile' | 'tablet' | 'bot' | 'other' | null
   created_at: string
   expires_at: string
+  last_seen_at?: string | null
   is_current?: boolean
 }
 
 export interface SessionListResponse {
   items: Session[]
   total: number
+  total_is_estimate?: boolean
+  next_cursor?: string | null
+}
+
+export interface RevokeBulkResponse {
+  revoked: number
+  users_affected: number
+  access_tokens_invalidated: number
+  timings_ms: Record<string, number>
 }